@@ -4,7 +4,84 @@ class Config:
     def __init__(self):        
         self.BASIC_AUTH_USERNAME = os.getenv("BASIC_AUTH_USERNAME")
         self.BASIC_AUTH_PASSWORD = os.getenv("BASIC_AUTH_PASSWORD")
+        # Additional tenants as "user:password,user2:password2"
+        self.BASIC_AUTH_USERS = self._parse_pairs(os.getenv("BASIC_AUTH_USERS", ""))
         self.OLLAMA_URL = os.getenv("OLLAMA_URL")
+        # Several backends as "http://a:11434,http://b:11434"; defaults to OLLAMA_URL
+        self.OLLAMA_URLS = [url.strip() for url in (os.getenv("OLLAMA_URLS") or self.OLLAMA_URL or "").split(",") if url.strip()]
+        # Limit per backend attempt; a timed-out attempt counts as a backend failure
+        self.OLLAMA_REQUEST_TIMEOUT = float(os.getenv("OLLAMA_REQUEST_TIMEOUT", "30"))
+        self.OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))
+        self.OLLAMA_BREAKER_THRESHOLD = int(os.getenv("OLLAMA_BREAKER_THRESHOLD", "3"))
+        self.OLLAMA_BREAKER_COOLDOWN = float(os.getenv("OLLAMA_BREAKER_COOLDOWN", "30"))
+        self.OLLAMA_HEDGE_PERCENTILE = float(os.getenv("OLLAMA_HEDGE_PERCENTILE", "0"))  # 0 disables hedging
+        self.OLLAMA_HEDGE_MIN_SAMPLES = int(os.getenv("OLLAMA_HEDGE_MIN_SAMPLES", "20"))
+        self.OLLAMA_DEGRADED_MODE = os.getenv("OLLAMA_DEGRADED_MODE", "true").lower() == "true"
+        self.OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5:3b")
+        self.OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        self.OLLAMA_KEEP_WARM_INTERVAL = float(os.getenv("OLLAMA_KEEP_WARM_INTERVAL", "240"))
+        self.OLLAMA_COLD_LOAD_THRESHOLD = float(os.getenv("OLLAMA_COLD_LOAD_THRESHOLD", "0.5"))
         self.YOLO_PATH = os.getenv("YOLO_PATH")
+        self.YOLO_BACKEND = os.getenv("YOLO_BACKEND", "ultralytics")  # 'ultralytics' or 'onnx'
+        self.YOLO_ONNX_PATH = os.getenv("YOLO_ONNX_PATH", os.path.splitext(self.YOLO_PATH or "")[0] + ".onnx")
+        self.YOLO_CONF_THRESHOLD = float(os.getenv("YOLO_CONF_THRESHOLD", "0.25"))
+        self.YOLO_IOU_THRESHOLD = float(os.getenv("YOLO_IOU_THRESHOLD", "0.7"))
+        # ONNX Runtime intra-op threads per session (0 = ORT default, one per core)
+        self.YOLO_INTRA_OP_THREADS = int(os.getenv("YOLO_INTRA_OP_THREADS") or "0")
+        self.PIX2TEXT_MODEL = os.getenv("PIX2TEXT_MODEL", "breezedeus/pix2text-mfr-1.5")
+        self.PIX2TEXT_OPTIMIZED_PATH = os.getenv("PIX2TEXT_OPTIMIZED_PATH")
+        self.PIX2TEXT_BATCH_SIZE = int(os.getenv("PIX2TEXT_BATCH_SIZE") or "4")
+        self.PIX2TEXT_INTRA_OP_THREADS = int(os.getenv("PIX2TEXT_INTRA_OP_THREADS") or "0")
+        self.PIX2TEXT_FAST_PREPROCESS = os.getenv("PIX2TEXT_FAST_PREPROCESS", "true").lower() == "true"
+        self.PIX2TEXT_PREPROCESS_TOLERANCE = float(os.getenv("PIX2TEXT_PREPROCESS_TOLERANCE", "0.02"))
+        # Largest single-pixel deviation allowed, so a few badly resized pixels cannot hide in the mean
+        self.PIX2TEXT_PREPROCESS_MAX_ERROR = float(os.getenv("PIX2TEXT_PREPROCESS_MAX_ERROR", "0.25"))
+        # Boot checks artifact sizes only; full SHA-256 hashing reads the whole model
+        self.PIX2TEXT_VERIFY_CHECKSUMS = os.getenv("PIX2TEXT_VERIFY_CHECKSUMS", "false").lower() == "true"
+        self.REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "60"))
+        self.SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+        self.SCHEDULER_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_CONCURRENCY") or "4")
+        # Tenant weights as "user:weight,user2:weight"; unlisted tenants get weight 1
+        self.SCHEDULER_TENANT_WEIGHTS = {
+            user: float(weight) for user, weight in self._parse_pairs(os.getenv("SCHEDULER_TENANT_WEIGHTS", "")).items()
+        }
+        # Shadow replays run in the background scheduler class; beyond this many per kind they are skipped
+        self.MODEL_SHADOW_MAX_IN_FLIGHT = int(os.getenv("MODEL_SHADOW_MAX_IN_FLIGHT", "2"))
+        self.LATEX_FAST_PATH_ENABLED = os.getenv("LATEX_FAST_PATH_ENABLED", "true").lower() == "true"
+        self.LATEX_FAST_PATH_MIN_CONFIDENCE = float(os.getenv("LATEX_FAST_PATH_MIN_CONFIDENCE", "0.8"))
+        self.TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", "2"))
+        self.TRANSLATION_JOB_TIMEOUT = float(os.getenv("TRANSLATION_JOB_TIMEOUT", "300"))
+        self.TRANSLATION_JOB_TTL = float(os.getenv("TRANSLATION_JOB_TTL", "900"))
+        self.TRANSLATION_MAX_PENDING = int(os.getenv("TRANSLATION_MAX_PENDING", "1000"))
+        self.TRANSLATION_MAX_WAIT = float(os.getenv("TRANSLATION_MAX_WAIT", "30"))
+        # Live sessions: fraction of downscaled pixels that must differ for a frame / region to count as changed
+        self.LIVE_FRAME_CHANGE_THRESHOLD = float(os.getenv("LIVE_FRAME_CHANGE_THRESHOLD", "0.002"))
+        self.LIVE_REGION_CHANGE_THRESHOLD = float(os.getenv("LIVE_REGION_CHANGE_THRESHOLD", "0.01"))
+        self.LIVE_IOU_THRESHOLD = float(os.getenv("LIVE_IOU_THRESHOLD", "0.5"))
+        self.LIVE_MAX_MISSED_FRAMES = int(os.getenv("LIVE_MAX_MISSED_FRAMES", "2"))
+        # Fraction of ONNX Runtime inference calls whose session runs are timed (0 disables)
+        self.ORT_PROFILING_SAMPLE_RATE = float(os.getenv("ORT_PROFILING_SAMPLE_RATE", "0"))
+        self.ORT_PROFILING_DIR = os.getenv("ORT_PROFILING_DIR", "/tmp")
+        self.ORT_PROFILING_CAPTURE_TIMEOUT = float(os.getenv("ORT_PROFILING_CAPTURE_TIMEOUT", "600"))
+        self.ORT_PROFILING_TOP_OPERATORS = int(os.getenv("ORT_PROFILING_TOP_OPERATORS", "20"))
+        # Tuned thread counts, concurrency and batch size; calibrated at boot when none fit this host
+        self.AUTOTUNE_ON_STARTUP = os.getenv("AUTOTUNE_ON_STARTUP", "false").lower() == "true"
+        self.AUTOTUNE_PATH = os.getenv("AUTOTUNE_PATH", "autotune.json")
+        self.AUTOTUNE_LATENCY_SLO = float(os.getenv("AUTOTUNE_LATENCY_SLO", "2.0"))
+        self.AUTOTUNE_ROUNDS = int(os.getenv("AUTOTUNE_ROUNDS", "3"))
+        # Boot-time calibration that takes longer than this is abandoned for the defaults
+        self.AUTOTUNE_TIMEOUT = float(os.getenv("AUTOTUNE_TIMEOUT", "900"))
+        self.AUTOTUNE_SAMPLES_DIR = os.getenv("AUTOTUNE_SAMPLES_DIR")
+        # Persistent crop → result store; a crop with the same strokes skips OCR and translation.
+        # MIN_SIMILARITY only preselects candidates for the stroke comparison
+        self.CROP_STORE_ENABLED = os.getenv("CROP_STORE_ENABLED", "false").lower() == "true"
+        self.CROP_STORE_PATH = os.getenv("CROP_STORE_PATH", "crop_store")
+        self.CROP_STORE_CAPACITY = int(os.getenv("CROP_STORE_CAPACITY", "20000"))
+        self.CROP_STORE_MIN_SIMILARITY = float(os.getenv("CROP_STORE_MIN_SIMILARITY", "0.97"))
+
+    @staticmethod
+    def _parse_pairs(value: str) -> dict:
+        pairs = (item.split(":", 1) for item in value.split(",") if ":" in item)
+        return {key.strip(): val.strip() for key, val in pairs}
 
 config = Config()
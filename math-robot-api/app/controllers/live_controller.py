@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import secrets
+from typing import Any, Dict
+from fastapi import Depends, APIRouter, Query, HTTPException, WebSocket, WebSocketDisconnect, WebSocketException, status
+
+from app.config import config
+from app.models.deadline_model import Deadline
+from app.services.auth_service import websocket_basic_auth
+from app.services.file_service import FileService
+from app.services.live_session_service import LiveSession, LIVE_SESSIONS, LIVE_FRAMES_TOTAL
+from app.services.pipeline_service import PipelineService
+from app.services.readiness_service import ReadinessService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.websocket("/live")
+async def live_session(
+    websocket: WebSocket,
+    target_regions: int = Query(1, ge=1, le=20, description="Number of expressions expected in the frame"),
+    translation: str = Query(PipelineService.EAGER, description="Translation mode: eager, lazy or none"),
+    username: str = Depends(websocket_basic_auth)
+):
+    """
+    Live camera mode.
+
+    The client sends encoded frames (JPEG/PNG) as binary messages. The server tracks
+    problem regions across frames, re-runs OCR and translation only on regions that
+    changed and pushes JSON deltas: `{"type": "delta", "added": [...], "updated": [...],
+    "removed": [ids]}`. Errors for a frame are sent as `{"type": "error", ...}` and the
+    session continues. Frames arriving while one is being processed replace each other,
+    so only the latest is processed next.
+    """
+    if translation not in PipelineService.TRANSLATION_MODES:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason=f"translation should be one of {', '.join(PipelineService.TRANSLATION_MODES)}"
+        )
+    if not ReadinessService.is_ready("whiteboard_processor", "pix2text"):
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason="Models are still loading")
+
+    await websocket.accept()
+    session = LiveSession(f"live_{secrets.token_hex(4)}", username, target_regions, translation)
+    LIVE_SESSIONS.inc()
+    logger.info(f"Live session {session.name} opened by {username}")
+
+    latest: Dict[str, bytes] = {}
+    frame_ready = asyncio.Event()
+
+    async def receive_frames() -> None:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            data = message.get("bytes")
+            if data is None:
+                await send({"type": "error", "status": 400, "detail": "Frames must be sent as binary images"})
+                continue
+            if len(data) > FileService.MAX_FILE_SIZE:
+                await send({"type": "error", "status": 400, "detail": "Frame too large"})
+                continue
+
+            if "frame" in latest:
+                LIVE_FRAMES_TOTAL.labels(outcome="dropped").inc()
+            latest["frame"] = data
+            frame_ready.set()
+
+    async def process_frames() -> None:
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            data = latest.pop("frame")
+
+            try:
+                delta = await session.process(data, Deadline(config.REQUEST_TIMEOUT))
+            except HTTPException as e:
+                await send({"type": "error", "frame": session.frame_count, "status": e.status_code, "detail": e.detail})
+                continue
+            except Exception as e:
+                logger.error(f"Live session {session.name} failed on frame {session.frame_count}: {str(e)}")
+                await send({"type": "error", "frame": session.frame_count, "status": 500, "detail": str(e)})
+                continue
+
+            if delta is not None:
+                await send(delta)
+
+    async def send(message: Dict[str, Any]) -> None:
+        try:
+            await websocket.send_json(message)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+    tasks = [asyncio.create_task(receive_frames()), asyncio.create_task(process_frames())]
+    try:
+        # Either the client went away or processing crashed: stop both
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        LIVE_SESSIONS.dec()
+        logger.info(f"Live session {session.name} closed after {session.frame_count} frames")
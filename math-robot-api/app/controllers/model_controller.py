@@ -0,0 +1,81 @@
+from fastapi import Depends, APIRouter, status
+
+from app.services.auth_service import admin_auth
+from app.services.model_registry_service import ModelRegistry
+from app.schemas.model_schema import ModelVersionRequest, ShadowRequest, ModelsResponse
+
+router = APIRouter()
+
+@router.get(
+    "/models",
+    response_model=ModelsResponse,
+    summary="Model Registry State",
+    response_description="Active, loading, retiring and shadow versions per model kind",
+    responses={
+        401: {"description": "Unauthorized - Invalid credentials"},
+        403: {"description": "Forbidden - Admin credentials required"},
+    }
+)
+async def get_models(username: str = Depends(admin_auth)) -> ModelsResponse:
+    """Show which model versions serve traffic and how the shadow compares"""
+    return ModelsResponse(models=ModelRegistry.status())
+
+@router.post(
+    "/models/{kind}/activate",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ModelsResponse,
+    summary="Hot-swap a Model Version",
+    description="""
+    Load a new version of a model (`pix2text`, `yolo` or `ollama`) in the background and swap it
+    in once loaded. Requests already running finish on the old version, which is unloaded after
+    they drain. Poll `GET /models` for progress.
+    """,
+    responses={
+        202: {"description": "Loading started"},
+        401: {"description": "Unauthorized - Invalid credentials"},
+        403: {"description": "Forbidden - Admin credentials required"},
+        404: {"description": "Not Found - Unknown model kind"},
+        409: {"description": "Conflict - A version of this model is already loading"},
+    }
+)
+async def activate_model(kind: str, body: ModelVersionRequest, username: str = Depends(admin_auth)) -> ModelsResponse:
+    """Start loading and swapping in a model version"""
+    ModelRegistry.activate_in_background(kind, body.version)
+    return ModelsResponse(models=ModelRegistry.status())
+
+@router.put(
+    "/models/{kind}/shadow",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ModelsResponse,
+    summary="Shadow-evaluate a Model Version",
+    description="""
+    Load a candidate version and replay a sampled `fraction` of requests on it after the active
+    version answered. Responses always come from the active version; `GET /models` reports the
+    shadow's output agreement and latency against the active one.
+    """,
+    responses={
+        202: {"description": "Loading started"},
+        401: {"description": "Unauthorized - Invalid credentials"},
+        403: {"description": "Forbidden - Admin credentials required"},
+        404: {"description": "Not Found - Unknown model kind"},
+        409: {"description": "Conflict - A version of this model is already loading"},
+    }
+)
+async def set_shadow_model(kind: str, body: ShadowRequest, username: str = Depends(admin_auth)) -> ModelsResponse:
+    """Start loading a shadow version"""
+    ModelRegistry.set_shadow_in_background(kind, body.version, body.fraction)
+    return ModelsResponse(models=ModelRegistry.status())
+
+@router.delete(
+    "/models/{kind}/shadow",
+    response_model=ModelsResponse,
+    summary="Stop Shadow Evaluation",
+    responses={
+        401: {"description": "Unauthorized - Invalid credentials"},
+        403: {"description": "Forbidden - Admin credentials required"},
+    }
+)
+async def clear_shadow_model(kind: str, username: str = Depends(admin_auth)) -> ModelsResponse:
+    """Stop mirroring traffic and unload the shadow version once drained"""
+    ModelRegistry.clear_shadow(kind)
+    return ModelsResponse(models=ModelRegistry.status())
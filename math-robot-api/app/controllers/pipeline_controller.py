@@ -1,15 +1,24 @@
-from fastapi import Depends, APIRouter, UploadFile, File, HTTPException, status
+from typing import Optional
+from fastapi import Depends, APIRouter, Query, Request, UploadFile, File, HTTPException, status
 import time
 
 from app.services.auth_service import basic_auth
+from app.services.readiness_service import ReadinessService
+from app.services.scheduler_service import SchedulerService
 from app.services.file_service import FileService
 from app.services.pipeline_service import PipelineService
+from app.services.cancellation_service import CancellationService
+from app.models.deadline_model import Deadline
 from app.schemas.pipeline_schema import PipelineResponse, ProblemResult
 
 router = APIRouter()
 
 @router.post(
     "/pipeline/{target_regions}",
+    dependencies=[
+        Depends(ReadinessService.require("whiteboard_processor", "pix2text")),
+        Depends(SchedulerService.admit(SchedulerService.BULK)),
+    ],
     response_model=PipelineResponse,
     summary="Complete Pipeline",
     description="""
@@ -19,27 +28,42 @@ router = APIRouter()
     2. **OCR Conversion**: Convert each problem to LaTeX using machine learning
     3. **Structured Output**: Return organized results ready for further processing
     
+    With `translation=lazy` the response does not wait for the Wolfram translation: problems
+    the fast path cannot translate come back with a `translation_handle` to fetch from
+    `/translations/{handle}`, or with `translation_status=skipped` while too many translations
+    are queued. `translation=none` skips translation entirely.
+    
+    The image is uploaded as multipart/form-data or sent as the raw request body
+    (`application/octet-stream` or `image/*`, optional `X-Filename` header).
+    
     This endpoint handles the entire workflow from raw image to processed LaTeX formulas.
     """,
+    openapi_extra=FileService.RAW_IMAGE_OPENAPI,
     response_description="Structured results of pipeline processing",
     responses={
         200: {"description": "Successfully processed whiteboard and generated LaTeX"},
         401: {"description": "Unauthorized - Invalid credentials"},
         400: {"description": "Bad Request - Invalid file type or no problems detected"},
         415: {"description": "Unsupported Media Type - File must be an image"},
+        503: {"description": "Service Unavailable - Models are still loading or the server is overloaded (see Retry-After)"},
         500: {"description": "Internal Server Error - Failed to process pipeline"},
+        504: {"description": "Gateway Timeout - Request deadline (X-Request-Timeout) exceeded"},
     }
 )
 async def process_pipeline(
     target_regions: int,
-    file: UploadFile = File(..., description="Whiteboard image containing mathematical problems"),
-    username: str = Depends(basic_auth)
+    request: Request,
+    file: Optional[UploadFile] = File(None, description="Whiteboard image containing mathematical problems (or send the raw image as the body)"),
+    translation: str = Query(PipelineService.EAGER, description="Translation mode: eager, lazy or none"),
+    username: str = Depends(basic_auth),
+    deadline: Deadline = Depends(CancellationService.get_deadline)
 ) -> PipelineResponse:
     """
     Complete pipeline processing for whiteboard images.
 
     - **target_regions**: Number of expressions expected in the image (1-20, required)
     - **file**: Whiteboard image with multiple math problems (required)
+    - **translation**: `eager` (default), `lazy` or `none`
     - **Returns**: Structured results with LaTeX formulas and processing status
 
     **Pipeline Steps**:
@@ -54,12 +78,24 @@ async def process_pipeline(
     try:
         if target_regions > 20 or target_regions < 1:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="target_regions should be betwwen 1 and 20")
+
+        if translation not in PipelineService.TRANSLATION_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"translation should be one of {', '.join(PipelineService.TRANSLATION_MODES)}"
+            )
         
         # Validate and convert to internal file model
-        internal_file = await FileService.validate_and_convert(file)
+        internal_file = await FileService.from_request(request, file)
         
-        # Process through pipeline
-        raw_results = await PipelineService.process_pipeline(internal_file, target_regions=target_regions)
+        # Process through pipeline, cancelling it if the client disconnects or the deadline passes
+        raw_results = await CancellationService.run(
+            request,
+            PipelineService.process_pipeline(
+                internal_file, target_regions=target_regions, deadline=deadline, translation_mode=translation
+            ),
+            deadline
+        )
         
         # Calculate processing time
         processing_time = time.time() - start_time
@@ -76,6 +112,8 @@ async def process_pipeline(
                 filename=result.get('filename', ''),
                 latex_raw=result.get('latex_raw', ''),
                 latex_filtered=result.get('latex_filtered', ''),
+                translation_status=result.get('translation_status'),
+                translation_handle=result.get('translation_handle'),
                 error=result.get('error'),
                 success=result.get('success', False)
             ))
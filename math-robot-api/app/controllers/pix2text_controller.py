@@ -1,31 +1,51 @@
-from fastapi import Depends, APIRouter, UploadFile, File, HTTPException
+from typing import List, Optional
+from fastapi import Depends, APIRouter, Request, UploadFile, File, HTTPException
 from app.services.auth_service import basic_auth
+from app.services.readiness_service import ReadinessService
+from app.services.scheduler_service import SchedulerService
 from app.services.file_service import FileService
 from app.services.pix2text_service import Pix2TextService
-from app.schemas.latex_schema import LatexResponse
+from app.services.cancellation_service import CancellationService
+from app.models.deadline_model import Deadline
+from app.schemas.latex_schema import LatexResponse, LatexBatchResponse
 
 router = APIRouter()
 
 @router.post(
     "/latext",
+    dependencies=[
+        Depends(ReadinessService.require("pix2text")),
+        Depends(SchedulerService.admit(SchedulerService.INTERACTIVE)),
+    ],
     response_model=LatexResponse,
     summary="Extract LaTeX from Image",
+    description="""
+    Extract a LaTeX formula from an image, uploaded as multipart/form-data or sent as the raw
+    request body (`application/octet-stream` or `image/*`, optional `X-Filename` header).
+    """,
+    openapi_extra=FileService.RAW_IMAGE_OPENAPI,
     responses={
         200: {"description": "Successfully extracted LaTeX formula"},
         401: {"description": "Unauthorized - Invalid credentials"},
         400: {"description": "Bad Request - Invalid file type or no formula detected"},
         415: {"description": "Unsupported Media Type - File must be an image"},
+        503: {"description": "Service Unavailable - Models are still loading or the server is overloaded (see Retry-After)"},
         500: {"description": "Internal Server Error - Failed to process image"},
+        504: {"description": "Gateway Timeout - Request deadline (X-Request-Timeout) exceeded"},
     }
 )
 async def get_latext_from_image(
-    file: UploadFile = File(..., description="Image containing mathematical formula"),
-    username: str = Depends(basic_auth)
+    request: Request,
+    file: Optional[UploadFile] = File(None, description="Image containing mathematical formula (or send the raw image as the body)"),
+    username: str = Depends(basic_auth),
+    deadline: Deadline = Depends(CancellationService.get_deadline)
 ) -> LatexResponse:
     """Extract LaTeX formula from an uploaded image"""
     try:
-        internal_file = await FileService.validate_and_convert(file)
-        latex_result = await Pix2TextService.recognize_formula(internal_file)
+        internal_file = await FileService.from_request(request, file)
+        latex_result = await CancellationService.run(
+            request, Pix2TextService.recognize_formula(internal_file, deadline), deadline
+        )
         
         if not latex_result or latex_result.strip() == "":
             raise HTTPException(
@@ -45,4 +65,62 @@ async def get_latext_from_image(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to extract LaTeX: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post(
+    "/latext/batch",
+    dependencies=[
+        Depends(ReadinessService.require("pix2text")),
+        Depends(SchedulerService.admit(SchedulerService.BULK)),
+    ],
+    response_model=LatexBatchResponse,
+    summary="Extract LaTeX from Several Images",
+    description="""
+    Extract LaTeX from several formula images in one batched OCR run. Images are uploaded as
+    multipart/form-data (`files`) or sent as an `application/x-image-batch` body: each image
+    prefixed with its length as a 4-byte big-endian unsigned integer.
+    """,
+    openapi_extra=FileService.RAW_BATCH_OPENAPI,
+    responses={
+        200: {"description": "Images processed; check each result's status"},
+        401: {"description": "Unauthorized - Invalid credentials"},
+        400: {"description": "Bad Request - Invalid file type, malformed batch or too many images"},
+        415: {"description": "Unsupported Media Type - Body must be multipart or an image batch"},
+        503: {"description": "Service Unavailable - Models are still loading or the server is overloaded (see Retry-After)"},
+        500: {"description": "Internal Server Error - Failed to process images"},
+        504: {"description": "Gateway Timeout - Request deadline (X-Request-Timeout) exceeded"},
+    }
+)
+async def get_latext_from_images(
+    request: Request,
+    files: List[UploadFile] = File([], description="Images containing mathematical formulas"),
+    username: str = Depends(basic_auth),
+    deadline: Deadline = Depends(CancellationService.get_deadline)
+) -> LatexBatchResponse:
+    """Extract LaTeX formulas from several images, in upload order"""
+    try:
+        internal_files = await FileService.batch_from_request(request, files)
+        latex_results = await CancellationService.run(
+            request, Pix2TextService.recognize_formulas(internal_files, deadline), deadline
+        )
+
+        results = [
+            LatexResponse(latex=latex_result, status="success", message="LaTeX formula extracted successfully")
+            if latex_result and latex_result.strip()
+            else LatexResponse(latex="", status="error", message="No formula detected in the image")
+            for latex_result in latex_results
+        ]
+
+        return LatexBatchResponse(
+            total=len(results),
+            successful=sum(1 for result in results if result.status == "success"),
+            results=results
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to extract LaTeX: {str(e)}"
+        )
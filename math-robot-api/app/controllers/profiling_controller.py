@@ -0,0 +1,52 @@
+from fastapi import Depends, APIRouter, status
+
+from app.services.auth_service import admin_auth
+from app.services.ort_profiling_service import OrtProfilingService
+from app.schemas.profiling_schema import CaptureRequest, ProfilingResponse
+
+router = APIRouter()
+
+@router.get(
+    "/profiling",
+    response_model=ProfilingResponse,
+    summary="ONNX Runtime Profiling",
+    description="""
+    Per-model resource accounting: resident memory added by loading each active version, the
+    process-wide resident memory delta across sampled inference calls (which includes whatever
+    other threads allocated meanwhile), and session timings of sampled calls (encoder vs. each
+    decoder step). Sampling is enabled with `ORT_PROFILING_SAMPLE_RATE`. Also includes the result
+    of the last operator capture per model.
+    """,
+    responses={
+        401: {"description": "Unauthorized - Invalid credentials"},
+        403: {"description": "Forbidden - Admin credentials required"},
+    }
+)
+async def get_profiling(username: str = Depends(admin_auth)) -> ProfilingResponse:
+    """Show sampled timings, memory and operator profiles"""
+    return ProfilingResponse(**OrtProfilingService.status())
+
+@router.post(
+    "/profiling/{kind}/capture",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ProfilingResponse,
+    summary="Capture an Operator Profile",
+    description="""
+    Load a copy of the active `pix2text` or `yolo` version with ONNX Runtime's profiler on and
+    replay a sampled `fraction` of requests on it, off the response path, until `samples` ran.
+    The profile is then aggregated per operator type and the copy unloaded. Poll `GET /profiling`
+    for the result. Fails with 409 while the model has a shadow version.
+    """,
+    responses={
+        202: {"description": "Capture started"},
+        400: {"description": "Bad Request - The active version does not run on ONNX Runtime"},
+        401: {"description": "Unauthorized - Invalid credentials"},
+        403: {"description": "Forbidden - Admin credentials required"},
+        404: {"description": "Not Found - Unknown model kind"},
+        409: {"description": "Conflict - A capture or shadow evaluation is already running"},
+    }
+)
+async def capture_profile(kind: str, body: CaptureRequest, username: str = Depends(admin_auth)) -> ProfilingResponse:
+    """Start an operator capture"""
+    OrtProfilingService.start_capture(kind, body.samples, body.fraction)
+    return ProfilingResponse(**OrtProfilingService.status())
@@ -1,9 +1,11 @@
-from fastapi import status, APIRouter
-from app.schemas.status_schema import HealthResponse
+from fastapi import status, APIRouter, Response
+from app.schemas.status_schema import HealthResponse, ReadinessResponse
+from app.services.ollama_service import OllamaService
+from app.services.readiness_service import ReadinessService
 
 router = APIRouter()
 
-# Health check endpoint
+# Health check (liveness) endpoint
 @router.get(
     "/health",
     response_model=HealthResponse,
@@ -12,5 +14,37 @@ router = APIRouter()
     response_description="Service status information"
 )
 async def health_check():
-    """Check if the service is running"""
-    return {"status": "healthy"}
\ No newline at end of file
+    """Check if the service is running, regardless of whether models have loaded"""
+    return {"status": "healthy"}
+
+# Readiness check endpoint
+@router.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    summary="Service Readiness Check",
+    response_description="Readiness and model residency information",
+    responses={
+        200: {"description": "Ready; status is 'cold' if the Ollama model is not loaded"},
+        503: {"description": "Service Unavailable - Models are still loading or Ollama is unreachable"},
+    }
+)
+async def readiness_check(response: Response):
+    """Check whether all models have loaded and whether the Ollama model is resident"""
+    components = ReadinessService.get_states()
+    residency = await OllamaService.get_residency()
+
+    if any(component["state"] == ReadinessService.FAILED for component in components.values()):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        service_status = "failed"
+    elif not ReadinessService.is_ready():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        service_status = "starting"
+    elif not residency["reachable"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        service_status = "unavailable"
+    elif not residency["resident"]:
+        service_status = "cold"
+    else:
+        service_status = "ready"
+
+    return {"status": service_status, "components": components, "ollama": residency}
@@ -0,0 +1,42 @@
+from fastapi import Depends, APIRouter, Query, HTTPException, status
+
+from app.config import config
+from app.services.auth_service import basic_auth
+from app.services.translation_job_service import TranslationJobService
+from app.schemas.translation_schema import TranslationResponse
+
+router = APIRouter()
+
+@router.get(
+    "/translations/{handle}",
+    response_model=TranslationResponse,
+    summary="Deferred Translation Result",
+    description="""
+    Fetch the Wolfram translation of a problem returned by `/pipeline` with `translation=lazy`.
+
+    Pass `wait` to long-poll: the request returns as soon as the translation finishes,
+    or after `wait` seconds with the current status.
+    """,
+    response_description="Status and result of the translation",
+    responses={
+        200: {"description": "Translation state; status is pending, running, completed or failed"},
+        401: {"description": "Unauthorized - Invalid credentials"},
+        404: {"description": "Not Found - Unknown or expired handle"},
+    }
+)
+async def get_translation(
+    handle: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the translation to finish"),
+    username: str = Depends(basic_auth)
+) -> TranslationResponse:
+    """
+    Get a deferred translation.
+
+    - **handle**: translation_handle from a pipeline result (required)
+    - **wait**: long-poll for up to this many seconds (capped by TRANSLATION_MAX_WAIT)
+    """
+    job = await TranslationJobService.get(handle, wait=min(wait, config.TRANSLATION_MAX_WAIT))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown or expired translation handle")
+
+    return TranslationResponse(**job)
@@ -1,27 +1,45 @@
-from fastapi import Depends, APIRouter, UploadFile, File, Response, HTTPException, status
+from typing import Optional
+from fastapi import Depends, APIRouter, Request, UploadFile, File, Response, HTTPException, status
 import zipfile
 import io
 from app.services.auth_service import basic_auth
+from app.services.readiness_service import ReadinessService
+from app.services.scheduler_service import SchedulerService
 from app.services.file_service import FileService
 from app.services.whiteboard_processor_service import WhiteboardProcessorService
+from app.services.cancellation_service import CancellationService
+from app.models.deadline_model import Deadline
 
 router = APIRouter()
 
 @router.post(
     "/whiteboard/problems/{target_regions}",
+    dependencies=[
+        Depends(ReadinessService.require("whiteboard_processor")),
+        Depends(SchedulerService.admit(SchedulerService.INTERACTIVE)),
+    ],
     summary="Extract Mathematical Problems from Whiteboard",
+    description="""
+    Extract individual problems from a whiteboard image, uploaded as multipart/form-data or sent
+    as the raw request body (`application/octet-stream` or `image/*`, optional `X-Filename` header).
+    """,
+    openapi_extra=FileService.RAW_IMAGE_OPENAPI,
     responses={
         200: {"description": "Successfully extracted mathematical problems"},
         401: {"description": "Unauthorized - Invalid credentials"},
         400: {"description": "Bad Request - Invalid file type or no problems detected"},
         415: {"description": "Unsupported Media Type - File must be an image"},
+        503: {"description": "Service Unavailable - Models are still loading or the server is overloaded (see Retry-After)"},
         500: {"description": "Internal Server Error - Failed to process image"},
+        504: {"description": "Gateway Timeout - Request deadline (X-Request-Timeout) exceeded"},
     }
 )
 async def extract_whiteboard_problems(
     target_regions: int,
-    file: UploadFile = File(..., description="Whiteboard image containing mathematical problems"),
-    username: str = Depends(basic_auth)
+    request: Request,
+    file: Optional[UploadFile] = File(None, description="Whiteboard image containing mathematical problems (or send the raw image as the body)"),
+    username: str = Depends(basic_auth),
+    deadline: Deadline = Depends(CancellationService.get_deadline)
 ) -> Response:
     """Extract individual mathematical problems from a whiteboard image"""
     try:
@@ -29,8 +47,12 @@ async def extract_whiteboard_problems(
         if target_regions > 20 or target_regions < 1:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="target_regions should be betwwen 1 and 20")
 
-        internal_file = await FileService.validate_and_convert(file)
-        problem_files = await WhiteboardProcessorService.extract_problems(internal_file, target_regions=target_regions)
+        internal_file = await FileService.from_request(request, file)
+        problem_files = await CancellationService.run(
+            request,
+            WhiteboardProcessorService.extract_problems(internal_file, target_regions=target_regions, deadline=deadline),
+            deadline
+        )
         
         # Create ZIP response
         zip_buffer = io.BytesIO()
@@ -42,7 +64,7 @@ async def extract_whiteboard_problems(
         zip_buffer.seek(0)
         
         # Create filename
-        original_name = file.filename.rsplit('.', 1)[0] if '.' in file.filename else file.filename
+        original_name = internal_file.name.rsplit('.', 1)[0] if '.' in internal_file.name else internal_file.name
         zip_filename = f"{original_name}_extracted_problems.zip"
         
         return Response(
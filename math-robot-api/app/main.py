@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_fastapi_instrumentator import Instrumentator
@@ -8,6 +9,11 @@ from app.middlewares.log_middleware import LogMiddleware
 from app.services.pix2text_service import Pix2TextService
 from app.services.ollama_service import OllamaService
 from app.services.whiteboard_processor_service import WhiteboardProcessorService
+from app.services.readiness_service import ReadinessService
+from app.services.translation_job_service import TranslationJobService
+from app.services.ort_profiling_service import OrtProfilingService
+from app.services.autotune_service import AutotuneService
+from app.controllers import router
 
 def create_app() -> FastAPI:
     # Initialize FastAPI
@@ -43,20 +49,32 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Include routers; model-backed endpoints answer 503 until their models are ready
+    app.include_router(router)
+
     @app.on_event("startup")
-    async def startup_event():     
-        pix2text_service = await Pix2TextService.get_instance()
-        await pix2text_service.init()
+    async def startup_event():
+        # Load models concurrently in the background so liveness checks answer immediately
+        inits = {
+            "pix2text": Pix2TextService.init,
+            "ollama": OllamaService.init,
+            "whiteboard_processor": WhiteboardProcessorService.init,
+        }
+        ReadinessService.register("autotune", *inits)
 
-        ollama_service = await OllamaService.get_instance()
-        await ollama_service.init()
+        async def startup():
+            # Models are loaded with the tuned thread counts, so tuning comes first
+            await ReadinessService.run("autotune", AutotuneService.init)
+            await ReadinessService.run_all(inits)
 
-        whiteboard_processor_service = await WhiteboardProcessorService.get_instance()
-        await whiteboard_processor_service.init()
+        app.state.startup_task = asyncio.create_task(startup())
 
-        from app.controllers import router
-        # Include routers
-        app.include_router(router)
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        app.state.startup_task.cancel()
+        await TranslationJobService.shutdown()
+        await OrtProfilingService.shutdown()
+        await OllamaService.shutdown()
 
     return app
 
@@ -0,0 +1,35 @@
+import time
+from typing import Optional
+from fastapi import HTTPException
+
+
+class DeadlineExceeded(HTTPException):
+    """Raised when a request runs past its deadline."""
+    def __init__(self, stage: str):
+        super().__init__(status_code=504, detail=f"Request deadline exceeded during {stage}")
+
+
+class Deadline:
+    """
+    Absolute per-request deadline, threaded through services so every stage
+    can stop early instead of finishing work nobody will receive.
+    """
+    def __init__(self, timeout: float):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if the deadline has passed"""
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+    @staticmethod
+    def check_optional(deadline: Optional["Deadline"], stage: str) -> None:
+        if deadline is not None:
+            deadline.check(stage)
@@ -4,4 +4,10 @@ class LatexResponse(BaseModel):
     """Response model for LaTeX extraction"""
     latex: str
     status: str = "success"
-    message: str = "LaTeX formula extracted successfully"
\ No newline at end of file
+    message: str = "LaTeX formula extracted successfully"
+
+class LatexBatchResponse(BaseModel):
+    """Response model for batched LaTeX extraction, results in upload order"""
+    total: int
+    successful: int
+    results: list[LatexResponse]
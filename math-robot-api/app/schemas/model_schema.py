@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+
+class ModelVersionRequest(BaseModel):
+    """Model version to load: HuggingFace name or path (pix2text), weights or .onnx path (yolo), model tag (ollama)"""
+    version: str
+
+class ShadowRequest(BaseModel):
+    """Model version to evaluate on a sampled fraction of traffic"""
+    version: str
+    fraction: float = Field(0.1, gt=0, le=1)
+
+class ModelVersionState(BaseModel):
+    version: str
+    loaded_at: float
+    in_flight: int
+    memory_bytes: int = 0
+
+class LoadingState(BaseModel):
+    version: str
+    role: str
+    started_at: float
+
+class ShadowState(ModelVersionState):
+    """Shadow version with its agreement rate and mean latencies over compared samples"""
+    fraction: float
+    samples: int
+    errors: int
+    agreement: Optional[float] = None
+    primary_latency: Optional[float] = None
+    shadow_latency: Optional[float] = None
+
+class ModelKindState(BaseModel):
+    active: Optional[ModelVersionState] = None
+    loading: Optional[LoadingState] = None
+    error: Optional[str] = None
+    retiring: List[ModelVersionState] = []
+    shadow: Optional[ShadowState] = None
+
+class ModelsResponse(BaseModel):
+    """Response model for the model registry state"""
+    models: Dict[str, ModelKindState]
@@ -7,6 +7,8 @@ class ProblemResult(BaseModel):
     filename: str
     latex_raw: Optional[str] = None
     latex_filtered: Optional[str] = None
+    translation_status: Optional[str] = None
+    translation_handle: Optional[str] = None
     error: Optional[str] = None
     success: bool
 
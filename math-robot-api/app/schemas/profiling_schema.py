@@ -0,0 +1,53 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+
+class CaptureRequest(BaseModel):
+    """Operator capture: profile `samples` requests, replaying a `fraction` of traffic"""
+    samples: int = Field(20, ge=1, le=1000)
+    fraction: float = Field(0.25, gt=0, le=1)
+
+class SessionTimings(BaseModel):
+    """Sampled session runs; step_ms[i] is the mean time of the i-th run within a call (decode step i)"""
+    calls: int
+    runs_per_call: float
+    mean_ms: float
+    max_ms: float
+    step_ms: List[float] = []
+
+class OperatorTiming(BaseModel):
+    op: str
+    calls: int
+    total_ms: float
+    per_run_ms: float
+    share: float
+
+class SessionProfile(BaseModel):
+    runs: int
+    mean_run_ms: Optional[float] = None
+    operators: List[OperatorTiming] = []
+
+class CaptureState(BaseModel):
+    status: str
+    version: str
+    samples: int
+    fraction: float
+    started_at: float
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    sessions: Dict[str, SessionProfile] = {}
+
+class ModelProfile(BaseModel):
+    version: Optional[str] = None
+    memory_bytes: int = 0
+    samples: int = 0
+    sampled_version: Optional[str] = None
+    memory_growth_last: int = Field(0, description="Process-wide RSS delta across the last sampled call, other threads included")
+    memory_growth_max: int = Field(0, description="Largest process-wide RSS delta across a sampled call, other threads included")
+    sessions: Dict[str, SessionTimings] = {}
+    capture: Optional[CaptureState] = None
+
+class ProfilingResponse(BaseModel):
+    """Response model for ONNX Runtime profiling and memory accounting"""
+    sample_rate: float
+    resident_memory_bytes: int
+    models: Dict[str, ModelProfile]
@@ -1,4 +1,39 @@
 from pydantic import BaseModel
+from typing import Optional, Dict, List
 
 class HealthResponse(BaseModel):
-    status: str
\ No newline at end of file
+    status: str
+
+class OllamaBackendResidency(BaseModel):
+    """Health, circuit state and model residency of a single Ollama backend"""
+    url: str
+    healthy: bool
+    circuit: str
+    outstanding: int
+    reachable: bool
+    resident: bool
+    expires_at: Optional[str] = None
+    size_vram: Optional[int] = None
+
+class OllamaResidency(BaseModel):
+    """Residency of the Ollama model as reported by /api/ps"""
+    model: str
+    reachable: bool
+    resident: bool
+    expires_at: Optional[str] = None
+    size_vram: Optional[int] = None
+    last_load_duration: Optional[float] = None
+    last_cold_load_at: Optional[float] = None
+    backends: List[OllamaBackendResidency] = []
+
+class ComponentState(BaseModel):
+    """Startup state of a single model component"""
+    state: str
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+class ReadinessResponse(BaseModel):
+    """Response model for the readiness check"""
+    status: str
+    components: Dict[str, ComponentState]
+    ollama: OllamaResidency
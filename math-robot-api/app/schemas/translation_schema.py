@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class TranslationResponse(BaseModel):
+    """State of a deferred LaTeX → Wolfram translation"""
+    handle: str
+    status: str
+    latex_raw: str
+    latex_filtered: Optional[str] = None
+    error: Optional[str] = None
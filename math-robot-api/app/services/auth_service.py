@@ -1,16 +1,42 @@
-from fastapi import HTTPException, Depends, status
+import base64
+import binascii
+from typing import Optional
+from fastapi import HTTPException, Depends, WebSocket, WebSocketException, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from app.config import config
 
+def _check_credentials(username: str, password: str) -> bool:
+    users = {config.BASIC_AUTH_USERNAME: config.BASIC_AUTH_PASSWORD, **config.BASIC_AUTH_USERS}
+    correct_password = users.get(username)
+    return correct_password is not None and password == correct_password
+
 def basic_auth(credentials: HTTPBasicCredentials = Depends(HTTPBasic())):
-    correct_username = config.BASIC_AUTH_USERNAME
-    correct_password = config.BASIC_AUTH_PASSWORD
-    
-    if (credentials.username != correct_username or 
-        credentials.password != correct_password):
+    if not _check_credentials(credentials.username, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect credentials",
             headers={"WWW-Authenticate": "Basic"},
         )
-    return credentials.username
\ No newline at end of file
+    return credentials.username
+
+def websocket_basic_auth(websocket: WebSocket) -> str:
+    """Basic auth for WebSocket handshakes, closing the connection on bad credentials"""
+    username: Optional[str] = None
+    password: Optional[str] = None
+
+    scheme, _, encoded = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "basic":
+        try:
+            username, _, password = base64.b64decode(encoded).decode("utf-8").partition(":")
+        except (binascii.Error, UnicodeDecodeError):
+            pass
+
+    if username is None or not _check_credentials(username, password):
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Incorrect credentials")
+    return username
+
+def admin_auth(username: str = Depends(basic_auth)):
+    """Operational endpoints are limited to the primary account; BASIC_AUTH_USERS tenants are rejected"""
+    if username != config.BASIC_AUTH_USERNAME:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin credentials required")
+    return username
@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import cv2
+import numpy as np
+from app.config import config
+from app.models.file_model import File
+from app.services.pix2text_service import Pix2TextService
+from app.services.whiteboard_processor_service import WhiteboardProcessorService
+from app.services.yolo_onnx_detector import YoloOnnxDetector
+
+logger = logging.getLogger(__name__)
+
+
+class AutotuneService:
+    """
+    Picks inference thread counts, request concurrency and the OCR batch size for the host.
+
+    Calibration benchmarks Pix2Text and the YOLO detector on sample images. Every
+    (intra-op threads × concurrent requests) combination that fits the available
+    cores is tried, so sessions never oversubscribe each other. The configuration
+    with the highest throughput whose p95 request latency stays within
+    AUTOTUNE_LATENCY_SLO wins; higher concurrency is not tried once a thread count
+    has missed the SLO. The result is written to AUTOTUNE_PATH together with
+    the host it was measured on, and later boots apply it without re-measuring.
+    Settings given explicitly in the environment always take precedence.
+    """
+
+    BATCH_SIZES = (1, 2, 4, 8)
+    MAX_CONCURRENCY = 16
+    # Crops per benchmark request, i.e. regions found on one whiteboard
+    CROPS_PER_REQUEST = 8
+    SAMPLE_FORMULAS = ("x^2+1=5", "3x-7=2", "2(x+4)=18", "y=2x+3", "a^2+b^2=c^2", "x/4=3", "5x+2=3x-6", "sqrt(x)=4")
+
+    @staticmethod
+    def _cores() -> int:
+        try:
+            return len(os.sched_getaffinity(0))
+        except AttributeError:
+            return os.cpu_count() or 1
+
+    @staticmethod
+    def _powers_of_two(limit: int) -> List[int]:
+        values = [1]
+        while values[-1] * 2 <= limit:
+            values.append(values[-1] * 2)
+        return values
+
+    @classmethod
+    def _host(cls) -> Dict[str, Any]:
+        """What a persisted result is only valid for."""
+        return {
+            "cores": cls._cores(),
+            "pix2text_model": config.PIX2TEXT_MODEL,
+            "yolo_model": WhiteboardProcessorService._initial_model_path(),
+        }
+
+    @classmethod
+    def _sample_images(cls) -> tuple:
+        """Crops for OCR and whiteboards for detection: AUTOTUNE_SAMPLES_DIR, or synthetic ones."""
+        if config.AUTOTUNE_SAMPLES_DIR:
+            images = [
+                cv2.imread(os.path.join(config.AUTOTUNE_SAMPLES_DIR, name))
+                for name in sorted(os.listdir(config.AUTOTUNE_SAMPLES_DIR))
+            ]
+            images = [img for img in images if img is not None]
+            if images:
+                crops = [images[i % len(images)] for i in range(cls.CROPS_PER_REQUEST)]
+                return crops, images
+            logger.warning(f"No images in {config.AUTOTUNE_SAMPLES_DIR}, using synthetic samples")
+
+        # Dark strokes on a light background, at crop sizes the detector typically produces
+        crops = []
+        for i, formula in enumerate(cls.SAMPLE_FORMULAS[:cls.CROPS_PER_REQUEST]):
+            crop = np.full((120 + 20 * (i % 3), 420 + 60 * (i % 4), 3), 235, dtype=np.uint8)
+            cv2.putText(crop, formula, (15, crop.shape[0] // 2 + 15), cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, 1.6, (40, 40, 40), 3)
+            crops.append(crop)
+
+        whiteboard = np.full((720, 1280, 3), 235, dtype=np.uint8)
+        for i, formula in enumerate(cls.SAMPLE_FORMULAS[:4]):
+            cv2.putText(whiteboard, formula, (80 + 600 * (i % 2), 200 + 300 * (i // 2)), cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, 2.2, (40, 40, 40), 4)
+        return crops, [whiteboard]
+
+    @staticmethod
+    async def _measure(run: Callable[[], Awaitable[Any]], concurrency: int, rounds: int) -> Dict[str, float]:
+        """Throughput (requests/s) and p95 latency of `concurrency` clients each sending `rounds` requests."""
+        latencies = []
+
+        async def client():
+            for _ in range(rounds):
+                start_time = time.perf_counter()
+                await run()
+                latencies.append(time.perf_counter() - start_time)
+
+        # Warm-up: first runs allocate arenas and buffers
+        await asyncio.gather(*(run() for _ in range(concurrency)))
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start_time
+
+        latencies.sort()
+        return {
+            "throughput": round(len(latencies) / elapsed, 3),
+            "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        }
+
+    @staticmethod
+    def _pick(results: List[Dict[str, Any]], slo: float) -> Dict[str, Any]:
+        """Highest throughput within the SLO, otherwise the lowest latency."""
+        within = [result for result in results if result["p95"] <= slo]
+        if within:
+            return max(within, key=lambda result: result["throughput"])
+        logger.warning(f"No configuration meets the {slo}s latency SLO, picking the fastest")
+        return min(results, key=lambda result: result["p95"])
+
+    @classmethod
+    async def _tune_pix2text(cls, crops: List[np.ndarray], slo: float, rounds: int) -> tuple:
+        cores = cls._cores()
+        files = [File(name=f"autotune_crop_{i + 1:02d}", data=crop, data_type='cv2') for i, crop in enumerate(crops)]
+        results = []
+
+        for threads in cls._powers_of_two(cores):
+            bundle = await Pix2TextService._load_version(config.PIX2TEXT_MODEL, intra_op_threads=threads)
+            try:
+                for concurrency in cls._powers_of_two(min(cls.MAX_CONCURRENCY, cores // threads)):
+                    level = []
+                    for batch_size in cls.BATCH_SIZES:
+                        measured = await cls._measure(
+                            lambda: Pix2TextService._recognize_all(files, bundle, batch_size=batch_size),
+                            concurrency, rounds
+                        )
+                        result = {"threads": threads, "concurrency": concurrency, "batch_size": batch_size, **measured}
+                        logger.info(f"Pix2Text {result}")
+                        level.append(result)
+                    results.extend(level)
+
+                    # More concurrent requests only queue longer
+                    if min(result["p95"] for result in level) > slo:
+                        logger.info(f"Pix2Text with {threads} threads misses the SLO at concurrency {concurrency}, stopping")
+                        break
+            finally:
+                del bundle
+                gc.collect()
+
+        return cls._pick(results, slo), results
+
+    @classmethod
+    async def _tune_yolo(cls, whiteboards: List[np.ndarray], concurrency: int, slo: float, rounds: int) -> tuple:
+        model_path = WhiteboardProcessorService._initial_model_path()
+        if not (model_path and model_path.endswith(".onnx")):
+            logger.info("YOLO runs on ultralytics, skipping detector thread tuning")
+            return None, []
+
+        results = []
+        for threads in cls._powers_of_two(max(1, cls._cores() // concurrency)):
+            model = await asyncio.to_thread(WhiteboardProcessorService._load, model_path, intra_op_threads=threads)
+            try:
+                async def detect_all():
+                    for img in whiteboards:
+                        await WhiteboardProcessorService._predict_boxes(img, model)
+
+                measured = await cls._measure(detect_all, concurrency, rounds)
+                result = {"threads": threads, "concurrency": concurrency, **measured}
+                logger.info(f"YOLO {result}")
+                results.append(result)
+            finally:
+                del model
+                gc.collect()
+
+        return cls._pick(results, slo), results
+
+    @classmethod
+    async def calibrate(cls, slo: Optional[float] = None, rounds: Optional[int] = None) -> Dict[str, Any]:
+        """Benchmark the candidate configurations and return the chosen settings."""
+        slo = slo or config.AUTOTUNE_LATENCY_SLO
+        rounds = rounds or config.AUTOTUNE_ROUNDS
+        crops, whiteboards = cls._sample_images()
+        logger.info(f"Calibrating inference settings on {cls._cores()} cores (p95 SLO {slo}s)")
+
+        # OCR dominates request time, so it decides the concurrency the detector is tuned for
+        pix2text, pix2text_results = await cls._tune_pix2text(crops, slo, rounds)
+        yolo, yolo_results = await cls._tune_yolo(whiteboards, pix2text["concurrency"], slo, rounds)
+
+        settings = {
+            "PIX2TEXT_INTRA_OP_THREADS": pix2text["threads"],
+            "PIX2TEXT_BATCH_SIZE": pix2text["batch_size"],
+            "SCHEDULER_MAX_CONCURRENCY": pix2text["concurrency"],
+        }
+        if yolo is not None:
+            settings["YOLO_INTRA_OP_THREADS"] = yolo["threads"]
+
+        return {
+            "host": cls._host(),
+            "tuned_at": time.time(),
+            "latency_slo": slo,
+            "settings": settings,
+            "results": {"pix2text": pix2text_results, "yolo": yolo_results},
+        }
+
+    @staticmethod
+    def save(tuning: Dict[str, Any], path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write-then-rename so a crash mid-write never leaves a truncated file behind
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(tuning, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+        logger.info(f"Saved tuned settings to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> Optional[Dict[str, Any]]:
+        """Persisted tuning, or None if missing, unreadable or measured on a different host."""
+        try:
+            with open(path) as f:
+                tuning = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable tuning file {path}: {e}")
+            return None
+
+        if tuning.get("host") != cls._host():
+            logger.info(f"Tuning in {path} was measured for {tuning.get('host')}, not this host")
+            return None
+        return tuning
+
+    @staticmethod
+    def apply(settings: Dict[str, Any]) -> None:
+        for key, value in settings.items():
+            if os.getenv(key):
+                logger.info(f"Keeping {key}={getattr(config, key)} from the environment (tuned: {value})")
+                continue
+            setattr(config, key, value)
+            logger.info(f"Tuned {key}={value}")
+
+    @classmethod
+    async def init(cls) -> None:
+        """Apply persisted settings, calibrating first if enabled and none fit this host."""
+        tuning = cls.load(config.AUTOTUNE_PATH)
+        if tuning is None and config.AUTOTUNE_ON_STARTUP:
+            try:
+                tuning = await asyncio.wait_for(cls.calibrate(), config.AUTOTUNE_TIMEOUT)
+                cls.save(tuning, config.AUTOTUNE_PATH)
+            except asyncio.TimeoutError:
+                logger.error(f"Calibration took longer than {config.AUTOTUNE_TIMEOUT}s, keeping default inference settings")
+                return
+            except Exception as e:
+                # Not worth failing the boot over: the defaults still work
+                logger.error(f"Calibration failed, keeping default inference settings: {e}")
+                return
+        if tuning is not None:
+            cls.apply(tuning["settings"])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Benchmark and persist inference settings for this host")
+    parser.add_argument("--output", default=config.AUTOTUNE_PATH, help="Where to write the tuned settings")
+    parser.add_argument("--slo", type=float, default=config.AUTOTUNE_LATENCY_SLO, help="p95 request latency limit (s)")
+    parser.add_argument("--rounds", type=int, default=config.AUTOTUNE_ROUNDS, help="Requests per client per candidate")
+    args = parser.parse_args()
+
+    result = asyncio.run(AutotuneService.calibrate(args.slo, args.rounds))
+    AutotuneService.save(result, args.output)
+    print(json.dumps(result["settings"], indent=2))
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Any, Awaitable
+from fastapi import Request, HTTPException
+from prometheus_client import Counter
+from app.config import config
+from app.models.deadline_model import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+CANCELLED_TOTAL = Counter(
+    "requests_cancelled_total",
+    "Requests whose work was cancelled before completion",
+    ["reason"]
+)
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+class CancellationService:
+    """Per-request deadlines and cancellation of work for clients that went away"""
+
+    POLL_INTERVAL = 0.1
+
+    @staticmethod
+    def get_deadline(request: Request) -> Deadline:
+        """
+        FastAPI dependency building the request deadline from the X-Request-Timeout
+        header (seconds), capped by and defaulting to REQUEST_TIMEOUT.
+        """
+        timeout = config.REQUEST_TIMEOUT
+        header = request.headers.get(DEADLINE_HEADER)
+        if header:
+            try:
+                timeout = min(timeout, float(header))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid {DEADLINE_HEADER} header")
+            if timeout <= 0:
+                raise HTTPException(status_code=400, detail=f"{DEADLINE_HEADER} must be positive")
+        return Deadline(timeout)
+
+    @staticmethod
+    async def run(request: Request, work: Awaitable[Any], deadline: Deadline) -> Any:
+        """
+        Run work as a task, cancelling it when the client disconnects or the deadline
+        passes. Cancellation propagates into outstanding OCR batches and Ollama calls.
+        """
+        task = asyncio.ensure_future(work)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=min(CancellationService.POLL_INTERVAL, deadline.remaining()))
+                if task in done:
+                    return task.result()
+
+                if deadline.expired():
+                    CANCELLED_TOTAL.labels(reason="deadline").inc()
+                    logger.warning(f"Deadline exceeded for {request.method} {request.url.path}, cancelling work")
+                    raise DeadlineExceeded("request processing")
+
+                if await request.is_disconnected():
+                    CANCELLED_TOTAL.labels(reason="disconnect").inc()
+                    logger.warning(f"Client disconnected from {request.method} {request.url.path}, cancelling work")
+                    raise HTTPException(status_code=499, detail="Client closed request")
+        finally:
+            if not task.done():
+                task.cancel()
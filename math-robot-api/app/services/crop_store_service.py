@@ -0,0 +1,378 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from prometheus_client import Counter, Gauge
+from app.config import config
+from app.models.file_model import File
+from app.services.model_registry_service import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+CROP_STORE_LOOKUPS_TOTAL = Counter(
+    "crop_store_lookups_total",
+    "Crop store lookups by outcome (hit, miss)",
+    ["outcome"]
+)
+CROP_STORE_ENTRIES = Gauge(
+    "crop_store_entries",
+    "Crops held in the persistent crop store"
+)
+
+
+class CropStore:
+    """
+    Persistent map from crop fingerprints to recognized LaTeX, shared by all workers.
+
+    A fingerprint is the ink bounding box of a crop, downscaled, mean-centred and
+    L2-normalized, so lighting and margins matter less than the strokes. Fingerprints
+    live in a memory-mapped float16 array next to 64-bit random-hyperplane signatures.
+    A lookup scans the signatures by Hamming distance and compares the few closest
+    fingerprints exactly. Opening the store maps the files without reading them, and
+    every worker process shares the same pages.
+
+    The fingerprint is too coarse to tell glyphs apart in long expressions: a single
+    changed digit still scores above 0.98. A candidate is therefore only a hit if its
+    ink mask, kept at MASK_HEIGHT pixels and the crop's own aspect ratio, lies within
+    one pixel of the query's everywhere (Hausdorff distance ≤ 1). Re-uploads and crops
+    that differ in margins, lighting or compression usually hit; rescaled or
+    re-photographed crops are misses.
+
+    Each result records the OCR and translation model versions that produced it. After
+    a model swap a crop OCR'd by another version is a miss, and one translated by
+    another version comes back without its translation, so the new model sees the
+    traffic again.
+
+    Results, masks and recency live in SQLite (WAL), which also serializes writers
+    across processes. Once the store is full, the least recently used slot is
+    overwritten. Readers take no lock: each row holds a checksum of its fingerprint,
+    so a slot being rewritten is seen as a miss instead of a wrong answer.
+    """
+
+    WIDTH, HEIGHT = 96, 24
+    DIM = WIDTH * HEIGHT
+    SIGNATURE_BITS = 64
+    # Fixed so every process and every boot hashes into the same signature space
+    SEED = 20240501
+    MAX_HAMMING = 14
+    MAX_CANDIDATES = 32
+    # Different aspect ratios are different expressions, however similar the pixels
+    MAX_ASPECT_RATIO = 1.25
+    # Tall enough that the one-pixel tolerance is finer than what tells digits apart (8 vs 0)
+    MASK_HEIGHT = 32
+    MAX_MASK_WIDTH = 1024
+    # Bumped when the entries table changes; the store then starts empty
+    SCHEMA_VERSION = 2
+    # Hits refresh recency at most this often, to keep readers from queueing on the write lock
+    TOUCH_INTERVAL = 60.0
+
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.capacity = capacity
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._planes = np.random.default_rng(self.SEED).standard_normal((self.SIGNATURE_BITS, self.DIM)).astype(np.float32)
+
+        os.makedirs(path, exist_ok=True)
+        self._initialize()
+        self.vectors = np.memmap(self._file("vectors.f16"), dtype=np.float16, mode="r+", shape=(capacity, self.DIM))
+        self.signatures = np.memmap(self._file("signatures.u64"), dtype=np.uint64, mode="r+", shape=(capacity,))
+        self.occupied = np.memmap(self._file("occupied.u8"), dtype=np.uint8, mode="r+", shape=(capacity,))
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._file("entries.sqlite3"), timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _initialize(self) -> None:
+        """Create the files, or recreate them if they were built with another layout."""
+        layout = f"{self.capacity}x{self.DIM}/{self.SIGNATURE_BITS}/{self.SEED}/mask{self.MASK_HEIGHT}/v{self.SCHEMA_VERSION}"
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = connection.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+            files_exist = all(os.path.exists(self._file(name)) for name in ("vectors.f16", "signatures.u64", "occupied.u8"))
+            reset = row is None or row[0] != layout or not files_exist
+            if reset:
+                if row is not None:
+                    logger.warning(f"Crop store layout changed ({row[0]} → {layout}), starting empty")
+                # Recreated rather than emptied: the columns may have changed too
+                connection.execute("DROP TABLE IF EXISTS entries")
+
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (slot INTEGER PRIMARY KEY, checksum TEXT, aspect REAL, "
+                "mask BLOB, mask_width INTEGER, latex_raw TEXT, latex_filtered TEXT, ocr_version TEXT, "
+                "translation_version TEXT, created_at REAL, last_used REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+            if reset:
+                for name, size in (("vectors.f16", self.capacity * self.DIM * 2),
+                                   ("signatures.u64", self.capacity * 8),
+                                   ("occupied.u8", self.capacity)):
+                    with open(self._file(name), "wb") as f:
+                        f.truncate(size)
+                connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('layout', ?)", (layout,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    @classmethod
+    def fingerprint(cls, img: np.ndarray) -> Optional[Tuple[np.ndarray, float, np.ndarray]]:
+        """Unit-norm feature vector, aspect ratio and ink mask of the ink in a crop, None if blank."""
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        gray = cv2.GaussianBlur(gray, (3, 3), 0)
+        _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        points = cv2.findNonZero(mask)
+        if points is None:
+            return None
+
+        x, y, w, h = cv2.boundingRect(points)
+        ink = 255 - gray[y:y + h, x:x + w]
+        vector = cv2.resize(ink, (cls.WIDTH, cls.HEIGHT), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        vector -= vector.mean()
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            return None
+
+        mask_width = max(1, min(cls.MAX_MASK_WIDTH, round(cls.MASK_HEIGHT * w / h)))
+        ink_mask = cv2.resize(mask[y:y + h, x:x + w], (mask_width, cls.MASK_HEIGHT), interpolation=cv2.INTER_AREA) > 96
+        return vector / norm, w / h, ink_mask
+
+    @classmethod
+    def _same_strokes(cls, query: np.ndarray, stored: np.ndarray) -> bool:
+        """Whether every ink pixel of each mask is within one pixel of ink in the other."""
+        if stored.shape != query.shape:
+            stored = cv2.resize(stored.astype(np.uint8) * 255, (query.shape[1], query.shape[0]), interpolation=cv2.INTER_AREA) > 96
+        kernel = np.ones((3, 3), np.uint8)
+        near_query = cv2.dilate(query.astype(np.uint8), kernel) > 0
+        near_stored = cv2.dilate(stored.astype(np.uint8), kernel) > 0
+        return not (query & ~near_stored).any() and not (stored & ~near_query).any()
+
+    @classmethod
+    def _unpack_mask(cls, packed: bytes, width: int) -> np.ndarray:
+        bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=cls.MASK_HEIGHT * width)
+        return bits.reshape(cls.MASK_HEIGHT, width).astype(bool)
+
+    def _signature(self, vector: np.ndarray) -> np.uint64:
+        return np.packbits(self._planes @ vector > 0).view(np.uint64)[0]
+
+    @staticmethod
+    def _checksum(vector: np.ndarray) -> str:
+        return hashlib.blake2b(vector.tobytes(), digest_size=8).hexdigest()
+
+    @staticmethod
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        if hasattr(np, "bitwise_count"):
+            return np.bitwise_count(values)
+        return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+    def _nearest(self, vector: np.ndarray, aspect: float, ink_mask: np.ndarray,
+                 min_similarity: float) -> Optional[Tuple[int, float, tuple]]:
+        """Closest stored crop above the similarity threshold with the same strokes: (slot, similarity, row)."""
+        distances = self._popcount(self.signatures ^ self._signature(vector))
+        distances[self.occupied == 0] = self.SIGNATURE_BITS + 1
+        candidates = np.flatnonzero(distances <= self.MAX_HAMMING)
+        if candidates.size == 0:
+            return None
+        if candidates.size > self.MAX_CANDIDATES:
+            candidates = candidates[np.argpartition(distances[candidates], self.MAX_CANDIDATES)[:self.MAX_CANDIDATES]]
+
+        # One copy: similarity and checksum must come from the same read of a slot
+        stored = np.array(self.vectors[candidates])
+        similarities = stored.astype(np.float32) @ vector
+        for i in np.argsort(similarities)[::-1]:
+            if similarities[i] < min_similarity:
+                return None
+            slot = int(candidates[i])
+            row = self._connection().execute(
+                "SELECT checksum, aspect, mask, mask_width, latex_raw, latex_filtered, last_used, ocr_version, "
+                "translation_version FROM entries WHERE slot = ?",
+                (slot,)
+            ).fetchone()
+            # A concurrent writer may be replacing this slot
+            if row is None or row[0] != self._checksum(stored[i]):
+                continue
+            if abs(math.log(aspect / row[1])) > math.log(self.MAX_ASPECT_RATIO):
+                continue
+            if not self._same_strokes(ink_mask, self._unpack_mask(row[2], row[3])):
+                continue
+            return slot, float(similarities[i]), row
+        return None
+
+    def lookup(self, img: np.ndarray, min_similarity: float, ocr_version: str,
+               translation_version: str) -> Optional[Dict[str, Any]]:
+        """Stored result for a crop, None if there is none from this OCR version."""
+        fingerprint = self.fingerprint(img)
+        if fingerprint is None:
+            return None
+        vector, aspect, ink_mask = fingerprint
+
+        match = self._nearest(vector, aspect, ink_mask, min_similarity)
+        if match is None:
+            return None
+        slot, similarity, (_, _, _, _, latex_raw, latex_filtered, last_used, stored_ocr, stored_translation) = match
+        if stored_ocr != ocr_version:
+            return None
+        if stored_translation != translation_version:
+            latex_filtered = None
+
+        now = time.time()
+        if now - last_used > self.TOUCH_INTERVAL:
+            try:
+                self._connection().execute("UPDATE entries SET last_used = ? WHERE slot = ?", (now, slot))
+            except sqlite3.OperationalError:
+                pass
+        return {"slot": slot, "similarity": similarity, "latex_raw": latex_raw, "latex_filtered": latex_filtered}
+
+    def put(self, img: np.ndarray, latex_raw: str, latex_filtered: Optional[str], min_similarity: float,
+            ocr_version: str, translation_version: str) -> None:
+        """
+        Store a result. A matching crop from another OCR version is replaced; one from the
+        same OCR version only gets the translation, if it lacks one or has an outdated one.
+        """
+        fingerprint = self.fingerprint(img)
+        if fingerprint is None:
+            return
+        vector, aspect, ink_mask = fingerprint
+        stored = vector.astype(np.float16)
+        now = time.time()
+
+        connection = self._connection()
+        with self._write_lock:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                match = self._nearest(vector, aspect, ink_mask, min_similarity)
+                if match is not None:
+                    slot, _, row = match
+                    if row[7] != ocr_version:
+                        connection.execute(
+                            "UPDATE entries SET latex_raw = ?, latex_filtered = ?, ocr_version = ?, translation_version = ?, "
+                            "last_used = ? WHERE slot = ?",
+                            (latex_raw, latex_filtered, ocr_version, translation_version, now, slot)
+                        )
+                    elif latex_filtered is not None and (row[5] is None or row[8] != translation_version):
+                        connection.execute(
+                            "UPDATE entries SET latex_filtered = ?, translation_version = ?, last_used = ? WHERE slot = ?",
+                            (latex_filtered, translation_version, now, slot)
+                        )
+                    else:
+                        connection.execute("UPDATE entries SET last_used = ? WHERE slot = ?", (now, slot))
+                    connection.execute("COMMIT")
+                    return
+
+                free = np.flatnonzero(self.occupied == 0)
+                if free.size:
+                    slot = int(free[0])
+                else:
+                    slot = connection.execute("SELECT slot FROM entries ORDER BY last_used LIMIT 1").fetchone()[0]
+
+                # Hide the slot from readers while it is rewritten
+                self.occupied[slot] = 0
+                self.vectors[slot] = stored
+                self.signatures[slot] = self._signature(stored.astype(np.float32))
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries (slot, checksum, aspect, mask, mask_width, latex_raw, latex_filtered, "
+                    "ocr_version, translation_version, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (slot, self._checksum(stored), aspect, np.packbits(ink_mask).tobytes(), ink_mask.shape[1],
+                     latex_raw, latex_filtered, ocr_version, translation_version, now, now)
+                )
+                self.occupied[slot] = 1
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def size(self) -> int:
+        return int(np.count_nonzero(self.occupied))
+
+
+class CropStoreService:
+    """
+    Remembers OCR and translation results per crop across runs, so a problem that
+    comes back on a later day (or to another worker) skips OCR and the LLM.
+    Enabled with CROP_STORE_ENABLED.
+    """
+
+    _store: Optional[CropStore] = None
+    _lock = threading.Lock()
+    _tasks: set = set()
+
+    @classmethod
+    def _get_store(cls) -> Optional[CropStore]:
+        if not config.CROP_STORE_ENABLED:
+            return None
+        with cls._lock:
+            if cls._store is None:
+                cls._store = CropStore(config.CROP_STORE_PATH, config.CROP_STORE_CAPACITY)
+                logger.info(f"Opened crop store at {config.CROP_STORE_PATH} ({cls._store.size()} crops)")
+        return cls._store
+
+    @staticmethod
+    def versions() -> Tuple[str, str]:
+        """Active pix2text and ollama versions, which stored results are checked against."""
+        ocr, translation = ModelRegistry.active("pix2text"), ModelRegistry.active("ollama")
+        return (ocr.version if ocr is not None else "", translation.version if translation is not None else "")
+
+    @classmethod
+    async def lookup_many(cls, files: List[File], versions: Tuple[str, str]) -> List[Optional[Dict[str, Any]]]:
+        """Stored result per crop, None where there is no close enough match from these versions."""
+        if not config.CROP_STORE_ENABLED:
+            return [None] * len(files)
+
+        images = [await file.to_cv2() for file in files]
+
+        def lookup_all() -> List[Optional[Dict[str, Any]]]:
+            store = cls._get_store()
+            return [store.lookup(img, config.CROP_STORE_MIN_SIMILARITY, *versions) for img in images]
+
+        try:
+            entries = await asyncio.to_thread(lookup_all)
+        except Exception as e:
+            logger.warning(f"Crop store lookup failed: {e}")
+            return [None] * len(files)
+
+        for file, entry in zip(files, entries):
+            CROP_STORE_LOOKUPS_TOTAL.labels(outcome="miss" if entry is None else "hit").inc()
+            if entry is not None:
+                logger.info(f"Crop store hit for {file.name} (similarity {entry['similarity']:.3f}): {entry['latex_raw']}")
+        return entries
+
+    @classmethod
+    def remember(cls, file: File, latex_raw: str, latex_filtered: Optional[str], versions: Tuple[str, str]) -> None:
+        """Store a result in the background; the response does not wait for the write."""
+        if not config.CROP_STORE_ENABLED:
+            return
+
+        async def write() -> None:
+            img = await file.to_cv2()
+
+            def put() -> None:
+                store = cls._get_store()
+                store.put(img, latex_raw, latex_filtered, config.CROP_STORE_MIN_SIMILARITY, *versions)
+                CROP_STORE_ENTRIES.set(store.size())
+
+            try:
+                await asyncio.to_thread(put)
+            except Exception as e:
+                logger.warning(f"Failed to store crop {file.name}: {e}")
+
+        task = asyncio.ensure_future(write())
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
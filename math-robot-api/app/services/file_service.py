@@ -1,5 +1,7 @@
 import logging
-from fastapi import UploadFile, HTTPException
+import struct
+from typing import List, Optional
+from fastapi import Request, UploadFile, HTTPException, status
 from app.models.file_model import File
 
 logger = logging.getLogger(__name__)
@@ -10,6 +12,31 @@ class FileService:
     SUPPORTED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.bmp'}
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
+    # Raw bodies: a single image, or a batch of images each prefixed with its length
+    # as a 4-byte big-endian unsigned integer
+    RAW_CONTENT_TYPE = 'application/octet-stream'
+    BATCH_CONTENT_TYPE = 'application/x-image-batch'
+    SUPPORTED_CONTENT_TYPES = {'image/png', 'image/jpeg', 'image/webp', 'image/bmp', 'image/x-ms-bmp'}
+    MAX_BATCH_FILES = 32
+    MAX_BATCH_SIZE = 50 * 1024 * 1024  # 50MB
+
+    # Documents the raw alternatives next to the multipart form in OpenAPI (merged into the operation)
+    RAW_IMAGE_OPENAPI = {
+        "requestBody": {
+            "content": {
+                RAW_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+                "image/*": {"schema": {"type": "string", "format": "binary"}},
+            }
+        }
+    }
+    RAW_BATCH_OPENAPI = {
+        "requestBody": {
+            "content": {
+                BATCH_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            }
+        }
+    }
+
     @staticmethod
     async def validate_and_convert(uploaded_file: UploadFile) -> File:
         """
@@ -47,4 +74,132 @@ class FileService:
             raise
         except Exception as e:
             logger.error(f"File validation error: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
+
+    @staticmethod
+    async def from_request(request: Request, uploaded_file: Optional[UploadFile]) -> File:
+        """
+        Internal File from either a multipart upload or a raw image body
+        (application/octet-stream or image/*), read without multipart parsing.
+        """
+        if uploaded_file is not None:
+            return await FileService.validate_and_convert(uploaded_file)
+
+        content_type = FileService._content_type(request)
+        if content_type != FileService.RAW_CONTENT_TYPE and content_type not in FileService.SUPPORTED_CONTENT_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Send the image as multipart/form-data, {FileService.RAW_CONTENT_TYPE} or one of: {', '.join(sorted(FileService.SUPPORTED_CONTENT_TYPES))}"
+            )
+
+        content = await FileService._read_body(request, FileService.MAX_FILE_SIZE)
+        extension = FileService._sniff_extension(content)
+        name = request.headers.get("x-filename") or f"upload{extension}"
+
+        logger.info(f"Read raw image body: {name} ({len(content)} bytes)")
+        return File(name=name, data=content, data_type='bytes')
+
+    @staticmethod
+    async def batch_from_request(request: Request, uploaded_files: Optional[List[UploadFile]]) -> List[File]:
+        """
+        Internal Files from either a multipart upload with several files or a raw
+        length-prefixed batch body (application/x-image-batch).
+        """
+        if uploaded_files:
+            files = [await FileService.validate_and_convert(uploaded_file) for uploaded_file in uploaded_files]
+        else:
+            if FileService._content_type(request) != FileService.BATCH_CONTENT_TYPE:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail=f"Send the images as multipart/form-data or {FileService.BATCH_CONTENT_TYPE}"
+                )
+            content = await FileService._read_body(request, FileService.MAX_BATCH_SIZE)
+            files = FileService._split_batch(content)
+
+        if not files:
+            raise HTTPException(status_code=400, detail="No file provided")
+        if len(files) > FileService.MAX_BATCH_FILES:
+            raise HTTPException(status_code=400, detail=f"Too many files. Max: {FileService.MAX_BATCH_FILES}")
+        return files
+
+    @staticmethod
+    def _content_type(request: Request) -> str:
+        return request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    @staticmethod
+    async def _read_body(request: Request, limit: int) -> bytearray:
+        """
+        Stream the request body into a buffer, enforcing the size limit as chunks arrive.
+        With a Content-Length the buffer is allocated once up front.
+        """
+        too_large = HTTPException(status_code=400, detail=f"File too large. Max: {limit // (1024*1024)}MB")
+
+        declared = request.headers.get("content-length")
+        if declared is not None:
+            try:
+                size = int(declared)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid Content-Length")
+            if size > limit:
+                raise too_large
+
+            buffer = bytearray(size)
+            view = memoryview(buffer)
+            received = 0
+            async for chunk in request.stream():
+                if received + len(chunk) > size:
+                    raise HTTPException(status_code=400, detail="Body longer than Content-Length")
+                view[received:received + len(chunk)] = chunk
+                received += len(chunk)
+            view.release()
+
+            if received != size:
+                raise HTTPException(status_code=400, detail="Incomplete request body")
+        else:
+            # Chunked transfer: grow the buffer, still stopping as soon as the limit is crossed
+            buffer = bytearray()
+            async for chunk in request.stream():
+                if len(buffer) + len(chunk) > limit:
+                    raise too_large
+                buffer += chunk
+
+        if not buffer:
+            raise HTTPException(status_code=400, detail="No file provided")
+        return buffer
+
+    @staticmethod
+    def _sniff_extension(content: bytes) -> str:
+        """Image format from the magic bytes, since raw bodies carry no filename"""
+        if content[:8] == b'\x89PNG\r\n\x1a\n':
+            return '.png'
+        if content[:3] == b'\xff\xd8\xff':
+            return '.jpg'
+        if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+            return '.webp'
+        if content[:2] == b'BM':
+            return '.bmp'
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Allowed: {', '.join(FileService.SUPPORTED_EXTENSIONS)}")
+
+    @staticmethod
+    def _split_batch(content: bytearray) -> List[File]:
+        view = memoryview(content)
+        files = []
+        offset = 0
+
+        while offset < len(view):
+            if offset + 4 > len(view):
+                raise HTTPException(status_code=400, detail="Truncated batch: incomplete length prefix")
+            (length,) = struct.unpack_from(">I", view, offset)
+            offset += 4
+
+            if length == 0 or length > FileService.MAX_FILE_SIZE:
+                raise HTTPException(status_code=400, detail=f"Invalid image length {length} in batch")
+            if offset + length > len(view):
+                raise HTTPException(status_code=400, detail="Truncated batch: image shorter than its length prefix")
+
+            data = bytes(view[offset:offset + length])
+            offset += length
+            extension = FileService._sniff_extension(data)
+            files.append(File(name=f"batch_{len(files) + 1:02d}{extension}", data=data, data_type='bytes'))
+
+        return files
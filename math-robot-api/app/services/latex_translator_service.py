@@ -0,0 +1,500 @@
+import logging
+import re
+from typing import List, Dict, Any, Optional, Tuple
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+TRANSLATIONS_TOTAL = Counter(
+    "latex_translations_total",
+    "LaTeX to Wolfram translations by the path that produced them",
+    ["path"]
+)
+
+# Precedence of emitted Wolfram fragments, used to decide where parentheses are needed
+PREC_RELATION = 0
+PREC_SUM = 1
+PREC_PRODUCT = 2
+PREC_UNARY = 3
+PREC_POWER = 4
+PREC_ATOM = 5
+
+FUNCTIONS = {
+    "sin": "Sin", "cos": "Cos", "tan": "Tan", "cot": "Cot", "sec": "Sec", "csc": "Csc",
+    "arcsin": "ArcSin", "arccos": "ArcCos", "arctan": "ArcTan",
+    "sinh": "Sinh", "cosh": "Cosh", "tanh": "Tanh",
+    "ln": "Log", "lg": "Log10", "exp": "Exp", "log": "Log",
+}
+
+CONSTANTS = {"pi": "Pi", "infty": "Infinity"}
+
+GREEK = {
+    "alpha", "beta", "gamma", "delta", "epsilon", "varepsilon", "zeta", "eta", "theta",
+    "vartheta", "iota", "kappa", "lambda", "mu", "nu", "xi", "rho", "sigma", "tau",
+    "upsilon", "phi", "varphi", "chi", "psi", "omega",
+}
+
+MULTIPLY = {"cdot", "times", "ast"}
+RELATIONS = {"=": "==", "<": "<", ">": ">", "neq": "!=", "ne": "!=",
+             "leq": "<=", "le": "<=", "geq": ">=", "ge": ">="}
+IGNORED = {",", ";", ":", "!", " ", "quad", "qquad", "displaystyle", "limits", "left", "right"}
+BIG_OPERATORS = {"sum": "Sum", "prod": "Product"}
+
+TOKEN_RE = re.compile(r"\\([A-Za-z]+|.)|(\d+(?:\.\d+)?)|([A-Za-z])|(\S)")
+
+
+class UnsupportedLatex(Exception):
+    """Raised when the input leaves the subset the fast path can translate."""
+
+
+class _Parser:
+    """Recursive descent parser emitting Wolfram syntax for a subset of LaTeX."""
+
+    def __init__(self, latex: str):
+        self.tokens = self._tokenize(latex)
+        self.pos = 0
+        self.confidence = 1.0
+        self.integral_depth = 0
+        self.abs_depth = 0
+
+    @staticmethod
+    def _tokenize(latex: str) -> List[Tuple[str, str]]:
+        # Whitespace is insignificant in math mode, so "3 . 1 4" is the number 3.14
+        compact = re.sub(r"(?<=[\d.])\s+(?=[\d.])", "", latex.strip().strip("$"))
+        tokens = []
+        for match in TOKEN_RE.finditer(compact):
+            command, number, letter, symbol = match.groups()
+            if command is not None:
+                if command in IGNORED or command == "~":
+                    continue
+                tokens.append(("cmd", command))
+            elif number is not None:
+                tokens.append(("num", number))
+            elif letter is not None:
+                tokens.append(("letter", letter))
+            elif symbol != "~":
+                tokens.append(("sym", symbol))
+
+        # Trailing punctuation and a dangling "=" ("2+3=") carry no meaning
+        while tokens and tokens[-1] in (("sym", "."), ("sym", ","), ("sym", "="), ("sym", "?")):
+            tokens.pop()
+        return tokens
+
+    def parse(self) -> str:
+        if not self.tokens:
+            raise UnsupportedLatex("empty input")
+        text, _ = self._relation()
+        if self.pos != len(self.tokens):
+            raise UnsupportedLatex(f"unexpected token {self._peek()}")
+        return text
+
+    # Token helpers
+
+    def _peek(self, offset: int = 0) -> Optional[Tuple[str, str]]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def _next(self) -> Tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise UnsupportedLatex("unexpected end of input")
+        self.pos += 1
+        return token
+
+    def _accept(self, kind: str, value: str) -> bool:
+        if self._peek() == (kind, value):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, value: str) -> None:
+        if not self._accept(kind, value):
+            raise UnsupportedLatex(f"expected {value!r}, got {self._peek()}")
+
+    @staticmethod
+    def _wrap(fragment: Tuple[str, int], min_prec: int) -> str:
+        text, prec = fragment
+        return text if prec >= min_prec else f"({text})"
+
+    # Grammar
+
+    def _relation(self) -> Tuple[str, int]:
+        left = self._expression()
+        parts = [left[0]]
+        while True:
+            token = self._peek()
+            if token is None or token[1] not in RELATIONS or token[0] == "letter":
+                break
+            self.pos += 1
+            parts.append(RELATIONS[token[1]])
+            parts.append(self._expression()[0])
+        if len(parts) == 1:
+            return left
+        return " ".join(parts), PREC_RELATION
+
+    def _expression(self) -> Tuple[str, int]:
+        if self._accept("sym", "-"):
+            text = "-" + self._wrap(self._term(), PREC_UNARY)
+            result = (text, PREC_UNARY)
+        else:
+            self._accept("sym", "+")
+            result = self._term()
+
+        parts = [result[0]]
+        while self._peek() in (("sym", "+"), ("sym", "-")):
+            operator = self._next()[1]
+            parts.append(operator)
+            parts.append(self._wrap(self._term(), PREC_PRODUCT))
+        if len(parts) == 1:
+            return result
+        return " ".join(parts), PREC_SUM
+
+    def _term(self) -> Tuple[str, int]:
+        result = self._factor()
+        parts = [self._wrap(result, PREC_PRODUCT)]
+        while True:
+            token = self._peek()
+            if token in (("sym", "*"),) or (token and token[0] == "cmd" and token[1] in MULTIPLY):
+                self.pos += 1
+                parts.append("*")
+                parts.append(self._wrap(self._factor(), PREC_PRODUCT))
+            elif token in (("sym", "/"), ("cmd", "div")):
+                self.pos += 1
+                parts.append("/")
+                parts.append(self._wrap(self._factor(), PREC_POWER))
+            elif self._starts_atom():
+                parts.append("*")
+                parts.append(self._wrap(self._factor(), PREC_PRODUCT))
+            else:
+                break
+        if len(parts) == 1:
+            return result
+        return " ".join(parts), PREC_PRODUCT
+
+    def _factor(self) -> Tuple[str, int]:
+        if self._accept("sym", "-"):
+            return "-" + self._wrap(self._factor(), PREC_UNARY), PREC_UNARY
+        return self._postfix(self._atom())
+
+    def _postfix(self, base: Tuple[str, int]) -> Tuple[str, int]:
+        while True:
+            if self._accept("sym", "^"):
+                if self._accept_degree():
+                    base = f"{self._wrap(base, PREC_POWER)} Degree", PREC_PRODUCT
+                    continue
+                exponent = self._script()
+                base = f"{self._wrap(base, PREC_ATOM)}^{self._wrap(exponent, PREC_ATOM)}", PREC_POWER
+            elif self._accept("sym", "!"):
+                base = f"{self._wrap(base, PREC_ATOM)}!", PREC_POWER
+            elif self._peek() == ("sym", "_"):
+                raise UnsupportedLatex("subscripts are only supported as bounds")
+            else:
+                return base
+
+    def _accept_degree(self) -> bool:
+        if self._accept("cmd", "circ"):
+            return True
+        if self.tokens[self.pos:self.pos + 3] == [("sym", "{"), ("cmd", "circ"), ("sym", "}")]:
+            self.pos += 3
+            return True
+        return False
+
+    def _starts_atom(self) -> bool:
+        token = self._peek()
+        if token is None:
+            return False
+        kind, value = token
+        if self.integral_depth and self._at_differential():
+            return False
+        if kind in ("num", "letter"):
+            return True
+        if kind == "sym":
+            return value in ("(", "[", "{") or (value == "|" and not self.abs_depth)
+        return value not in MULTIPLY and value not in RELATIONS and value not in ("div", "to", "rightarrow", "}")
+
+    def _at_differential(self) -> bool:
+        token = self._peek()
+        if token == ("letter", "d"):
+            following = self._peek(1)
+            return following is not None and following[0] == "letter"
+        if token in (("cmd", "mathrm"), ("cmd", "operatorname")):
+            return self._peek(1) == ("sym", "{") and self._peek(2) == ("letter", "d") and self._peek(3) == ("sym", "}")
+        return False
+
+    def _consume_differential(self) -> str:
+        if not self._at_differential():
+            raise UnsupportedLatex("integral without differential")
+        if self._next()[0] == "cmd":
+            self.pos += 3
+        return self._next()[1]
+
+    def _group(self, closing: str) -> Tuple[str, int]:
+        content = self._relation()
+        self._expect("sym", closing)
+        return content
+
+    def _script(self) -> Tuple[str, int]:
+        """Argument of ^ or _: a braced group or a single token."""
+        if self._accept("sym", "{"):
+            return self._group("}")
+        token = self._next()
+        if token[0] == "num":
+            # "x^23" only raises to the first digit in LaTeX
+            digits = token[1]
+            if len(digits) > 1 and "." not in digits:
+                self.tokens.insert(self.pos, ("num", digits[1:]))
+                return digits[0], PREC_ATOM
+            return digits, PREC_ATOM
+        if token[0] == "letter":
+            return token[1], PREC_ATOM
+        self.pos -= 1
+        return self._atom()
+
+    def _atom(self) -> Tuple[str, int]:
+        kind, value = self._next()
+
+        if kind == "num":
+            return value, PREC_ATOM
+        if kind == "letter":
+            return self._identifier(value)
+        if kind == "sym":
+            if value == "(":
+                return f"({self._group(')')[0]})", PREC_ATOM
+            if value == "[":
+                return f"({self._group(']')[0]})", PREC_ATOM
+            if value == "{":
+                return self._group("}")
+            if value == "|":
+                self.abs_depth += 1
+                content = self._expression()
+                self._expect("sym", "|")
+                self.abs_depth -= 1
+                return f"Abs[{content[0]}]", PREC_ATOM
+            raise UnsupportedLatex(f"unexpected symbol {value!r}")
+
+        if value == "{":
+            return f"({self._group_command_brace()})", PREC_ATOM
+        if value in ("frac", "dfrac", "tfrac"):
+            numerator = self._script()
+            denominator = self._script()
+            # \frac{d}{dx} / \frac{dy}{dx} is a derivative, not a quotient
+            if (numerator[0] == "d" or numerator[0].startswith("d * ")) and denominator[0].startswith("d * "):
+                raise UnsupportedLatex("derivative notation")
+            return f"{self._wrap(numerator, PREC_PRODUCT)}/{self._wrap(denominator, PREC_POWER)}", PREC_PRODUCT
+        if value == "sqrt":
+            if self._accept("sym", "["):
+                index = self._group("]")
+                radicand = self._script()
+                return f"Surd[{radicand[0]}, {index[0]}]", PREC_ATOM
+            return f"Sqrt[{self._script()[0]}]", PREC_ATOM
+        if value in FUNCTIONS:
+            return self._function(value)
+        if value in ("mathrm", "operatorname"):
+            name = self._braced_word()
+            if name in FUNCTIONS:
+                return self._function(name)
+            raise UnsupportedLatex(f"unsupported \\{value}{{{name}}}")
+        if value == "int":
+            return self._integral()
+        if value in BIG_OPERATORS:
+            return self._big_operator(BIG_OPERATORS[value])
+        if value == "lim":
+            return self._limit()
+        if value in CONSTANTS:
+            return CONSTANTS[value], PREC_ATOM
+        if value in GREEK:
+            return value, PREC_ATOM
+        raise UnsupportedLatex(f"unsupported command \\{value}")
+
+    def _identifier(self, letter: str) -> Tuple[str, int]:
+        # Letters written without a backslash may still spell a function name ("sin x")
+        for name in sorted(FUNCTIONS, key=len, reverse=True):
+            word = [("letter", ch) for ch in name]
+            if len(name) > 1 and [("letter", letter)] + self.tokens[self.pos:self.pos + len(name) - 1] == word:
+                self.pos += len(name) - 1
+                self.confidence *= 0.8
+                return self._function(name)
+        if letter == "e":
+            # Usually Euler's number on a whiteboard, but could be a variable
+            self.confidence *= 0.9
+            return "E", PREC_ATOM
+        following = self._peek()
+        if following == ("sym", "(") and letter in "fgh":
+            raise UnsupportedLatex("function application of a user-defined function")
+        return letter, PREC_ATOM
+
+    def _group_command_brace(self) -> str:
+        content = self._relation()
+        self._expect("cmd", "}")
+        return content[0]
+
+    def _braced_word(self) -> str:
+        self._expect("sym", "{")
+        letters = []
+        while self._peek() and self._peek()[0] == "letter":
+            letters.append(self._next()[1])
+        self._expect("sym", "}")
+        return "".join(letters)
+
+    def _function(self, name: str) -> Tuple[str, int]:
+        wolfram = FUNCTIONS[name]
+        power = None
+        base = None
+
+        if name == "log":
+            if self._accept("sym", "_"):
+                base = self._script()[0]
+            else:
+                # \log without a base is base 10 in school and natural in Wolfram
+                self.confidence *= 0.7
+
+        if self._accept("sym", "^"):
+            power = self._script()
+
+        if self._peek() in (("sym", "("), ("sym", "{"), ("sym", "[")):
+            argument = self._atom()[0]
+            argument = argument[1:-1] if argument.startswith("(") and argument.endswith(")") and self._balanced(argument[1:-1]) else argument
+        else:
+            # Unbracketed argument: everything up to the next operator ("\sin 2x")
+            factors = [self._wrap(self._postfix(self._atom()), PREC_PRODUCT)]
+            while self._starts_atom() and not (self._peek()[0] == "cmd" and self._peek()[1] in FUNCTIONS):
+                factors.append(self._wrap(self._postfix(self._atom()), PREC_PRODUCT))
+            if len(factors) > 1:
+                self.confidence *= 0.9
+            argument = "*".join(factors)
+
+        call = f"{wolfram}[{base}, {argument}]" if base is not None else f"{wolfram}[{argument}]"
+        if power is not None:
+            if power[0] == "-1":
+                raise UnsupportedLatex("inverse function notation")
+            return f"{call}^{self._wrap(power, PREC_ATOM)}", PREC_POWER
+        return call, PREC_ATOM
+
+    @staticmethod
+    def _balanced(text: str) -> bool:
+        depth = 0
+        for ch in text:
+            depth += ch in "(["
+            depth -= ch in ")]"
+            if depth < 0:
+                return False
+        return depth == 0
+
+    def _bounds(self) -> Tuple[Optional[Tuple[str, int]], Optional[Tuple[str, int]]]:
+        lower = upper = None
+        for _ in range(2):
+            if lower is None and self._accept("sym", "_"):
+                lower = self._script()
+            elif upper is None and self._accept("sym", "^"):
+                upper = self._script()
+        return lower, upper
+
+    def _integral(self) -> Tuple[str, int]:
+        lower, upper = self._bounds()
+        if (lower is None) != (upper is None):
+            raise UnsupportedLatex("integral with a single bound")
+
+        self.integral_depth += 1
+        integrand = self._expression()
+        self.integral_depth -= 1
+        variable = self._consume_differential()
+
+        if lower is None:
+            return f"Integrate[{integrand[0]}, {variable}]", PREC_ATOM
+        return f"Integrate[{integrand[0]}, {{{variable}, {lower[0]}, {upper[0]}}}]", PREC_ATOM
+
+    def _big_operator(self, wolfram: str) -> Tuple[str, int]:
+        if not self._accept("sym", "_"):
+            raise UnsupportedLatex(f"{wolfram} without bounds")
+        self._expect("sym", "{")
+        variable = self._next()
+        if variable[0] != "letter":
+            raise UnsupportedLatex(f"{wolfram} index must be a letter")
+        self._expect("sym", "=")
+        start = self._expression()
+        self._expect("sym", "}")
+        self._expect("sym", "^")
+        end = self._script()
+
+        summand = self._term()
+        return f"{wolfram}[{summand[0]}, {{{variable[1]}, {start[0]}, {end[0]}}}]", PREC_ATOM
+
+    def _limit(self) -> Tuple[str, int]:
+        self._expect("sym", "_")
+        self._expect("sym", "{")
+        variable = self._next()
+        if variable[0] != "letter" or not (self._accept("cmd", "to") or self._accept("cmd", "rightarrow")):
+            raise UnsupportedLatex("unsupported limit subscript")
+        point = self._expression()
+        self._expect("sym", "}")
+
+        body = self._term()
+        return f"Limit[{body[0]}, {variable[1]} -> {point[0]}]", PREC_ATOM
+
+
+class LatexTranslatorService:
+    """
+    Deterministic LaTeX → Wolfram translation for the simple expressions that make up
+    most whiteboard traffic. Anything outside the supported subset is reported with zero
+    confidence so callers can fall back to OllamaService.
+    """
+
+    @staticmethod
+    async def translate(latex_input: str) -> Tuple[Optional[str], float]:
+        """
+        Translate LaTeX to Wolfram syntax without calling the LLM.
+
+        Returns:
+            Tuple of (wolfram expression or None, confidence in [0, 1])
+        """
+        try:
+            parser = _Parser(latex_input)
+            wolfram = parser.parse()
+            return wolfram, round(parser.confidence, 3)
+        except (UnsupportedLatex, RecursionError) as e:
+            logger.debug(f"Fast path declined {latex_input!r}: {e}")
+            return None, 0.0
+
+    @staticmethod
+    async def normalize(expression: str) -> str:
+        """Canonical form used to compare fast-path and LLM output."""
+        text = expression.strip().strip("`").strip()
+        text = re.sub(r"\s+", "", text)
+        text = text.replace("==", "=").replace("**", "^")
+        return text
+
+    @staticmethod
+    async def evaluate_corpus(latex_inputs: List[str]) -> Dict[str, Any]:
+        """
+        Compare fast-path output against the LLM on a corpus of OCR results.
+
+        Returns coverage (fraction the fast path handles), agreement (fraction of handled
+        inputs where both outputs normalize identically) and the disagreeing samples.
+        """
+        from app.config import config
+        from app.services.ollama_service import OllamaService
+
+        handled = 0
+        agreed = 0
+        disagreements = []
+
+        for latex_input in latex_inputs:
+            wolfram, confidence = await LatexTranslatorService.translate(latex_input)
+            if wolfram is None or confidence < config.LATEX_FAST_PATH_MIN_CONFIDENCE:
+                continue
+            handled += 1
+
+            llm_output = await OllamaService.filter_latex(latex_input)
+            if await LatexTranslatorService.normalize(wolfram) == await LatexTranslatorService.normalize(llm_output):
+                agreed += 1
+            else:
+                disagreements.append({"latex": latex_input, "fast_path": wolfram, "llm": llm_output})
+
+        total = len(latex_inputs)
+        return {
+            "total": total,
+            "handled": handled,
+            "coverage": handled / total if total else 0.0,
+            "agreement": agreed / handled if handled else 0.0,
+            "disagreements": disagreements,
+        }
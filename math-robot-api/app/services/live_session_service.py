@@ -0,0 +1,232 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+from app.config import config
+from app.models.file_model import File
+from app.models.deadline_model import Deadline
+from app.services.pipeline_service import PipelineService
+from app.services.scheduler_service import SchedulerService
+from app.services.whiteboard_processor_service import WhiteboardProcessorService
+
+logger = logging.getLogger(__name__)
+
+LIVE_SESSIONS = Gauge(
+    "live_sessions",
+    "Open live camera sessions"
+)
+LIVE_FRAMES_TOTAL = Counter(
+    "live_frames_total",
+    "Live frames by outcome (unchanged, processed, dropped)",
+    ["outcome"]
+)
+LIVE_REGIONS_RECOGNIZED_TOTAL = Counter(
+    "live_regions_recognized_total",
+    "Regions re-run through OCR because they were new or changed"
+)
+
+
+class LiveRegion:
+    """A problem region tracked across frames, with its last recognition result."""
+
+    def __init__(self, region_id: int):
+        self.id = region_id
+        self.box: Tuple[int, int, int, int] = (0, 0, 0, 0)
+        self.signature: Optional[np.ndarray] = None
+        self.missed = 0
+        self.result: Dict[str, Any] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "box": list(self.box),
+            "latex_raw": self.result.get("latex_raw"),
+            "latex_filtered": self.result.get("latex_filtered"),
+            "translation_status": self.result.get("translation_status"),
+            "translation_handle": self.result.get("translation_handle"),
+            "error": self.result.get("error"),
+            "success": self.result.get("success", False),
+        }
+
+
+class LiveSession:
+    """
+    Incremental recognition for a stream of camera frames.
+
+    Frames that barely differ from the last processed one are skipped without running
+    the detector. Otherwise detected boxes are matched to tracked regions by IoU, and
+    only regions that are new or whose downscaled crop changed go through OCR and
+    translation. process() returns the delta (added / updated / removed regions).
+    """
+
+    FRAME_THUMB_WIDTH = 128
+    REGION_THUMB_SIZE = (64, 32)
+    # Grey levels a downscaled pixel must move by to count as changed (absorbs sensor noise)
+    PIXEL_DELTA = 24
+
+    def __init__(self, name: str, tenant: str, target_regions: int = 1,
+                 translation_mode: str = PipelineService.EAGER):
+        self.name = name
+        self.tenant = tenant
+        self.target_regions = target_regions
+        self.translation_mode = translation_mode
+        self.regions: Dict[int, LiveRegion] = {}
+        self.frame_count = 0
+        self._next_region_id = 1
+        self._last_thumb: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _gray(img: np.ndarray) -> np.ndarray:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    @classmethod
+    def _frame_thumbnail(cls, img: np.ndarray) -> np.ndarray:
+        h, w = img.shape[:2]
+        size = (cls.FRAME_THUMB_WIDTH, max(1, round(h * cls.FRAME_THUMB_WIDTH / w)))
+        return cv2.resize(cls._gray(img), size, interpolation=cv2.INTER_AREA)
+
+    @classmethod
+    def _region_signature(cls, crop: np.ndarray) -> np.ndarray:
+        return cv2.resize(cls._gray(crop), cls.REGION_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+
+    @classmethod
+    def _changed_fraction(cls, previous: Optional[np.ndarray], current: np.ndarray) -> float:
+        """Fraction of thumbnail pixels that changed; 1 when there is nothing to compare to."""
+        if previous is None or previous.shape != current.shape:
+            return 1.0
+        return float(np.count_nonzero(cv2.absdiff(previous, current) > cls.PIXEL_DELTA)) / current.size
+
+    @staticmethod
+    def _iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+        intersection = max(0, min(a[2], b[2]) - max(a[0], b[0])) * max(0, min(a[3], b[3]) - max(a[1], b[1]))
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+        return intersection / union if union > 0 else 0.0
+
+    def _match(self, boxes: List[Tuple[int, int, int, int]]) -> List[Optional[LiveRegion]]:
+        """Greedily pair detected boxes with tracked regions by highest IoU."""
+        pairs = sorted(
+            (
+                (self._iou(box, region.box), i, region_id)
+                for i, box in enumerate(boxes)
+                for region_id, region in self.regions.items()
+            ),
+            reverse=True
+        )
+
+        matches: List[Optional[LiveRegion]] = [None] * len(boxes)
+        used = set()
+        for iou, i, region_id in pairs:
+            if iou < config.LIVE_IOU_THRESHOLD:
+                break
+            if matches[i] is None and region_id not in used:
+                matches[i] = self.regions[region_id]
+                used.add(region_id)
+        return matches
+
+    async def process(self, data: bytes, deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        Process one encoded frame.
+
+        Returns:
+            Delta message, or None if nothing visible changed
+        """
+        start_time = time.perf_counter()
+        self.frame_count += 1
+
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise HTTPException(status_code=400, detail="Frame is not a valid image")
+
+        thumb = self._frame_thumbnail(img)
+        if self._last_thumb is not None and self._changed_fraction(self._last_thumb, thumb) <= config.LIVE_FRAME_CHANGE_THRESHOLD:
+            LIVE_FRAMES_TOTAL.labels(outcome="unchanged").inc()
+            return None
+
+        # Detection and OCR share the scheduler with regular requests
+        async with SchedulerService.slot(SchedulerService.INTERACTIVE, self.tenant, deadline or Deadline(config.REQUEST_TIMEOUT)):
+            delta = await self._process_changed_frame(img, deadline)
+
+        # Compare later frames against this one, so slow drift still adds up to a change
+        self._last_thumb = thumb
+        LIVE_FRAMES_TOTAL.labels(outcome="processed").inc()
+
+        if not (delta["added"] or delta["updated"] or delta["removed"]):
+            return None
+        delta["processing_time"] = round(time.perf_counter() - start_time, 3)
+        return delta
+
+    async def _process_changed_frame(self, img: np.ndarray, deadline: Optional[Deadline]) -> Dict[str, Any]:
+        boxes = await WhiteboardProcessorService.detect_regions(
+            img, padding_ratio=0.1, target_regions=self.target_regions
+        )
+        Deadline.check_optional(deadline, "problem detection")
+        matches = self._match(boxes)
+
+        changed = []
+        seen = set()
+        for box, region in zip(boxes, matches):
+            x1, y1, x2, y2 = box
+            crop = img[y1:y2, x1:x2]
+            if crop.size == 0:
+                continue
+            signature = self._region_signature(crop)
+
+            if region is not None:
+                seen.add(region.id)
+                region.missed = 0
+                if self._changed_fraction(region.signature, signature) <= config.LIVE_REGION_CHANGE_THRESHOLD:
+                    region.box = box
+                    continue
+
+            changed.append((box, region, crop, signature))
+
+        results = []
+        if changed:
+            LIVE_REGIONS_RECOGNIZED_TOTAL.inc(len(changed))
+            problem_files = [
+                File(name=f"{self.name}_frame_{self.frame_count:05d}_region_{i + 1:02d}", data=crop, data_type='cv2')
+                for i, (_, _, crop, _) in enumerate(changed)
+            ]
+            results = await PipelineService.recognize_problems(problem_files, deadline, self.translation_mode)
+
+        added, updated = [], []
+        for (box, region, _, signature), result in zip(changed, results):
+            if region is None:
+                region = LiveRegion(self._next_region_id)
+                self._next_region_id += 1
+                self.regions[region.id] = region
+                seen.add(region.id)
+                added.append(region)
+            elif result.get("latex_raw") != region.result.get("latex_raw") or not result.get("success"):
+                updated.append(region)
+
+            region.box = box
+            region.signature = signature
+            region.result = result
+
+        # Keep regions the detector briefly lost, drop them after a few missed frames
+        removed = []
+        for region_id, region in list(self.regions.items()):
+            if region_id in seen:
+                continue
+            region.missed += 1
+            if region.missed > config.LIVE_MAX_MISSED_FRAMES:
+                del self.regions[region_id]
+                removed.append(region_id)
+
+        logger.info(
+            f"Live session {self.name} frame {self.frame_count}: {len(boxes)} regions, "
+            f"{len(changed)} re-recognized, {len(added)} added, {len(updated)} updated, {len(removed)} removed"
+        )
+
+        return {
+            "type": "delta",
+            "frame": self.frame_count,
+            "added": [region.to_dict() for region in added],
+            "updated": [region.to_dict() for region in updated],
+            "removed": removed,
+            "recognized": len(changed),
+        }
@@ -0,0 +1,365 @@
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException, status
+from prometheus_client import Counter, Gauge, Histogram
+from app.config import config
+from app.models.deadline_model import Deadline
+from app.services.scheduler_service import SchedulerService
+
+logger = logging.getLogger(__name__)
+
+MODEL_ACTIVE = Gauge(
+    "model_registry_active",
+    "Model version currently serving (1) per kind and role",
+    ["kind", "version", "role"]
+)
+MODEL_MEMORY = Gauge(
+    "model_registry_memory_bytes",
+    "Process resident memory added by loading a model version",
+    ["kind", "version"]
+)
+MODEL_IN_FLIGHT = Gauge(
+    "model_registry_in_flight",
+    "Requests using a model version",
+    ["kind", "version"]
+)
+SHADOW_COMPARISONS_TOTAL = Counter(
+    "model_shadow_comparisons_total",
+    "Shadow evaluations by outcome (agree, disagree, error, skipped)",
+    ["kind", "outcome"]
+)
+SHADOW_LATENCY = Histogram(
+    "model_shadow_latency_seconds",
+    "Latency of sampled requests on the primary and the shadow model",
+    ["kind", "role"]
+)
+
+
+def resident_memory() -> int:
+    """Resident set size of this process in bytes (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class ModelVersion:
+    """A loaded model version and the requests currently using it."""
+
+    def __init__(self, kind: str, version: str, model: Any, memory_bytes: int = 0):
+        self.kind = kind
+        self.version = version
+        self.model = model
+        # RSS growth while loading; approximate when several models load concurrently
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+        self.in_flight = 0
+        self.retired = False
+        self.drained = asyncio.Event()
+
+    def acquire(self) -> None:
+        self.in_flight += 1
+        MODEL_IN_FLIGHT.labels(kind=self.kind, version=self.version).inc()
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        MODEL_IN_FLIGHT.labels(kind=self.kind, version=self.version).dec()
+        if self.retired and self.in_flight == 0:
+            self.drained.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "in_flight": self.in_flight,
+            "memory_bytes": self.memory_bytes,
+        }
+
+
+class ModelRegistry:
+    """
+    Versioned models per kind (pix2text, yolo, ollama) that can be swapped at runtime.
+
+    Services register a loader per kind. activate() loads a version in the background and
+    swaps it in with a single assignment; requests that already hold the old version keep
+    it until they finish, and it is unloaded once drained. A shadow version can receive a
+    sampled fraction of traffic after the primary answered, to compare latency and output
+    agreement before it is promoted. Shadow replays only use capacity the scheduler's
+    background class leaves free, and at most MODEL_SHADOW_MAX_IN_FLIGHT run per kind.
+    """
+
+    PRIMARY = "primary"
+    SHADOW = "shadow"
+    SHADOW_TENANT = "model_shadow"
+
+    _loaders: Dict[str, Callable[..., Awaitable[Any]]] = {}
+    _unloaders: Dict[str, Callable[[Any], Awaitable[None]]] = {}
+    _active: Dict[str, ModelVersion] = {}
+    _shadows: Dict[str, ModelVersion] = {}
+    _shadow_fractions: Dict[str, float] = {}
+    _shadow_stats: Dict[str, Dict[str, float]] = {}
+    _loading: Dict[str, Dict[str, Any]] = {}
+    _errors: Dict[str, Optional[str]] = {}
+    _retiring: Dict[str, list] = {}
+    _background: set = set()
+
+    @classmethod
+    def register_loader(cls, kind: str, loader: Callable[..., Awaitable[Any]],
+                        unloader: Optional[Callable[[Any], Awaitable[None]]] = None) -> None:
+        """
+        Declare how a kind of model is loaded (and optionally released) by version.
+        The loader is called as loader(version, **options).
+        """
+        cls._loaders[kind] = loader
+        if unloader is not None:
+            cls._unloaders[kind] = unloader
+
+    @classmethod
+    def kinds(cls):
+        return list(cls._loaders)
+
+    @classmethod
+    def active(cls, kind: str) -> Optional[ModelVersion]:
+        return cls._active.get(kind)
+
+    @classmethod
+    def shadow_version(cls, kind: str) -> Optional[ModelVersion]:
+        return cls._shadows.get(kind)
+
+    @classmethod
+    async def _load(cls, kind: str, version: str, role: str, options: Optional[Dict[str, Any]] = None) -> ModelVersion:
+        if kind not in cls._loaders:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown model kind: {kind}")
+        if kind in cls._loading:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{kind} is already loading {cls._loading[kind]['version']}"
+            )
+
+        cls._loading[kind] = {"version": version, "role": role, "started_at": time.time()}
+        start_time = time.perf_counter()
+        try:
+            logger.info(f"Loading {kind} model {version} as {role}")
+            memory_before = resident_memory()
+            model = await cls._loaders[kind](version, **(options or {}))
+            memory_bytes = max(0, resident_memory() - memory_before)
+            cls._errors[kind] = None
+            MODEL_MEMORY.labels(kind=kind, version=version).set(memory_bytes)
+            logger.info(
+                f"Loaded {kind} model {version} in {time.perf_counter() - start_time:.2f}s "
+                f"(+{memory_bytes / 2**20:.0f} MiB resident)"
+            )
+            return ModelVersion(kind, version, model, memory_bytes)
+        except Exception as e:
+            cls._errors[kind] = f"Failed to load {version}: {e}"
+            logger.error(f"Failed to load {kind} model {version}: {e}")
+            raise
+        finally:
+            del cls._loading[kind]
+
+    @classmethod
+    async def activate(cls, kind: str, version: str) -> ModelVersion:
+        """Load a version and make it the one new requests use."""
+        loaded = await cls._load(kind, version, cls.PRIMARY)
+
+        previous = cls._active.get(kind)
+        cls._active[kind] = loaded
+        MODEL_ACTIVE.labels(kind=kind, version=version, role=cls.PRIMARY).set(1)
+        logger.info(f"Activated {kind} model {version}")
+
+        if previous is not None and previous is not loaded:
+            if previous.version != version:
+                MODEL_ACTIVE.labels(kind=kind, version=previous.version, role=cls.PRIMARY).set(0)
+            cls._retire(previous)
+        return loaded
+
+    @classmethod
+    def activate_in_background(cls, kind: str, version: str) -> None:
+        """Start activate() without waiting for the load; progress shows up in status()."""
+        if kind not in cls._loaders:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown model kind: {kind}")
+        if kind in cls._loading:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"{kind} is already loading")
+        cls._spawn(cls.activate(kind, version))
+
+    @classmethod
+    async def set_shadow(cls, kind: str, version: str, fraction: float,
+                         options: Optional[Dict[str, Any]] = None) -> ModelVersion:
+        """Load a version (with optional loader options) and mirror a sampled fraction of requests to it."""
+        loaded = await cls._load(kind, version, cls.SHADOW, options)
+        cls.clear_shadow(kind)
+        cls._shadows[kind] = loaded
+        cls._shadow_fractions[kind] = fraction
+        cls._shadow_stats[kind] = {
+            "samples": 0, "agreements": 0, "errors": 0, "primary_latency": 0.0, "shadow_latency": 0.0
+        }
+        MODEL_ACTIVE.labels(kind=kind, version=version, role=cls.SHADOW).set(1)
+        logger.info(f"Shadowing {kind} model {version} on {fraction:.0%} of requests")
+        return loaded
+
+    @classmethod
+    def set_shadow_in_background(cls, kind: str, version: str, fraction: float) -> None:
+        if kind not in cls._loaders:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown model kind: {kind}")
+        if kind in cls._loading:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"{kind} is already loading")
+        cls._spawn(cls.set_shadow(kind, version, fraction))
+
+    @classmethod
+    def clear_shadow(cls, kind: str) -> None:
+        shadow = cls._shadows.pop(kind, None)
+        cls._shadow_fractions.pop(kind, None)
+        if shadow is not None:
+            MODEL_ACTIVE.labels(kind=kind, version=shadow.version, role=cls.SHADOW).set(0)
+            cls._retire(shadow)
+
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def use(cls, kind: str) -> AsyncIterator[ModelVersion]:
+        """Hold the active version for the duration of a request so a swap cannot unload it."""
+        version = cls._active.get(kind)
+        if version is None:
+            raise Exception(f"No {kind} model loaded")
+
+        version.acquire()
+        try:
+            yield version
+        finally:
+            version.release()
+
+    @classmethod
+    def shadow(cls, kind: str, run: Callable[[Any], Awaitable[Any]], primary_result: Any,
+               primary_latency: float, agree: Callable[[Any, Any], bool]) -> None:
+        """
+        With the configured probability, replay a request on the shadow version in the
+        background and record latency and whether its output agrees with the primary.
+        """
+        shadow = cls._shadows.get(kind)
+        if shadow is None or random.random() >= cls._shadow_fractions.get(kind, 0.0):
+            return
+        if shadow.in_flight >= config.MODEL_SHADOW_MAX_IN_FLIGHT:
+            SHADOW_COMPARISONS_TOTAL.labels(kind=kind, outcome="skipped").inc()
+            return
+
+        # Held from here rather than when the task starts, so a burst cannot exceed the cap
+        shadow.acquire()
+        task = cls._spawn(cls._run_shadow(shadow, run, primary_result, primary_latency, agree))
+        task.add_done_callback(lambda _: shadow.release())
+
+    @classmethod
+    async def _run_shadow(cls, shadow: ModelVersion, run: Callable[[Any], Awaitable[Any]], primary_result: Any,
+                          primary_latency: float, agree: Callable[[Any, Any], bool]) -> None:
+        kind = shadow.kind
+        deadline = Deadline(config.REQUEST_TIMEOUT)
+        try:
+            async with SchedulerService.slot(SchedulerService.BACKGROUND, cls.SHADOW_TENANT, deadline):
+                start_time = time.perf_counter()
+                try:
+                    shadow_result = await asyncio.wait_for(run(shadow.model), timeout=deadline.remaining())
+                    outcome = "agree" if agree(primary_result, shadow_result) else "disagree"
+                except Exception as e:
+                    logger.warning(f"Shadow {kind} model {shadow.version} failed: {e}")
+                    outcome = "error"
+                shadow_latency = time.perf_counter() - start_time
+        except HTTPException as e:
+            # Shed or timed out while queued: nothing was compared
+            logger.info(f"Skipped shadow {kind} replay: {e.detail}")
+            SHADOW_COMPARISONS_TOTAL.labels(kind=kind, outcome="skipped").inc()
+            return
+
+        SHADOW_COMPARISONS_TOTAL.labels(kind=kind, outcome=outcome).inc()
+        SHADOW_LATENCY.labels(kind=kind, role=cls.PRIMARY).observe(primary_latency)
+        if outcome != "error":
+            SHADOW_LATENCY.labels(kind=kind, role=cls.SHADOW).observe(shadow_latency)
+
+        # Stats belong to the current shadow only; a replaced shadow's late results are dropped
+        stats = cls._shadow_stats.get(kind)
+        if stats is None or cls._shadows.get(kind) is not shadow:
+            return
+        stats["samples"] += 1
+        if outcome == "error":
+            stats["errors"] += 1
+            return
+        stats["agreements"] += outcome == "agree"
+        stats["primary_latency"] += primary_latency
+        stats["shadow_latency"] += shadow_latency
+
+    @classmethod
+    def _retire(cls, version: ModelVersion) -> None:
+        """Unload a replaced version once its in-flight requests finished."""
+        version.retired = True
+        if version.in_flight == 0:
+            version.drained.set()
+        cls._retiring.setdefault(version.kind, []).append(version)
+        cls._spawn(cls._drain(version))
+
+    @classmethod
+    async def _drain(cls, version: ModelVersion) -> None:
+        await version.drained.wait()
+        cls._retiring[version.kind].remove(version)
+
+        if cls._still_serving(version):
+            # Re-activated or shadowed under the same version: unloading by name (an Ollama
+            # tag) would evict the copy that replaced it
+            version.model = None
+            logger.info(f"Retired {version.kind} model {version.version}, which is still serving")
+            return
+
+        unloader = cls._unloaders.get(version.kind)
+        if unloader is not None:
+            try:
+                await unloader(version.model)
+            except Exception as e:
+                logger.warning(f"Failed to unload {version.kind} model {version.version}: {e}")
+        version.model = None
+        MODEL_MEMORY.labels(kind=version.kind, version=version.version).set(0)
+        logger.info(f"Retired {version.kind} model {version.version}")
+
+    @classmethod
+    def _still_serving(cls, version: ModelVersion) -> bool:
+        """Whether another loaded copy of the same version is active or shadowing."""
+        return any(
+            current is not None and current is not version and current.version == version.version
+            for current in (cls._active.get(version.kind), cls._shadows.get(version.kind))
+        )
+
+    @classmethod
+    def _spawn(cls, coroutine: Awaitable[Any]) -> asyncio.Task:
+        task = asyncio.ensure_future(coroutine)
+        cls._background.add(task)
+        task.add_done_callback(cls._background.discard)
+        # Failures are already logged and kept in _errors
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    @classmethod
+    def status(cls) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for kind in cls._loaders:
+            active = cls._active.get(kind)
+            shadow = cls._shadows.get(kind)
+            stats = cls._shadow_stats.get(kind) if shadow is not None else None
+            compared = stats["samples"] - stats["errors"] if stats else 0
+
+            result[kind] = {
+                "active": active.status() if active else None,
+                "loading": cls._loading.get(kind),
+                "error": cls._errors.get(kind),
+                "retiring": [version.status() for version in cls._retiring.get(kind, [])],
+                "shadow": {
+                    **shadow.status(),
+                    "fraction": cls._shadow_fractions.get(kind, 0.0),
+                    "samples": stats["samples"],
+                    "errors": stats["errors"],
+                    "agreement": stats["agreements"] / compared if compared else None,
+                    "primary_latency": stats["primary_latency"] / compared if compared else None,
+                    "shadow_latency": stats["shadow_latency"] / compared if compared else None,
+                } if shadow is not None else None,
+            }
+        return result
@@ -0,0 +1,253 @@
+import aiohttp
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+from app.config import config
+from app.models.deadline_model import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+BACKEND_STATE = Gauge(
+    "ollama_backend_available",
+    "Whether an Ollama backend is healthy with a closed circuit (1) or not (0)",
+    ["backend"]
+)
+BACKEND_FAILURES_TOTAL = Counter(
+    "ollama_backend_failures_total",
+    "Failed requests per Ollama backend",
+    ["backend"]
+)
+HEDGED_TOTAL = Counter(
+    "ollama_hedged_requests_total",
+    "Requests that were hedged to a second backend after the latency threshold"
+)
+
+
+class OllamaUnavailable(HTTPException):
+    """Raised when no Ollama backend could serve the request."""
+    def __init__(self, detail: str = "No Ollama backend available"):
+        super().__init__(status_code=503, detail=detail)
+
+
+class OllamaBackend:
+    """A single Ollama endpoint with its own circuit breaker and latency history."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.healthy = True
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.latencies = deque(maxlen=200)
+
+    def api_url(self, path: str) -> str:
+        return f"{self.url}/api/{path}"
+
+    def available(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= config.OLLAMA_BREAKER_COOLDOWN:
+            # Let a single trial request through
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            return self.healthy and self.outstanding == 0
+        return self.healthy and self.state == self.CLOSED
+
+    def release(self) -> None:
+        self.outstanding -= 1
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.failures = 0
+        self.state = self.CLOSED
+        BACKEND_STATE.labels(backend=self.url).set(1 if self.healthy else 0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        BACKEND_FAILURES_TOTAL.labels(backend=self.url).inc()
+        if self.state == self.HALF_OPEN or self.failures >= config.OLLAMA_BREAKER_THRESHOLD:
+            if self.state != self.OPEN:
+                logger.warning(f"Opening circuit for Ollama backend {self.url}")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            BACKEND_STATE.labels(backend=self.url).set(0)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "circuit": self.state,
+            "outstanding": self.outstanding,
+        }
+
+
+class OllamaBackendPool:
+    """
+    Spreads Ollama requests over several backends: least-outstanding-requests selection,
+    periodic health probes, a circuit breaker per backend, failover to the next backend
+    and optional hedging once a request runs past a latency percentile.
+    """
+
+    __backends: Optional[List[OllamaBackend]] = None
+    __probe_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def backends(cls) -> List[OllamaBackend]:
+        if cls.__backends is None:
+            cls.__backends = [OllamaBackend(url) for url in config.OLLAMA_URLS]
+            for backend in cls.__backends:
+                BACKEND_STATE.labels(backend=backend.url).set(1)
+        return cls.__backends
+
+    @classmethod
+    def select(cls, exclude: Set[OllamaBackend] = frozenset()) -> Optional[OllamaBackend]:
+        """Available backend with the fewest outstanding requests (random tie-break)."""
+        candidates = [b for b in cls.backends() if b not in exclude and b.available()]
+        if not candidates:
+            return None
+        fewest = min(b.outstanding for b in candidates)
+        return random.choice([b for b in candidates if b.outstanding == fewest])
+
+    @classmethod
+    def hedge_delay(cls) -> Optional[float]:
+        """Latency percentile after which a second backend is tried, if enough samples exist."""
+        if config.OLLAMA_HEDGE_PERCENTILE <= 0 or len(cls.backends()) < 2:
+            return None
+        samples = sorted(latency for b in cls.backends() for latency in b.latencies)
+        if len(samples) < config.OLLAMA_HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * config.OLLAMA_HEDGE_PERCENTILE / 100))
+        return samples[index]
+
+    @staticmethod
+    async def _post(backend: OllamaBackend, path: str, payload: Dict[str, Any], deadline: Optional[Deadline]) -> Dict[str, Any]:
+        # Per attempt, so a hung backend counts as failed and the next one gets a chance
+        total = config.OLLAMA_REQUEST_TIMEOUT
+        if deadline is not None:
+            total = min(total, deadline.remaining())
+        timeout = aiohttp.ClientTimeout(total=total)
+        started_at = time.perf_counter()
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.post(backend.api_url(path), json=payload) as response:
+                    if response.status != 200:
+                        text = await response.text()
+                        logger.error(f"Ollama error {response.status} from {backend.url}: {text}")
+                        raise Exception(f"Ollama service returned {response.status}")
+                    data = await response.json()
+
+            backend.record_success(time.perf_counter() - started_at)
+            return data
+
+        except asyncio.TimeoutError:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded("LaTeX translation")
+            backend.record_failure()
+            raise Exception(f"Ollama backend {backend.url} timed out")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            backend.record_failure()
+            raise
+
+    @classmethod
+    async def post(cls, path: str, payload: Dict[str, Any], deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """POST to the best backend, hedging and failing over to others as needed."""
+        tried: Set[OllamaBackend] = set()
+        pending: Set[asyncio.Task] = set()
+        last_error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            backend = cls.select(exclude=tried)
+            if backend is None:
+                return False
+            tried.add(backend)
+            # Reserved on selection, not when the task starts: a half-open backend must not
+            # be picked again by a concurrent request before its single trial runs
+            backend.outstanding += 1
+            task = asyncio.ensure_future(cls._post(backend, path, payload, deadline))
+            task.add_done_callback(lambda _: backend.release())
+            pending.add(task)
+            return True
+
+        if not launch():
+            raise OllamaUnavailable()
+
+        hedge_delay = cls.hedge_delay()
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Hedge once: the request is slower than usual, race a second backend
+                    hedge_delay = None
+                    if launch():
+                        HEDGED_TOTAL.inc()
+                    continue
+
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if isinstance(error, DeadlineExceeded):
+                        raise error
+                    last_error = error
+
+                # Everything in flight failed: fail over to the next backend
+                if not pending:
+                    launch()
+
+            raise OllamaUnavailable(f"All Ollama backends failed: {last_error}")
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @classmethod
+    async def probe(cls) -> None:
+        """Mark each backend healthy or not from a lightweight /api/tags call."""
+        async def probe_one(backend: OllamaBackend) -> None:
+            try:
+                timeout = aiohttp.ClientTimeout(total=2)
+                async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with session.get(backend.api_url("tags")) as response:
+                        healthy = response.status == 200
+            except Exception:
+                healthy = False
+
+            if healthy != backend.healthy:
+                logger.warning(f"Ollama backend {backend.url} is now {'healthy' if healthy else 'unhealthy'}")
+            backend.healthy = healthy
+            BACKEND_STATE.labels(backend=backend.url).set(1 if healthy and backend.state == backend.CLOSED else 0)
+
+        await asyncio.gather(*(probe_one(backend) for backend in cls.backends()))
+
+    @classmethod
+    async def _probe_loop(cls) -> None:
+        while True:
+            await asyncio.sleep(config.OLLAMA_HEALTH_INTERVAL)
+            await cls.probe()
+
+    @classmethod
+    def start(cls) -> None:
+        """Start periodic health probing."""
+        if config.OLLAMA_HEALTH_INTERVAL > 0 and cls.__probe_task is None:
+            cls.__probe_task = asyncio.create_task(cls._probe_loop())
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        if cls.__probe_task is not None:
+            cls.__probe_task.cancel()
+            try:
+                await cls.__probe_task
+            except asyncio.CancelledError:
+                pass
+            cls.__probe_task = None
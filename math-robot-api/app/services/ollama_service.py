@@ -1,16 +1,43 @@
 import aiohttp
 import asyncio
+import contextlib
 import logging
+import time
+from typing import AsyncIterator, Dict, Any, Optional
 from fastapi import HTTPException
+from prometheus_client import Counter, Gauge, Histogram
 from app.config import config
+from app.models.deadline_model import Deadline, DeadlineExceeded
+from app.services.ollama_backend_pool import OllamaBackend, OllamaBackendPool, OllamaUnavailable
+from app.services.model_registry_service import ModelRegistry
 
 logger = logging.getLogger(__name__)
 
+MODEL_RESIDENT = Gauge(
+    "ollama_model_resident",
+    "Whether the Ollama model is currently loaded in memory (1) or not (0)",
+    ["model"]
+)
+LOAD_DURATION = Histogram(
+    "ollama_load_duration_seconds",
+    "Model load time reported by Ollama per request",
+    ["model"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30)
+)
+COLD_LOADS_TOTAL = Counter(
+    "ollama_cold_loads_total",
+    "Requests that paid a cold model load in Ollama",
+    ["model"]
+)
+
 
 class OllamaService:
     __instance = None
     __lock = asyncio.Lock()
     __is_warmed_up = False
+    __keep_warm_task: Optional[asyncio.Task] = None
+    __last_load_duration: Optional[float] = None
+    __last_cold_load_at: Optional[float] = None
 
     @classmethod
     async def get_instance(cls):
@@ -22,47 +49,216 @@ class OllamaService:
 
     @classmethod
     async def init(cls) -> None:
-        """Warm up the Ollama model (only once)."""
+        """Warm up the Ollama model (only once) and start the keep-warm task."""
         async with cls.__lock:
             if cls.__is_warmed_up:
                 return
 
-            logger.info("🔄 Warming up Ollama model qwen2.5:3b...")
+            logger.info(f"🔄 Warming up Ollama model {config.OLLAMA_MODEL}...")
 
-            model_url = f"{config.OLLAMA_URL.rstrip('/')}/api/generate"
-            payload = {
-                "model": "qwen2.5:3b",
-                "prompt": "warmup",
-                "stream": False,
-                "options": {"num_predict": 1}
-            }
+            ModelRegistry.register_loader("ollama", cls._load_version, cls._unload_version)
+            try:
+                await ModelRegistry.activate("ollama", config.OLLAMA_MODEL)
+                cls.__is_warmed_up = True
+                logger.info("✅ Ollama warm-up completed successfully.")
+            except Exception:
+                # Requests still use the configured model; keep-warm loads it once Ollama is reachable
+                pass
 
+            if config.OLLAMA_KEEP_WARM_INTERVAL > 0 and cls.__keep_warm_task is None:
+                cls.__keep_warm_task = asyncio.create_task(cls._keep_warm_loop())
+
+            OllamaBackendPool.start()
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Stop the keep-warm and health probe tasks."""
+        if cls.__keep_warm_task is not None:
+            cls.__keep_warm_task.cancel()
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(model_url, json=payload) as response:
-                        if response.status != 200:
-                            text = await response.text()
-                            logger.error(
-                                f"Ollama warmup error {response.status}: {text}"
-                            )
-                            return
+                await cls.__keep_warm_task
+            except asyncio.CancelledError:
+                pass
+            cls.__keep_warm_task = None
 
-                        await response.json()
+        await OllamaBackendPool.shutdown()
 
-                cls.__is_warmed_up = True
-                logger.info("✅ Ollama warm-up completed successfully.")
+    @staticmethod
+    def model_name() -> str:
+        """Ollama model new requests go to: the active registry version, else the configured one."""
+        active = ModelRegistry.active("ollama")
+        return active.model if active is not None else config.OLLAMA_MODEL
+
+    @staticmethod
+    @contextlib.asynccontextmanager
+    async def _use_model() -> AsyncIterator[str]:
+        """Hold the active model version for the duration of a call so a swap waits for it."""
+        if ModelRegistry.active("ollama") is None:
+            yield config.OLLAMA_MODEL
+            return
+        async with ModelRegistry.use("ollama") as version:
+            yield version.model
+
+    @classmethod
+    async def _load_version(cls, model: str) -> str:
+        """Registry loader: an Ollama "version" is the model tag, loaded on every backend."""
+        if not await cls._load_model_everywhere(model):
+            raise Exception(f"No Ollama backend could load {model}")
+        return model
+
+    @classmethod
+    async def _unload_version(cls, model: str) -> None:
+        """Registry unloader: free the replaced model on every backend right away."""
+        await asyncio.gather(*(
+            cls._load_model(backend, model, keep_alive=0) for backend in OllamaBackendPool.backends()
+        ))
+
+    @classmethod
+    async def _load_model_everywhere(cls, model: Optional[str] = None) -> bool:
+        """Load the model on every backend, True if at least one succeeded."""
+        model = model or cls.model_name()
+        results = await asyncio.gather(*(cls._load_model(backend, model) for backend in OllamaBackendPool.backends()))
+        return any(results)
+
+    @classmethod
+    async def _load_model(cls, backend: OllamaBackend, model: str, keep_alive: Any = None) -> bool:
+        """Ask Ollama to load the model (or refresh its keep_alive) without generating."""
+        payload = {
+            "model": model,
+            "stream": False,
+            "keep_alive": config.OLLAMA_KEEP_ALIVE if keep_alive is None else keep_alive
+        }
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(backend.api_url("generate"), json=payload) as response:
+                    if response.status != 200:
+                        text = await response.text()
+                        logger.error(
+                            f"Ollama warmup error {response.status} from {backend.url}: {text}"
+                        )
+                        return False
+
+                    data = await response.json()
+                    cls._record_load(data)
+                    return True
+
+        except Exception as e:
+            logger.error(f"Ollama warmup failed for {backend.url}: {e}")
+            return False
+
+    @classmethod
+    async def _keep_warm_loop(cls) -> None:
+        """Periodically refresh the model so Ollama never unloads it while idle."""
+        while True:
+            await asyncio.sleep(config.OLLAMA_KEEP_WARM_INTERVAL)
+            if await cls._load_model_everywhere():
+                logger.debug(f"Ollama model {cls.model_name()} kept warm")
+            await cls.get_residency()
+
+    @classmethod
+    def _record_load(cls, data: Dict[str, Any]) -> None:
+        """Track load_duration from an Ollama response and flag cold loads."""
+        load_duration = data.get("load_duration")
+        if load_duration is None:
+            return
 
-            except Exception as e:
-                logger.error(f"Ollama warmup failed: {e}")
+        model = data.get("model") or cls.model_name()
+        seconds = load_duration / 1e9
+        cls.__last_load_duration = seconds
+        LOAD_DURATION.labels(model=model).observe(seconds)
+        MODEL_RESIDENT.labels(model=model).set(1)
+
+        if seconds >= config.OLLAMA_COLD_LOAD_THRESHOLD:
+            cls.__last_cold_load_at = time.time()
+            COLD_LOADS_TOTAL.labels(model=model).inc()
+            logger.warning(f"Ollama cold-loaded {model} in {seconds:.2f}s")
+
+    @classmethod
+    async def get_residency(cls) -> Dict[str, Any]:
+        """
+        Report whether the model is currently loaded, based on each backend's /api/ps.
+        The top-level flags are true if any backend is reachable / has the model resident.
+        """
+        model = cls.model_name()
+        backends = await asyncio.gather(*(cls._backend_residency(backend, model) for backend in OllamaBackendPool.backends()))
+        resident = [backend for backend in backends if backend["resident"]]
+
+        residency = {
+            "model": model,
+            "reachable": any(backend["reachable"] for backend in backends),
+            "resident": bool(resident),
+            "expires_at": resident[0]["expires_at"] if resident else None,
+            "size_vram": resident[0]["size_vram"] if resident else None,
+            "last_load_duration": cls.__last_load_duration,
+            "last_cold_load_at": cls.__last_cold_load_at,
+            "backends": backends,
+        }
+
+        MODEL_RESIDENT.labels(model=model).set(1 if residency["resident"] else 0)
+        return residency
 
     @staticmethod
-    async def filter_latex(latex_input: str) -> str:
+    async def _backend_residency(backend: OllamaBackend, model_name: str) -> Dict[str, Any]:
+        residency = {
+            **backend.status(),
+            "reachable": False,
+            "resident": False,
+            "expires_at": None,
+            "size_vram": None,
+        }
+
+        try:
+            timeout = aiohttp.ClientTimeout(total=2)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(backend.api_url("ps")) as response:
+                    if response.status != 200:
+                        return residency
+                    data = await response.json()
+        except Exception as e:
+            logger.warning(f"Failed to query Ollama residency on {backend.url}: {e}")
+            return residency
+
+        residency["reachable"] = True
+        for model in data.get("models", []):
+            if model.get("name") == model_name or model.get("model") == model_name:
+                residency["resident"] = True
+                residency["expires_at"] = model.get("expires_at")
+                residency["size_vram"] = model.get("size_vram")
+                break
+
+        return residency
+
+    @staticmethod
+    async def filter_latex(latex_input: str, deadline: Optional[Deadline] = None) -> str:
         """Call Ollama API to convert LaTeX → Wolfram Alpha syntax."""
         if not latex_input.strip():
             raise HTTPException(status_code=400, detail="Empty LaTeX input")
 
-        model_url = f"{config.OLLAMA_URL.rstrip('/')}/api/generate"
-    
+        Deadline.check_optional(deadline, "LaTeX translation")
+
+        try:
+            async with OllamaService._use_model() as model:
+                start_time = time.perf_counter()
+                filtered = await OllamaService._generate(latex_input, model, deadline)
+
+            ModelRegistry.shadow(
+                "ollama",
+                lambda shadow_model: OllamaService._generate(latex_input, shadow_model),
+                filtered,
+                time.perf_counter() - start_time,
+                lambda primary, shadow: " ".join(primary.split()) == " ".join(shadow.split())
+            )
+            return filtered
+
+        except (DeadlineExceeded, OllamaUnavailable):
+            raise
+        except Exception as e:
+            logger.error(f"Failed to call Ollama service: {e}")
+            raise HTTPException(status_code=500, detail=f"Ollama request failed: {e}")
+
+    @staticmethod
+    async def _generate(latex_input: str, model: str, deadline: Optional[Deadline] = None) -> str:
         strict_prompt = f"""Convert this LaTeX math expression to Wolfram Alpha syntax. 
 CRITICAL: Output ONLY the Wolfram code, no explanations, no descriptions, no text.
 ONLY output valid Wolfram Alpha syntax.
@@ -72,9 +268,10 @@ Input: {latex_input.strip()}
 Output:"""
         
         payload = {
-            "model": "qwen2.5:3b",
+            "model": model,
             "prompt": strict_prompt,
             "stream": False,
+            "keep_alive": config.OLLAMA_KEEP_ALIVE,
             "options": {
                 "temperature": 0.1,
                 "num_predict": 100,
@@ -82,28 +279,15 @@ Output:"""
             }
         }
 
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(model_url, json=payload) as response:
-                    if response.status != 200:
-                        text = await response.text()
-                        logger.error(f"Ollama error {response.status}: {text}")
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Ollama service returned {response.status}"
-                        )
-
-                    data = await response.json()
-                    filtered = data.get("response", "").strip()
+        # Balanced, hedged and failed over across backends; aborted once the deadline passes
+        data = await OllamaBackendPool.post("generate", payload, deadline)
+        OllamaService._record_load(data)
+        filtered = data.get("response", "").strip()
 
-                    if not filtered:
-                        raise HTTPException(
-                            status_code=500,
-                            detail="Ollama returned an empty response"
-                        )
+        if not filtered:
+            raise HTTPException(
+                status_code=500,
+                detail="Ollama returned an empty response"
+            )
 
-                    return filtered
-
-        except Exception as e:
-            logger.error(f"Failed to call Ollama service: {e}")
-            raise HTTPException(status_code=500, detail=f"Ollama request failed: {e}")
+        return filtered
@@ -0,0 +1,165 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class OnnxArtifactService:
+    """
+    Builds and verifies pre-optimized ONNX model directories.
+
+    Graph optimizations are applied once at build time and serialized next to the
+    processor config, together with a manifest of file sizes and checksums. At runtime
+    the sessions are created with optimizations disabled and only file sizes are
+    checked, so boot only maps the files; full checksums are verified on demand.
+    This module only depends on the standard library at import time so it can run
+    at image build time before the rest of the app is copied in.
+    """
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _checksums(directory: str) -> Dict[str, Dict[str, Any]]:
+        checksums = {}
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, directory)
+                if relative != MANIFEST_NAME:
+                    checksums[relative] = {"size": os.path.getsize(path), "sha256": OnnxArtifactService._sha256(path)}
+        return checksums
+
+    @staticmethod
+    def build_optimized(model_name: str, output_dir: str) -> None:
+        """Export the model and processor, optimize every ONNX graph and write the manifest."""
+        import onnxruntime as ort
+        from transformers import TrOCRProcessor
+        from optimum.onnxruntime import ORTModelForVision2Seq
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        logger.info(f"Exporting {model_name} to {output_dir}")
+        TrOCRProcessor.from_pretrained(model_name).save_pretrained(output_dir)
+        ORTModelForVision2Seq.from_pretrained(model_name, use_cache=False).save_pretrained(output_dir)
+
+        for name in sorted(os.listdir(output_dir)):
+            if not name.endswith(".onnx"):
+                continue
+
+            path = os.path.join(output_dir, name)
+            optimized_path = path + ".optimized"
+
+            # Extended optimizations are hardware independent, unlike ORT_ENABLE_ALL layouts
+            session_options = ort.SessionOptions()
+            session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+            session_options.optimized_model_filepath = optimized_path
+            ort.InferenceSession(path, session_options, providers=["CPUExecutionProvider"])
+
+            os.replace(optimized_path, path)
+            logger.info(f"Optimized {name}")
+
+        manifest = {
+            "model": model_name,
+            "onnxruntime_version": ort.__version__,
+            "optimization_level": "extended",
+            "files": OnnxArtifactService._checksums(output_dir),
+        }
+        with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        logger.info(f"Wrote optimized artifacts for {model_name} to {output_dir}")
+
+    @staticmethod
+    def verify(directory: Optional[str], model_name: str, check_files: bool = False) -> bool:
+        """
+        Check that a pre-optimized directory exists, matches the model and the installed
+        ONNX Runtime and that every file has its recorded size. With check_files, every
+        file is also hashed against its recorded checksum (reads the whole model).
+        """
+        if not directory:
+            return False
+
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if not os.path.isfile(manifest_path):
+            logger.warning(f"No optimized model manifest at {manifest_path}")
+            return False
+
+        try:
+            import onnxruntime as ort
+
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+            if manifest.get("model") != model_name:
+                logger.warning(f"Optimized artifacts are for {manifest.get('model')}, expected {model_name}")
+                return False
+
+            # Serialized optimized graphs are only guaranteed to load on the runtime that wrote them
+            if manifest.get("onnxruntime_version") != ort.__version__:
+                logger.warning(
+                    f"Optimized artifacts built with onnxruntime {manifest.get('onnxruntime_version')}, "
+                    f"running {ort.__version__}"
+                )
+                return False
+
+            expected = manifest.get("files", {})
+            if not expected:
+                return False
+
+            for relative, recorded in expected.items():
+                path = os.path.join(directory, relative)
+                if not os.path.isfile(path):
+                    logger.warning(f"Optimized artifact missing: {relative}")
+                    return False
+                if os.path.getsize(path) != recorded["size"]:
+                    logger.warning(f"Size mismatch for optimized artifact {relative}")
+                    return False
+                if check_files and OnnxArtifactService._sha256(path) != recorded["sha256"]:
+                    logger.warning(f"Checksum mismatch for optimized artifact {relative}")
+                    return False
+
+            return True
+
+        except Exception as e:
+            logger.warning(f"Failed to verify optimized artifacts in {directory}: {e}")
+            return False
+
+    @staticmethod
+    def session_options(intra_op_threads: int = 0, pre_optimized: bool = True):
+        """
+        Session options with the given intra-op thread count (0 = ORT default). For
+        already-optimized graphs, optimization passes are not re-run.
+        """
+        import onnxruntime as ort
+
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = intra_op_threads
+        if pre_optimized:
+            session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        return session_options
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Build pre-optimized ONNX model artifacts")
+    parser.add_argument("--model", required=True, help="HuggingFace model name")
+    parser.add_argument("--output", required=True, help="Output directory")
+    parser.add_argument("--verify", action="store_true", help="Hash-check an existing directory instead of building")
+    args = parser.parse_args()
+
+    if args.verify:
+        raise SystemExit(0 if OnnxArtifactService.verify(args.output, args.model, check_files=True) else 1)
+    OnnxArtifactService.build_optimized(args.model, args.output)
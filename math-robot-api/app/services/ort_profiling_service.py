@@ -0,0 +1,338 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from fastapi import HTTPException, status
+from prometheus_client import Gauge, Histogram
+from app.config import config
+from app.services.model_registry_service import ModelRegistry, ModelVersion, resident_memory
+
+logger = logging.getLogger(__name__)
+
+ORT_RUN_SECONDS = Histogram(
+    "ort_session_run_seconds",
+    "ONNX Runtime session runs of sampled inference calls",
+    ["kind", "session"]
+)
+ORT_RUNS_PER_CALL = Histogram(
+    "ort_session_runs_per_call",
+    "Session runs per sampled inference call (decode steps for decoders)",
+    ["kind", "session"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+ORT_MEMORY_GROWTH = Gauge(
+    "ort_inference_memory_growth_bytes",
+    "Process-wide resident memory delta across the last sampled inference call; includes "
+    "allocations by any other thread running at the same time",
+    ["kind"]
+)
+ORT_OPERATOR_SECONDS = Gauge(
+    "ort_operator_seconds_per_run",
+    "Time per session run spent in an operator type, from the last operator capture",
+    ["kind", "session", "op"]
+)
+
+
+class OrtProfilingService:
+    """
+    Per-model ONNX Runtime timings and memory accounting.
+
+    Sampling: with ORT_PROFILING_SAMPLE_RATE > 0, the session runs of that fraction of
+    inference calls are timed, which separates the encoder from each decoder step, and
+    the change in process resident memory across the call is recorded. That delta is
+    process-wide: other requests running at the same time add to it, so it is only an
+    upper bound on what the call itself allocated.
+
+    Operator capture: ORT's own profiler can only be switched on when a session is
+    created and records every run, so a capture loads a profiling copy of the active
+    version as a shadow. It sees a sampled fraction of traffic after the primary
+    answered, so clients never wait on the profiler; once enough samples ran, the
+    profile is aggregated per operator type and the copy is unloaded.
+    """
+
+    # Per-step timings are kept for the first decode steps only
+    MAX_STEPS = 128
+
+    _local = threading.local()
+    _lock = threading.Lock()
+    _session_getters: Dict[str, Callable[[Any], Dict[str, Any]]] = {}
+    _stats: Dict[str, Dict[str, Any]] = {}
+    _captures: Dict[str, Dict[str, Any]] = {}
+    _operator_labels: Dict[str, List[tuple]] = {}
+    _tasks: set = set()
+
+    @classmethod
+    def register(cls, kind: str, sessions: Callable[[Any], Dict[str, Any]]) -> None:
+        """Declare how to find the ONNX Runtime sessions ({name: InferenceSession}) of a loaded model."""
+        cls._session_getters[kind] = sessions
+
+    @classmethod
+    def sessions(cls, kind: str, model: Any) -> Dict[str, Any]:
+        getter = cls._session_getters.get(kind)
+        return getter(model) if getter is not None and model is not None else {}
+
+    @staticmethod
+    def profiled_session_options(kind: str, session_options=None):
+        """Session options with ORT's profiler on, writing under ORT_PROFILING_DIR."""
+        import onnxruntime as ort
+
+        session_options = session_options or ort.SessionOptions()
+        session_options.enable_profiling = True
+        session_options.profile_file_prefix = os.path.join(config.ORT_PROFILING_DIR, f"ort_profile_{kind}")
+        return session_options
+
+    @classmethod
+    def instrument(cls, kind: str, version: str, model: Any) -> None:
+        """Time the session runs of a freshly loaded model while its thread is sampling."""
+        if config.ORT_PROFILING_SAMPLE_RATE <= 0:
+            return
+
+        for name, session in cls.sessions(kind, model).items():
+            for method in ("run", "run_with_iobinding"):
+                if hasattr(session, method):
+                    setattr(session, method, cls._timed(version, name, getattr(session, method)))
+
+    @classmethod
+    def _timed(cls, version: str, name: str, run: Callable) -> Callable:
+        def timed_run(*args, **kwargs):
+            trace = getattr(cls._local, "trace", None)
+            if trace is None:
+                return run(*args, **kwargs)
+            start_time = time.perf_counter()
+            try:
+                return run(*args, **kwargs)
+            finally:
+                trace.append((version, name, time.perf_counter() - start_time))
+
+        return timed_run
+
+    @classmethod
+    @contextlib.contextmanager
+    def sample(cls, kind: str) -> Iterator[None]:
+        """Record the session runs made in this thread if the call is sampled."""
+        rate = config.ORT_PROFILING_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate or getattr(cls._local, "trace", None) is not None:
+            yield
+            return
+
+        cls._local.trace = []
+        memory_before = resident_memory()
+        try:
+            yield
+        finally:
+            trace, cls._local.trace = cls._local.trace, None
+            if trace:
+                cls._record(kind, trace, resident_memory() - memory_before)
+
+    @classmethod
+    def call(cls, kind: str, function: Callable, *args, **kwargs) -> Any:
+        """Run a function under sample(), for use with asyncio.to_thread."""
+        with cls.sample(kind):
+            return function(*args, **kwargs)
+
+    @classmethod
+    def _record(cls, kind: str, trace: List[tuple], memory_growth: int) -> None:
+        version = trace[-1][0]
+        runs = defaultdict(list)
+        for _, name, seconds in trace:
+            runs[name].append(seconds)
+            ORT_RUN_SECONDS.labels(kind=kind, session=name).observe(seconds)
+        for name, durations in runs.items():
+            ORT_RUNS_PER_CALL.labels(kind=kind, session=name).observe(len(durations))
+        ORT_MEMORY_GROWTH.labels(kind=kind).set(memory_growth)
+
+        with cls._lock:
+            stats = cls._stats.get(kind)
+            if stats is None or stats["version"] != version:
+                stats = cls._stats[kind] = {
+                    "version": version, "samples": 0, "memory_growth_last": 0, "memory_growth_max": 0, "sessions": {}
+                }
+            stats["samples"] += 1
+            stats["memory_growth_last"] = memory_growth
+            stats["memory_growth_max"] = max(stats["memory_growth_max"], memory_growth)
+
+            for name, durations in runs.items():
+                session = stats["sessions"].setdefault(
+                    name, {"calls": 0, "runs": 0, "total": 0.0, "max": 0.0, "steps": []}
+                )
+                session["calls"] += 1
+                session["runs"] += len(durations)
+                session["total"] += sum(durations)
+                session["max"] = max(session["max"], max(durations))
+                # Step i of every call is averaged separately: without a KV cache later decode steps cost more
+                for step, seconds in enumerate(durations[:cls.MAX_STEPS]):
+                    if step == len(session["steps"]):
+                        session["steps"].append([0, 0.0])
+                    session["steps"][step][0] += 1
+                    session["steps"][step][1] += seconds
+
+    @classmethod
+    def start_capture(cls, kind: str, samples: int, fraction: float) -> None:
+        """Start an operator capture on a profiling copy of the active version."""
+        if kind not in cls._session_getters:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{kind} is not an ONNX Runtime model")
+        active = ModelRegistry.active(kind)
+        if active is None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"No {kind} model loaded")
+        if not cls.sessions(kind, active.model):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{kind} model {active.version} does not run on ONNX Runtime"
+            )
+        if ModelRegistry.shadow_version(kind) is not None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{kind} already has a shadow version; clear it before capturing"
+            )
+        capture = cls._captures.get(kind)
+        if capture is not None and capture["status"] == "running":
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"A {kind} capture is already running")
+
+        cls._captures[kind] = {
+            "status": "running",
+            "version": active.version,
+            "samples": samples,
+            "fraction": fraction,
+            "started_at": time.time(),
+            "finished_at": None,
+            "error": None,
+            "sessions": {},
+        }
+        task = asyncio.ensure_future(cls._capture(kind, active.version, samples, fraction))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    async def _capture(cls, kind: str, version: str, samples: int, fraction: float) -> None:
+        capture = cls._captures[kind]
+        shadow: Optional[ModelVersion] = None
+        try:
+            shadow = await ModelRegistry.set_shadow(kind, version, fraction, options={"profile": True})
+            model = shadow.model
+
+            started = time.monotonic()
+            while time.monotonic() - started < config.ORT_PROFILING_CAPTURE_TIMEOUT:
+                if ModelRegistry.shadow_version(kind) is not shadow:
+                    raise Exception("Shadow version was replaced during the capture")
+                if ModelRegistry.status()[kind]["shadow"]["samples"] >= samples:
+                    break
+                await asyncio.sleep(1)
+
+            ModelRegistry.clear_shadow(kind)
+            # Replays still running would be cut off mid-run in the profile
+            await shadow.drained.wait()
+            capture["sessions"] = await asyncio.to_thread(cls._collect, kind, model)
+            capture["status"] = "completed"
+            logger.info(f"Operator capture of {kind} model {version} completed")
+
+        except Exception as e:
+            capture["status"] = "failed"
+            capture["error"] = str(e)
+            logger.error(f"Operator capture of {kind} model {version} failed: {e}")
+            if shadow is not None and ModelRegistry.shadow_version(kind) is shadow:
+                ModelRegistry.clear_shadow(kind)
+
+        finally:
+            capture["finished_at"] = time.time()
+
+    @classmethod
+    def _collect(cls, kind: str, model: Any) -> Dict[str, Any]:
+        """Stop ORT's profiler on each session and aggregate its trace per operator type."""
+        for labels in cls._operator_labels.pop(kind, []):
+            ORT_OPERATOR_SECONDS.remove(*labels)
+
+        result = {}
+        labels = cls._operator_labels[kind] = []
+        for name, session in cls.sessions(kind, model).items():
+            path = session.end_profiling()
+            try:
+                with open(path) as f:
+                    events = json.load(f)
+            finally:
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+
+            summary = cls._summarize(events)
+            for operator in summary["operators"]:
+                ORT_OPERATOR_SECONDS.labels(kind=kind, session=name, op=operator["op"]).set(operator["per_run_ms"] / 1000)
+                labels.append((kind, name, operator["op"]))
+            result[name] = summary
+        return result
+
+    @staticmethod
+    def _summarize(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        runs = 0
+        run_us = 0
+        operators = defaultdict(lambda: [0, 0])
+        for event in events:
+            if event.get("cat") == "Session" and event.get("name") == "model_run":
+                runs += 1
+                run_us += event.get("dur", 0)
+            elif event.get("cat") == "Node" and event.get("name", "").endswith("_kernel_time"):
+                operator = operators[event.get("args", {}).get("op_name", "unknown")]
+                operator[0] += 1
+                operator[1] += event.get("dur", 0)
+
+        kernel_us = sum(total for _, total in operators.values()) or 1
+        top = sorted(operators.items(), key=lambda item: item[1][1], reverse=True)[:config.ORT_PROFILING_TOP_OPERATORS]
+        return {
+            "runs": runs,
+            "mean_run_ms": run_us / runs / 1000 if runs else None,
+            "operators": [
+                {
+                    "op": op,
+                    "calls": calls,
+                    "total_ms": total / 1000,
+                    "per_run_ms": total / max(1, runs) / 1000,
+                    "share": total / kernel_us,
+                }
+                for op, (calls, total) in top
+            ],
+        }
+
+    @classmethod
+    def status(cls) -> Dict[str, Any]:
+        models = {}
+        for kind in cls._session_getters:
+            active = ModelRegistry.active(kind)
+            with cls._lock:
+                stats = cls._stats.get(kind)
+                sessions = {
+                    name: {
+                        "calls": session["calls"],
+                        "runs_per_call": session["runs"] / session["calls"],
+                        "mean_ms": session["total"] / session["runs"] * 1000,
+                        "max_ms": session["max"] * 1000,
+                        "step_ms": [total / count * 1000 for count, total in session["steps"]],
+                    }
+                    for name, session in (stats["sessions"].items() if stats else [])
+                }
+
+            models[kind] = {
+                "version": active.version if active else None,
+                "memory_bytes": active.memory_bytes if active else 0,
+                "samples": stats["samples"] if stats else 0,
+                "sampled_version": stats["version"] if stats else None,
+                "memory_growth_last": stats["memory_growth_last"] if stats else 0,
+                "memory_growth_max": stats["memory_growth_max"] if stats else 0,
+                "sessions": sessions,
+                "capture": cls._captures.get(kind),
+            }
+
+        return {
+            "sample_rate": config.ORT_PROFILING_SAMPLE_RATE,
+            "resident_memory_bytes": resident_memory(),
+            "models": models,
+        }
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        for task in cls._tasks:
+            task.cancel()
+        await asyncio.gather(*cls._tasks, return_exceptions=True)
@@ -1,12 +1,19 @@
 import asyncio
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Union
 from fastapi import HTTPException
 
+from app.config import config
 from app.models.file_model import File
+from app.models.deadline_model import Deadline, DeadlineExceeded
 from app.services.whiteboard_processor_service import WhiteboardProcessorService
 from app.services.pix2text_service import Pix2TextService
 from app.services.ollama_service import OllamaService
+from app.services.ollama_backend_pool import OllamaUnavailable
+from app.services.latex_translator_service import LatexTranslatorService, TRANSLATIONS_TOTAL
+from app.services.single_flight import SingleFlight
+from app.services.translation_job_service import TranslationJobService
+from app.services.crop_store_service import CropStoreService
 
 logger = logging.getLogger(__name__)
 
@@ -15,23 +22,56 @@ class PipelineService:
     Simplified pipeline service that orchestrates the entire workflow.
     Uses static methods and internal File model.
     """
+
+    # Identical concurrent work (same upload, same crops, same LaTeX) runs only once
+    _pipeline_flights = SingleFlight("pipeline")
+    _ocr_flights = SingleFlight("ocr")
+    _translation_flights = SingleFlight("translation")
+
+    # eager: translate before responding; lazy: respond with a handle, translate in the background;
+    # none: OCR only
+    EAGER = "eager"
+    LAZY = "lazy"
+    NONE = "none"
+    TRANSLATION_MODES = (EAGER, LAZY, NONE)
     
     @staticmethod
-    async def process_pipeline(file: File, target_regions: int = 1) -> List[Dict[str, Any]]:
+    async def process_pipeline(file: File, target_regions: int = 1, deadline: Optional[Deadline] = None,
+                               translation_mode: str = EAGER) -> List[Dict[str, Any]]:
         """
         Complete pipeline: split whiteboard → OCR each problem → return LaTeX results
         
         Args:
             file: Internal File model
             target_regions: Number of expressions expected in the image (default: 1)
+            deadline: Optional request deadline propagated to every stage
+            translation_mode: 'eager', 'lazy' or 'none' (see TRANSLATION_MODES)
             
         Returns:
             List of dictionaries containing problem data and LaTeX results
         """
+        if file.data_type == 'bytes':
+            key = (SingleFlight.fingerprint(file.data), target_regions, translation_mode)
+            # Shared by callers with different deadlines: each one's deadline is applied by do()
+            results = await PipelineService._pipeline_flights.do(
+                key, lambda: PipelineService._run_pipeline(file, target_regions, None, translation_mode), deadline
+            )
+            # A coalesced result may come from an upload with another name
+            return [
+                {**result, "filename": f"{file.name}_problem_{result['problem_id']:02d}"}
+                for result in results
+            ]
+        return await PipelineService._run_pipeline(file, target_regions, deadline, translation_mode)
+
+    @staticmethod
+    async def _run_pipeline(file: File, target_regions: int, deadline: Optional[Deadline],
+                            translation_mode: str = EAGER) -> List[Dict[str, Any]]:
         try:
             # Step 1: Split whiteboard into individual problems
             logger.info("Step 1: Splitting whiteboard image into individual problems")
-            problem_files = await WhiteboardProcessorService.extract_problems(file, padding_ratio=0.1, target_regions=target_regions)
+            problem_files = await WhiteboardProcessorService.extract_problems(
+                file, padding_ratio=0.1, target_regions=target_regions, deadline=deadline
+            )
             
             if not problem_files:
                 raise HTTPException(status_code=400, detail="No mathematical problems detected in the image")
@@ -40,7 +80,7 @@ class PipelineService:
             
             # Step 2: Process each problem with Pix2Text to get LaTeX
             logger.info("Step 2: Converting problems to LaTeX using OCR")
-            results = await PipelineService._process_problems_with_ocr(problem_files)
+            results = await PipelineService._process_problems_with_ocr(problem_files, deadline, translation_mode)
             
             logger.info(f"Step 2 complete: Successfully processed {len(results)} problems")
             
@@ -53,17 +93,42 @@ class PipelineService:
             raise HTTPException(status_code=500, detail=f"Pipeline processing failed: {str(e)}")
     
     @staticmethod
-    async def _process_problems_with_ocr(problem_files: List[File]) -> List[Dict[str, Any]]:
+    async def recognize_problems(problem_files: List[File], deadline: Optional[Deadline] = None,
+                                 translation_mode: str = EAGER) -> List[Dict[str, Any]]:
+        """
+        OCR and translate already extracted problem crops, skipping detection.
+        Used by live sessions that only re-recognize the regions that changed.
+        """
+        return await PipelineService._process_problems_with_ocr(problem_files, deadline, translation_mode)
+
+    @staticmethod
+    async def _process_problems_with_ocr(problem_files: List[File], deadline: Optional[Deadline] = None,
+                                         translation_mode: str = EAGER) -> List[Dict[str, Any]]:
         """
         Process each problem file with Pix2Text to generate LaTeX
         """
+        # Crops recognized in earlier runs skip OCR (and translation, if it was stored too),
+        # as long as the models that produced them are still the active ones
+        versions = CropStoreService.versions()
+        stored = await CropStoreService.lookup_many(problem_files, versions)
+
+        # OCR all problems in one batched generate call; each problem awaits its own text
+        ocr_batch = asyncio.ensure_future(PipelineService._recognize_missing(problem_files, stored, deadline))
+
         # Process all problems concurrently
         tasks = []
         for i, problem_file in enumerate(problem_files):
-            task = PipelineService._process_single_problem(problem_file, i)
+            task = PipelineService._process_single_problem(
+                problem_file, i, ocr_batch, deadline, translation_mode, stored[i], versions
+            )
             tasks.append(task)
         
         results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Running out of time fails the whole request rather than individual problems
+        for result in results:
+            if isinstance(result, DeadlineExceeded):
+                raise result
         
         # Process results and handle exceptions
         processed_results = []
@@ -75,6 +140,8 @@ class PipelineService:
                     "filename": problem_files[i].name,
                     "latex_raw": None,
                     "latex_filtered": None,
+                    "translation_status": None,
+                    "translation_handle": None,
                     "error": str(result),
                     "success": False
                 })
@@ -82,27 +149,125 @@ class PipelineService:
                 processed_results.append(result)
         
         return processed_results
+
+    @staticmethod
+    async def _recognize_missing(problem_files: List[File], stored: List[Optional[Dict[str, Any]]],
+                                 deadline: Optional[Deadline] = None) -> List[Union[str, Exception]]:
+        """
+        LaTeX for every problem: stored results as they are, the rest through OCR.
+        A problem whose crop could not be recognized gets its exception instead of a text.
+        """
+        missing = [problem_file for problem_file, entry in zip(problem_files, stored) if entry is None]
+        texts = []
+        if missing:
+            try:
+                texts = await PipelineService._recognize_batch(missing, deadline)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if len(missing) == 1:
+                    texts = [e]
+                else:
+                    # One bad crop must not fail the other problems: find it by retrying one by one
+                    logger.warning(f"Batched OCR of {len(missing)} problems failed, retrying them one by one: {e}")
+                    singles = await asyncio.gather(
+                        *(PipelineService._recognize_batch([problem_file], deadline) for problem_file in missing),
+                        return_exceptions=True
+                    )
+                    texts = [single if isinstance(single, BaseException) else single[0] for single in singles]
+
+        recognized = iter(texts)
+        return [entry["latex_raw"] if entry is not None else next(recognized) for entry in stored]
+
+    @staticmethod
+    async def _recognize_batch(problem_files: List[File], deadline: Optional[Deadline] = None) -> List[str]:
+        ocr_key = tuple(SingleFlight.fingerprint(problem_file.data) for problem_file in problem_files)
+        return await PipelineService._ocr_flights.do(
+            ocr_key, lambda: Pix2TextService.recognize_formulas(problem_files), deadline
+        )
     
     @staticmethod
-    async def _process_single_problem(problem_file: File, index: int) -> Dict[str, Any]:
+    async def _process_single_problem(problem_file: File, index: int, ocr_batch: asyncio.Future,
+                                      deadline: Optional[Deadline] = None,
+                                      translation_mode: str = EAGER,
+                                      stored: Optional[Dict[str, Any]] = None,
+                                      versions: Tuple[str, str] = ("", "")) -> Dict[str, Any]:
         """
         Process a single problem file: OCR → LaTeX → Filter via Ollama
         """
         try:
             # Step 1: OCR
-            latex_result = await Pix2TextService.recognize_formula(problem_file)
+            latex_result = (await ocr_batch)[index]
+            if isinstance(latex_result, BaseException):
+                raise latex_result
+
+            # Step 2: Filter/normalize via the rule-based fast path, falling back to Ollama
+            filtered_latex, translation_status, translation_handle = None, "skipped", None
+            if translation_mode != PipelineService.NONE:
+                filtered_latex = stored["latex_filtered"] if stored is not None else None
+                if filtered_latex is None:
+                    filtered_latex = await PipelineService._fast_translate(latex_result)
+                translation_status = "completed"
 
-            # Step 2: Filter/normalize via Ollama
-            filtered_latex = await OllamaService.filter_latex(latex_result)
+            if filtered_latex is None and translation_mode == PipelineService.LAZY:
+                translation_handle = PipelineService._defer_translation(latex_result)
+                translation_status = "pending" if translation_handle is not None else "skipped"
+            elif filtered_latex is None and translation_mode == PipelineService.EAGER:
+                try:
+                    filtered_latex = await PipelineService._translate_with_llm(latex_result, deadline)
+                except OllamaUnavailable as e:
+                    if not config.OLLAMA_DEGRADED_MODE:
+                        raise
+                    # Degraded mode: still return the OCR result and translate once Ollama is back
+                    logger.warning(f"Ollama unavailable for problem {index + 1}, deferring translation: {e.detail}")
+                    translation_handle = PipelineService._defer_translation(latex_result)
+                    translation_status = "pending" if translation_handle is not None else "skipped"
+
+            if latex_result and (stored is None or (filtered_latex is not None and stored["latex_filtered"] is None)):
+                CropStoreService.remember(problem_file, latex_result, filtered_latex, versions)
 
             return {
                 "problem_id": index + 1,
                 "filename": problem_file.name,
                 "latex_raw": latex_result,
                 "latex_filtered": filtered_latex,
+                "translation_status": translation_status,
+                "translation_handle": translation_handle,
                 "error": None,
                 "success": True
             }
         except Exception as e:
             logger.error(f"OCR/Ollama failed for problem {index + 1}: {str(e)}")
             raise e
+
+    @staticmethod
+    def _defer_translation(latex_input: str) -> Optional[str]:
+        """Queue an LLM translation in the background and return its handle, None if the queue is full"""
+        return TranslationJobService.submit(
+            latex_input, lambda deadline: PipelineService._translate_with_llm(latex_input, deadline)
+        )
+
+    @staticmethod
+    async def _fast_translate(latex_input: str) -> Optional[str]:
+        """
+        Translate LaTeX to Wolfram syntax with the deterministic translator, or None if it is
+        disabled or not confident enough and the LLM has to be used
+        """
+        if not config.LATEX_FAST_PATH_ENABLED:
+            return None
+
+        wolfram, confidence = await LatexTranslatorService.translate(latex_input)
+        if wolfram is None or confidence < config.LATEX_FAST_PATH_MIN_CONFIDENCE:
+            return None
+
+        TRANSLATIONS_TOTAL.labels(path="fast_path").inc()
+        logger.info(f"Fast path translated {latex_input!r} → {wolfram!r} (confidence {confidence})")
+        return wolfram
+
+    @staticmethod
+    async def _translate_with_llm(latex_input: str, deadline: Optional[Deadline] = None) -> str:
+        TRANSLATIONS_TOTAL.labels(path="llm").inc()
+        key = " ".join(latex_input.split())
+        return await PipelineService._translation_flights.do(
+            key, lambda: OllamaService.filter_latex(latex_input), deadline
+        )
@@ -1,20 +1,25 @@
 import asyncio
 import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import cv2
+import numpy as np
 from PIL import Image
-from transformers import TrOCRProcessor
-from optimum.onnxruntime import ORTModelForVision2Seq
+from app.config import config
 from app.models.file_model import File
+from app.models.deadline_model import Deadline, DeadlineExceeded
+from app.services.onnx_artifact_service import OnnxArtifactService
+from app.services.model_registry_service import ModelRegistry
+from app.services.ort_profiling_service import OrtProfilingService
 
 logger = logging.getLogger(__name__)
 
-MODEL_NAME = "breezedeus/pix2text-mfr-1.5"
-
 
 class Pix2TextService:
     __instance = None
     __lock = asyncio.Lock()
-    __processor = None
-    __model = None
+    __buffers = threading.local()
 
     @classmethod 
     async def get_instance(cls): 
@@ -27,48 +32,238 @@ class Pix2TextService:
     async def init(cls):
         """Load the ONNX model & processor once."""
         async with cls.__lock:
-            if cls.__model is not None:
+            ModelRegistry.register_loader("pix2text", cls._load_version)
+            OrtProfilingService.register("pix2text", cls._ort_sessions)
+            if ModelRegistry.active("pix2text") is not None:
                 return
 
             logger.info("Loading Pix2Text ONNX model...")
+            await ModelRegistry.activate("pix2text", config.PIX2TEXT_MODEL)
+            logger.info("Pix2Text ONNX model loaded successfully")
 
-            cls.__processor = TrOCRProcessor.from_pretrained(MODEL_NAME)
-            cls.__model = ORTModelForVision2Seq.from_pretrained(
-                MODEL_NAME,
-                use_cache=False
-            )
+    @classmethod
+    async def _load_version(cls, model_name: str, profile: bool = False,
+                            intra_op_threads: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Registry loader: processor, model and verified preprocessing for one model version.
+        With profile=True the ONNX Runtime sessions record an operator-level profile.
+        """
+        # Heavy imports, model loading and the preprocessing check run in a thread, so other
+        # models can load concurrently and requests keep being served
+        def load():
+            processor, model = cls._load(model_name, profile, intra_op_threads)
+            preprocess_params = cls._verify_fast_preprocessing(processor) if config.PIX2TEXT_FAST_PREPROCESS else None
+            return processor, model, preprocess_params
 
-            logger.info("Pix2Text ONNX model loaded successfully")
+        processor, model, preprocess_params = await asyncio.to_thread(load)
+
+        bundle = {"processor": processor, "model": model, "preprocess_params": preprocess_params}
+        if not profile:
+            OrtProfilingService.instrument("pix2text", model_name, bundle)
+        return bundle
 
     @staticmethod
-    async def recognize_formula(file: File) -> str:
-        """Extract LaTeX from a mathematical image."""
-        if Pix2TextService.__model is None:
-            raise Exception("Pix2TextService not initialized. Call init() first.")
+    def _ort_sessions(bundle: Dict[str, Any]) -> Dict[str, Any]:
+        sessions = {}
+        for name in ("encoder", "decoder", "decoder_with_past"):
+            session = getattr(getattr(bundle["model"], name, None), "session", None)
+            if session is not None:
+                sessions[name] = session
+        return sessions
+
+    @staticmethod
+    def _load(model_name: str, profile: bool = False, intra_op_threads: Optional[int] = None):
+        from transformers import TrOCRProcessor
+        from optimum.onnxruntime import ORTModelForVision2Seq
+
+        if intra_op_threads is None:
+            intra_op_threads = config.PIX2TEXT_INTRA_OP_THREADS
+
+        optimized_path = config.PIX2TEXT_OPTIMIZED_PATH
+        if OnnxArtifactService.verify(optimized_path, model_name, check_files=config.PIX2TEXT_VERIFY_CHECKSUMS):
+            try:
+                session_options = OnnxArtifactService.session_options(intra_op_threads)
+                if profile:
+                    session_options = OrtProfilingService.profiled_session_options("pix2text", session_options)
+                processor = TrOCRProcessor.from_pretrained(optimized_path)
+                model = ORTModelForVision2Seq.from_pretrained(
+                    optimized_path,
+                    use_cache=False,
+                    session_options=session_options
+                )
+                logger.info(f"Loaded pre-optimized Pix2Text model from {optimized_path}")
+                return processor, model
+            except Exception as e:
+                logger.warning(f"Failed to load pre-optimized Pix2Text model, falling back: {e}")
+
+        session_options = OnnxArtifactService.session_options(intra_op_threads, pre_optimized=False)
+        if profile:
+            session_options = OrtProfilingService.profiled_session_options("pix2text", session_options)
+        processor = TrOCRProcessor.from_pretrained(model_name)
+        model = ORTModelForVision2Seq.from_pretrained(
+            model_name,
+            use_cache=False,
+            session_options=session_options
+        )
+        return processor, model
 
+    @classmethod
+    def _verify_fast_preprocessing(cls, processor) -> Optional[dict]:
+        """
+        Derive resize/normalize parameters from the processor config and check the NumPy
+        path against the processor output on a synthetic crop before enabling it.
+        """
         try:
-            # Your File model returns a PIL image
-            pil_image: Image.Image = await file.to_pil()
-            pil_image = pil_image.convert("RGB")
+            image_processor = processor.image_processor
+            size = image_processor.size
+            params = {
+                "height": size["height"],
+                "width": size["width"],
+                "scale": np.asarray(image_processor.rescale_factor / np.asarray(image_processor.image_std), dtype=np.float32),
+                "offset": np.asarray(np.asarray(image_processor.image_mean) / np.asarray(image_processor.image_std), dtype=np.float32),
+            }
 
-            # Convert to tensor for ONNX
-            pixel_values = Pix2TextService.__processor(
-                images=[pil_image],
-                return_tensors="pt"
-            ).pixel_values
+            # Handwriting-like sample: dark strokes on a light background, smaller and larger than the target size
+            mean_errors, max_errors = [], []
+            for shape in ((96, 640), (512, 300)):
+                sample = np.full((*shape, 3), 235, dtype=np.uint8)
+                cv2.putText(sample, "x^2+1=5", (10, shape[0] // 2), cv2.FONT_HERSHEY_SIMPLEX, 2, (40, 40, 40), 4)
 
-            # Generate predicted LaTeX
-            generated_ids = Pix2TextService.__model.generate(pixel_values)
+                expected = processor(
+                    images=[Image.fromarray(cv2.cvtColor(sample, cv2.COLOR_BGR2RGB))],
+                    return_tensors="np"
+                ).pixel_values
+                actual = cls._preprocess([sample], params)
+                errors = np.abs(expected - actual)
+                mean_errors.append(float(errors.mean()))
+                max_errors.append(float(errors.max()))
 
-            # Decode tokens into text
-            text = Pix2TextService.__processor.batch_decode(
-                generated_ids,
-                skip_special_tokens=True
-            )[0]
+            if max(mean_errors) > config.PIX2TEXT_PREPROCESS_TOLERANCE or max(max_errors) > config.PIX2TEXT_PREPROCESS_MAX_ERROR:
+                logger.warning(
+                    f"NumPy preprocessing deviates from TrOCRProcessor (mean error {max(mean_errors):.4f}, "
+                    f"max error {max(max_errors):.4f}), disabled"
+                )
+                return None
 
-            logger.info(f"Recognized LaTeX from {file.name}: {text}")
-            return text
+            logger.info(f"NumPy preprocessing enabled (mean error {max(mean_errors):.4f}, max error {max(max_errors):.4f})")
+            return params
 
+        except Exception as e:
+            logger.warning(f"NumPy preprocessing unavailable, using TrOCRProcessor: {e}")
+            return None
+
+    @classmethod
+    def _preprocess(cls, images: List[np.ndarray], params: dict) -> np.ndarray:
+        """Resize and normalize BGR crops straight into a reusable pixel_values buffer."""
+        height, width = params["height"], params["width"]
+        buffer = getattr(cls.__buffers, "pixel_values", None)
+        # Model versions may differ in input size, so the buffer is keyed on its shape too
+        if buffer is None or buffer.shape[0] < len(images) or buffer.shape[2:] != (height, width):
+            buffer = np.empty((len(images), 3, height, width), dtype=np.float32)
+            cls.__buffers.pixel_values = buffer
+
+        for i, img in enumerate(images):
+            if img.ndim == 2:
+                img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+            elif img.shape[2] == 4:
+                img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+
+            # INTER_AREA approximates PIL's antialiased bilinear when shrinking
+            shrinking = img.shape[0] > height and img.shape[1] > width
+            interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+            resized = cv2.resize(img, (width, height), interpolation=interpolation)
+
+            # BGR HWC → RGB CHW
+            buffer[i] = resized[:, :, ::-1].transpose(2, 0, 1)
+
+        pixel_values = buffer[:len(images)]
+        pixel_values *= params["scale"][:, None, None]
+        pixel_values -= params["offset"][:, None, None]
+        return pixel_values
+
+    @staticmethod
+    async def recognize_formula(file: File, deadline: Optional[Deadline] = None) -> str:
+        """Extract LaTeX from a mathematical image."""
+        return (await Pix2TextService.recognize_formulas([file], deadline))[0]
+
+    @staticmethod
+    async def recognize_formulas(files: List[File], deadline: Optional[Deadline] = None) -> List[str]:
+        """
+        Extract LaTeX from a batch of mathematical images.
+
+        Crops are recognized in chunks of PIX2TEXT_BATCH_SIZE, each in a worker thread.
+        Chunks that have not started yet are dropped when the request is cancelled or
+        its deadline passes.
+        """
+        if ModelRegistry.active("pix2text") is None:
+            raise Exception("Pix2TextService not initialized. Call init() first.")
+
+        try:
+            async with ModelRegistry.use("pix2text") as version:
+                start_time = time.perf_counter()
+                texts = await Pix2TextService._recognize_all(files, version.model, deadline)
+
+            for file, text in zip(files, texts):
+                logger.info(f"Recognized LaTeX from {file.name}: {text}")
+
+            ModelRegistry.shadow(
+                "pix2text",
+                lambda bundle: Pix2TextService._recognize_all(files, bundle),
+                texts,
+                time.perf_counter() - start_time,
+                lambda primary, shadow: [" ".join(text.split()) for text in primary] == [" ".join(text.split()) for text in shadow]
+            )
+            return texts
+
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Failed LaTeX OCR: {str(e)}")
             raise Exception(f"Failed LaTeX OCR: {str(e)}")
+
+    @staticmethod
+    async def _recognize_all(files: List[File], bundle: Dict[str, Any], deadline: Optional[Deadline] = None,
+                             batch_size: Optional[int] = None) -> List[str]:
+        texts = []
+        batch_size = max(1, batch_size or config.PIX2TEXT_BATCH_SIZE)
+        for start in range(0, len(files), batch_size):
+            Deadline.check_optional(deadline, "OCR")
+            chunk = files[start:start + batch_size]
+            texts.extend(await Pix2TextService._recognize_chunk(chunk, bundle))
+        return texts
+
+    @staticmethod
+    async def _recognize_chunk(files: List[File], bundle: Dict[str, Any]) -> List[str]:
+        if bundle["preprocess_params"] is not None:
+            images = [await file.to_cv2() for file in files]
+            return await asyncio.to_thread(Pix2TextService._generate, images, bundle)
+
+        # Your File model returns a PIL image
+        pil_images: List[Image.Image] = [(await file.to_pil()).convert("RGB") for file in files]
+        return await asyncio.to_thread(Pix2TextService._generate, pil_images, bundle)
+
+    @staticmethod
+    def _generate(images: list, bundle: Dict[str, Any]) -> List[str]:
+        processor = bundle["processor"]
+        params = bundle["preprocess_params"]
+
+        if params is not None:
+            import torch
+
+            pixel_values = torch.from_numpy(Pix2TextService._preprocess(images, params))
+        else:
+            # Convert to tensor for ONNX
+            pixel_values = processor(
+                images=images,
+                return_tensors="pt"
+            ).pixel_values
+
+        # Generate predicted LaTeX
+        with OrtProfilingService.sample("pix2text"):
+            generated_ids = bundle["model"].generate(pixel_values)
+
+        # Decode tokens into text
+        return processor.batch_decode(
+            generated_ids,
+            skip_special_tokens=True
+        )
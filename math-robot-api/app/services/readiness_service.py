@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Any
+from fastapi import HTTPException, status
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+STARTUP_DURATION = Gauge(
+    "app_startup_duration_seconds",
+    "Time each component took to initialize at startup",
+    ["component"]
+)
+COMPONENT_READY = Gauge(
+    "app_component_ready",
+    "Whether a component finished initializing (1) or not (0)",
+    ["component"]
+)
+
+
+class ReadinessService:
+    """
+    Tracks per-component startup state so models can load concurrently in the
+    background while the app already answers liveness checks.
+    """
+
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    _states: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def register(cls, *components: str) -> None:
+        """Declare components that must finish initializing before the app is ready."""
+        for component in components:
+            cls._states.setdefault(component, {
+                "state": cls.PENDING,
+                "duration": None,
+                "error": None
+            })
+            COMPONENT_READY.labels(component=component).set(0)
+
+    @classmethod
+    async def run(cls, component: str, init: Callable[[], Awaitable[None]]) -> None:
+        """Run a component's init, recording its state and duration."""
+        cls.register(component)
+        cls._states[component]["state"] = cls.LOADING
+        start_time = time.perf_counter()
+
+        try:
+            await init()
+            cls._states[component]["state"] = cls.READY
+            COMPONENT_READY.labels(component=component).set(1)
+        except Exception as e:
+            logger.error(f"Failed to initialize {component}: {str(e)}")
+            cls._states[component]["state"] = cls.FAILED
+            cls._states[component]["error"] = str(e)
+        finally:
+            duration = time.perf_counter() - start_time
+            cls._states[component]["duration"] = round(duration, 3)
+            STARTUP_DURATION.labels(component=component).set(duration)
+            logger.info(f"{component} initialization finished in {duration:.2f}s")
+
+    @classmethod
+    async def run_all(cls, inits: Dict[str, Callable[[], Awaitable[None]]]) -> None:
+        """Initialize all components concurrently."""
+        cls.register(*inits)
+        await asyncio.gather(*(cls.run(component, init) for component, init in inits.items()))
+
+    @classmethod
+    def get_states(cls) -> Dict[str, Dict[str, Any]]:
+        return {component: dict(state) for component, state in cls._states.items()}
+
+    @classmethod
+    def is_ready(cls, *components: str) -> bool:
+        """Whether the given components (all registered ones by default) are ready."""
+        names = components or tuple(cls._states)
+        return all(cls._states.get(name, {}).get("state") == cls.READY for name in names)
+
+    @classmethod
+    def require(cls, *components: str) -> Callable[[], None]:
+        """FastAPI dependency rejecting requests until the given components are ready."""
+        def dependency() -> None:
+            if not cls.is_ready(*components):
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=f"Service not ready: waiting for {', '.join(components)}",
+                    headers={"Retry-After": "5"},
+                )
+        return dependency
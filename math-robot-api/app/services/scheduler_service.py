@@ -0,0 +1,184 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import math
+import time
+from typing import AsyncIterator, Dict, List, Tuple
+from fastapi import Depends, HTTPException, status
+from prometheus_client import Counter, Gauge, Histogram
+from app.config import config
+from app.models.deadline_model import Deadline, DeadlineExceeded
+from app.services.auth_service import basic_auth
+from app.services.cancellation_service import CancellationService
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = Gauge(
+    "scheduler_queue_depth",
+    "Requests waiting for an execution slot",
+    ["request_class"]
+)
+QUEUE_WAIT = Histogram(
+    "scheduler_queue_wait_seconds",
+    "Time requests spent waiting for an execution slot",
+    ["request_class"]
+)
+SHED_TOTAL = Counter(
+    "scheduler_shed_total",
+    "Requests rejected because their estimated queue wait exceeded the deadline",
+    ["request_class", "tenant"]
+)
+
+
+class _Ticket:
+    def __init__(self, request_class: str, tenant: str, cost: float, start: float, finish: float):
+        self.request_class = request_class
+        self.tenant = tenant
+        self.cost = cost
+        self.start = start
+        self.finish = finish
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class SchedulerService:
+    """
+    In-app admission control with weighted fair queueing.
+
+    At most SCHEDULER_MAX_CONCURRENCY requests run at once; the rest wait in a single
+    queue ordered by start-time fair queueing tags per (request class, tenant) flow,
+    weighted by class (interactive over bulk) and by tenant. Requests whose estimated
+    wait exceeds their deadline are shed immediately with 503 + Retry-After.
+    """
+
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+    # Deferred work queued by the app itself, e.g. lazy translations
+    BACKGROUND = "background"
+
+    CLASS_WEIGHTS = {INTERACTIVE: 4.0, BULK: 1.0, BACKGROUND: 0.25}
+    # Initial service time estimates (seconds) until real observations come in
+    DEFAULT_SERVICE_TIMES = {INTERACTIVE: 1.0, BULK: 5.0, BACKGROUND: 2.0}
+    EWMA_ALPHA = 0.2
+
+    _in_flight = 0
+    _queue: List[Tuple[float, int, _Ticket]] = []
+    _sequence = itertools.count()
+    _virtual_time = 0.0
+    _last_finish: Dict[Tuple[str, str], float] = {}
+    _service_times: Dict[str, float] = dict(DEFAULT_SERVICE_TIMES)
+
+    @classmethod
+    def _weight(cls, request_class: str, tenant: str) -> float:
+        return cls.CLASS_WEIGHTS[request_class] * config.SCHEDULER_TENANT_WEIGHTS.get(tenant, 1.0)
+
+    @classmethod
+    def _tag(cls, request_class: str, tenant: str, cost: float) -> Tuple[float, float]:
+        """Start and finish tags of a new request in its flow."""
+        flow = (request_class, tenant)
+        start = max(cls._virtual_time, cls._last_finish.get(flow, 0.0))
+        finish = start + cost / cls._weight(request_class, tenant)
+        return start, finish
+
+    @classmethod
+    def estimate_wait(cls, finish: float) -> float:
+        """Seconds until a request with this finish tag would get a slot."""
+        queued_ahead = sum(
+            ticket.cost for tag, _, ticket in cls._queue
+            if tag < finish and not ticket.future.done()
+        )
+        average = sum(cls._service_times.values()) / len(cls._service_times)
+        # Running requests are on average half done
+        in_flight_remaining = cls._in_flight * average / 2
+        return (queued_ahead + in_flight_remaining) / max(1, config.SCHEDULER_MAX_CONCURRENCY)
+
+    @classmethod
+    async def acquire(cls, request_class: str, tenant: str, deadline: Deadline) -> None:
+        """Wait for an execution slot, or shed the request if it cannot start in time."""
+        cost = cls._service_times[request_class]
+
+        start, finish = cls._tag(request_class, tenant, cost)
+
+        if cls._in_flight < config.SCHEDULER_MAX_CONCURRENCY and not cls._queue:
+            cls._last_finish[(request_class, tenant)] = finish
+            cls._virtual_time = start
+            cls._in_flight += 1
+            return
+
+        estimated_wait = cls.estimate_wait(finish)
+        if estimated_wait > deadline.remaining():
+            SHED_TOTAL.labels(request_class=request_class, tenant=tenant).inc()
+            logger.warning(f"Shedding {request_class} request from {tenant}: estimated wait {estimated_wait:.1f}s")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry later",
+                headers={"Retry-After": str(max(1, math.ceil(estimated_wait)))},
+            )
+
+        cls._last_finish[(request_class, tenant)] = finish
+        ticket = _Ticket(request_class, tenant, cost, start, finish)
+        heapq.heappush(cls._queue, (finish, next(cls._sequence), ticket))
+        QUEUE_DEPTH.labels(request_class=request_class).inc()
+        queued_at = time.perf_counter()
+        cls._dispatch()
+
+        try:
+            await asyncio.wait_for(ticket.future, timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("queueing")
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # The slot was granted just as the request went away
+                cls._in_flight -= 1
+            raise
+        finally:
+            QUEUE_DEPTH.labels(request_class=request_class).dec()
+            QUEUE_WAIT.labels(request_class=request_class).observe(time.perf_counter() - queued_at)
+            # Abandoned tickets stay in the heap and are skipped on dispatch
+            cls._dispatch()
+
+    @classmethod
+    def release(cls, request_class: str, duration: float) -> None:
+        """Free a slot and fold the observed service time into the estimate."""
+        previous = cls._service_times[request_class]
+        cls._service_times[request_class] = (1 - cls.EWMA_ALPHA) * previous + cls.EWMA_ALPHA * duration
+        cls._in_flight -= 1
+        cls._dispatch()
+
+    @classmethod
+    def _dispatch(cls) -> None:
+        while cls._queue and cls._in_flight < config.SCHEDULER_MAX_CONCURRENCY:
+            _, _, ticket = heapq.heappop(cls._queue)
+            if ticket.future.done():
+                continue
+            cls._virtual_time = ticket.start
+            cls._in_flight += 1
+            ticket.future.set_result(None)
+
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def slot(cls, request_class: str, tenant: str, deadline: Deadline) -> AsyncIterator[None]:
+        """Hold an execution slot for the body of an `async with` block."""
+        if not config.SCHEDULER_ENABLED:
+            yield
+            return
+
+        await cls.acquire(request_class, tenant, deadline)
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.release(request_class, time.perf_counter() - started_at)
+
+    @classmethod
+    def admit(cls, request_class: str):
+        """FastAPI dependency holding an execution slot for the duration of the request."""
+        async def dependency(
+            username: str = Depends(basic_auth),
+            deadline: Deadline = Depends(CancellationService.get_deadline)
+        ):
+            async with cls.slot(request_class, username, deadline):
+                yield
+
+        return dependency
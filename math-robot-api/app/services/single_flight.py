@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Union
+import numpy as np
+from prometheus_client import Counter
+from app.models.deadline_model import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+COALESCED_TOTAL = Counter(
+    "single_flight_coalesced_total",
+    "Calls that joined identical in-flight work instead of running it again",
+    ["group"]
+)
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one shared task.
+
+    Every caller awaits the same result or exception. The shared task is cancelled only
+    when every caller waiting on it has been cancelled or run out of time, so a cancelled
+    leader does not take down the duplicates that joined it. Keys are forgotten as soon as the work
+    finishes, so later calls (including retries after a failure) run fresh.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], deadline: Optional[Deadline] = None) -> Any:
+        """
+        Await the shared result of fn() for key.
+
+        fn must not capture a caller's deadline: callers with different deadlines share
+        it. Each caller's own deadline is applied here instead, so a caller gives up
+        (DeadlineExceeded) without affecting the others.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            COALESCED_TOTAL.labels(group=self.name).inc()
+            logger.info(f"Coalesced duplicate {self.name} request")
+
+        flight.waiters += 1
+        try:
+            if deadline is None:
+                return await asyncio.shield(flight.task)
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight.task), timeout=deadline.remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(self.name)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+                # The task only finishes cancelling later: new callers must not join it meanwhile
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the exception as retrieved when nobody is left to await it
+        if not flight.task.cancelled() and flight.waiters == 0:
+            flight.task.exception()
+
+    @staticmethod
+    def fingerprint(data: Union[bytes, np.ndarray]) -> str:
+        """Content hash of raw upload bytes or an image array (including its shape)."""
+        digest = hashlib.blake2b(digest_size=16)
+        if isinstance(data, np.ndarray):
+            digest.update(f"{data.shape}{data.dtype}".encode())
+            digest.update(np.ascontiguousarray(data).data)
+        else:
+            digest.update(data)
+        return digest.hexdigest()
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+from app.config import config
+from app.models.deadline_model import Deadline
+from app.services.scheduler_service import SchedulerService
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_JOBS_TOTAL = Counter(
+    "translation_jobs_total",
+    "Deferred translation jobs by final status",
+    ["status"]
+)
+TRANSLATION_JOBS_PENDING = Gauge(
+    "translation_jobs_pending",
+    "Deferred translation jobs waiting or running"
+)
+
+
+class TranslationJobService:
+    """
+    Runs LaTeX → Wolfram translations in the background for the lazy translation mode.
+
+    Each job gets an unguessable handle the client uses to fetch or long-poll the
+    result. Workers take a scheduler slot of the background class, so deferred
+    translations only use capacity that interactive and bulk requests leave free.
+    A job's TRANSLATION_JOB_TIMEOUT counts from submission, queueing included, and
+    at most TRANSLATION_MAX_PENDING jobs are unfinished at a time. Finished jobs are
+    kept for TRANSLATION_JOB_TTL seconds.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    TENANT = "translation_jobs"
+    # Back-off when Ollama or the scheduler answer 503 without a Retry-After
+    RETRY_DELAY = 5.0
+
+    _jobs: Dict[str, Dict[str, Any]] = {}
+    _queue: Optional[asyncio.Queue] = None
+    _workers: List[asyncio.Task] = []
+
+    @classmethod
+    def submit(cls, latex_raw: str, translate: Callable[[Deadline], Awaitable[str]]) -> Optional[str]:
+        """Queue a translation and return its handle, or None if too many are unfinished."""
+        cls._prune()
+        unfinished = sum(1 for job in cls._jobs.values() if job["finished_at"] is None)
+        if unfinished >= config.TRANSLATION_MAX_PENDING:
+            TRANSLATION_JOBS_TOTAL.labels(status="rejected").inc()
+            logger.warning(f"{unfinished} translation jobs unfinished, not queueing another")
+            return None
+        cls._start_workers()
+
+        handle = secrets.token_urlsafe(16)
+        cls._jobs[handle] = {
+            "handle": handle,
+            "status": cls.PENDING,
+            "latex_raw": latex_raw,
+            "latex_filtered": None,
+            "error": None,
+            "finished_at": None,
+            "deadline": Deadline(config.TRANSLATION_JOB_TIMEOUT),
+            "done": asyncio.Event(),
+        }
+        TRANSLATION_JOBS_PENDING.inc()
+        cls._queue.put_nowait((handle, translate))
+        return handle
+
+    @classmethod
+    async def get(cls, handle: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """Job state, waiting up to `wait` seconds for it to finish. None if unknown or expired."""
+        cls._prune()
+        job = cls._jobs.get(handle)
+        if job is None:
+            return None
+
+        if wait > 0 and not job["done"].is_set():
+            try:
+                await asyncio.wait_for(job["done"].wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+        return {key: value for key, value in job.items() if key not in ("done", "finished_at", "deadline")}
+
+    @classmethod
+    def _prune(cls) -> None:
+        # Jobs still queued past their deadline would only fail once a worker gets to them
+        for job in cls._jobs.values():
+            if job["status"] == cls.PENDING and job["deadline"].expired():
+                job["error"] = "Translation timed out while queued"
+                cls._finish(job, cls.FAILED)
+
+        now = time.monotonic()
+        expired = [
+            handle for handle, job in cls._jobs.items()
+            if job["finished_at"] is not None and now - job["finished_at"] > config.TRANSLATION_JOB_TTL
+        ]
+        for handle in expired:
+            del cls._jobs[handle]
+
+    @classmethod
+    def _start_workers(cls) -> None:
+        if cls._queue is None:
+            cls._queue = asyncio.Queue()
+        cls._workers = [worker for worker in cls._workers if not worker.done()]
+        while len(cls._workers) < max(1, config.TRANSLATION_WORKERS):
+            cls._workers.append(asyncio.create_task(cls._worker()))
+
+    @classmethod
+    async def _worker(cls) -> None:
+        while True:
+            handle, translate = await cls._queue.get()
+            try:
+                await cls._run(handle, translate)
+            except Exception as e:
+                logger.error(f"Translation job {handle} crashed: {e}")
+            finally:
+                cls._queue.task_done()
+
+    @classmethod
+    def _finish(cls, job: Dict[str, Any], status: str) -> None:
+        job["status"] = status
+        job["finished_at"] = time.monotonic()
+        job["done"].set()
+        TRANSLATION_JOBS_PENDING.dec()
+        TRANSLATION_JOBS_TOTAL.labels(status=status).inc()
+
+    @classmethod
+    async def _run(cls, handle: str, translate: Callable[[Deadline], Awaitable[str]]) -> None:
+        cls._prune()
+        job = cls._jobs.get(handle)
+        if job is None or job["status"] != cls.PENDING:
+            # Expired while queued
+            return
+        job["status"] = cls.RUNNING
+        deadline = job["deadline"]
+
+        try:
+            while True:
+                try:
+                    async with SchedulerService.slot(SchedulerService.BACKGROUND, cls.TENANT, deadline):
+                        job["latex_filtered"] = await translate(deadline)
+                    job["status"] = cls.COMPLETED
+                    break
+                except HTTPException as e:
+                    # Overloaded or no Ollama backend up: retry until the job times out
+                    if e.status_code != 503:
+                        raise
+                    delay = float((e.headers or {}).get("Retry-After", cls.RETRY_DELAY))
+                    if delay >= deadline.remaining():
+                        raise
+                    logger.info(f"Translation job {handle} deferred for {delay:.0f}s: {e.detail}")
+                    await asyncio.sleep(delay)
+
+        except Exception as e:
+            job["status"] = cls.FAILED
+            job["error"] = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Translation job {handle} failed: {job['error']}")
+
+        finally:
+            if job["status"] not in (cls.COMPLETED, cls.FAILED):
+                job["status"] = cls.FAILED
+                job["error"] = "Translation was cancelled"
+            cls._finish(job, job["status"])
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Cancel the workers; unfinished jobs are lost."""
+        for worker in cls._workers:
+            worker.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers = []
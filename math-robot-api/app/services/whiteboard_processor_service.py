@@ -1,24 +1,69 @@
+import asyncio
+import os
+import threading
+import time
 import cv2
 import numpy as np
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
-from ultralytics import YOLO
 from app.models.file_model import File
+from app.models.deadline_model import Deadline
+from app.services.yolo_onnx_detector import YoloOnnxDetector
+from app.services.model_registry_service import ModelRegistry
+from app.services.ort_profiling_service import OrtProfilingService
 from app.config import config
 
 logger = logging.getLogger(__name__)
 
 class WhiteboardProcessorService:
     _instance = None
-    _model = None
+    _ultralytics_lock = threading.Lock()
     
     @classmethod
     async def init(cls):
         """Initialize the YOLO model (call this once at startup)"""
-        if cls._model is None:
-            logger.info(f"Loading YOLO model from: {config.YOLO_PATH}")
-            cls._model = YOLO(config.YOLO_PATH)
+        ModelRegistry.register_loader("yolo", cls._load_version)
+        OrtProfilingService.register(
+            "yolo", lambda model: {"detector": model.session} if isinstance(model, YoloOnnxDetector) else {}
+        )
+        if ModelRegistry.active("yolo") is None:
+            model_path = cls._initial_model_path()
+            logger.info(f"Loading YOLO model from: {model_path}")
+            await ModelRegistry.activate("yolo", model_path)
+
+    @staticmethod
+    def _initial_model_path() -> str:
+        if config.YOLO_BACKEND == "onnx":
+            if os.path.isfile(config.YOLO_ONNX_PATH):
+                return config.YOLO_ONNX_PATH
+            logger.warning(f"YOLO ONNX model not found at {config.YOLO_ONNX_PATH}, falling back to ultralytics")
+        return config.YOLO_PATH
+
+    @staticmethod
+    async def _load_version(model_path: str, profile: bool = False):
+        """Registry loader: the backend follows the file type (.onnx or ultralytics weights)"""
+        model = await asyncio.to_thread(WhiteboardProcessorService._load, model_path, profile)
+        if not profile:
+            OrtProfilingService.instrument("yolo", model_path, model)
+        return model
+
+    @staticmethod
+    def _load(model_path: str, profile: bool = False, intra_op_threads: Optional[int] = None):
+        if model_path and model_path.endswith(".onnx"):
+            return YoloOnnxDetector(
+                model_path,
+                conf_threshold=config.YOLO_CONF_THRESHOLD,
+                iou_threshold=config.YOLO_IOU_THRESHOLD,
+                intra_op_threads=config.YOLO_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads,
+                session_options=OrtProfilingService.profiled_session_options("yolo") if profile else None
+            )
+        if profile:
+            raise Exception("Operator profiling needs an ONNX model")
+
+        # ultralytics pulls in PyTorch, so import it only when the model is actually loaded
+        from ultralytics import YOLO
+        return YOLO(model_path)
     
     @classmethod
     async def get_instance(cls):
@@ -28,7 +73,8 @@ class WhiteboardProcessorService:
         return cls._instance        
 
     @staticmethod
-    async def extract_problems(file: File, padding_ratio: float = 0.1, target_regions: int = 1) -> List[File]:
+    async def extract_problems(file: File, padding_ratio: float = 0.1, target_regions: int = 1,
+                               deadline: Optional[Deadline] = None) -> List[File]:
         """
         Extract mathematical problems from whiteboard image using YOLO for rectangle detection.
         
@@ -36,11 +82,14 @@ class WhiteboardProcessorService:
             file: Input image file
             padding_ratio: Padding around detected regions
             target_regions: Number of expressions expected in the image (default: 1)
+            deadline: Optional request deadline, checked before and after detection
         
         Returns:
             List of File objects for each detected problem
         """
         try:
+            Deadline.check_optional(deadline, "problem detection")
+
             # Convert to OpenCV for processing
             cv2_image = await file.to_cv2()
             
@@ -49,6 +98,8 @@ class WhiteboardProcessorService:
                 cv2_image, padding_ratio, target_regions
             )
             
+            Deadline.check_optional(deadline, "problem detection")
+
             if not problem_regions:
                 raise HTTPException(status_code=400, detail="No mathematical problems detected")
             
@@ -71,58 +122,71 @@ class WhiteboardProcessorService:
             logger.error(f"Error processing whiteboard: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Whiteboard processing failed: {str(e)}")
 
+    @staticmethod
+    async def detect_regions(img: np.ndarray, padding_ratio: float = 0.1,
+                             target_regions: int = 1) -> List[Tuple[int, int, int, int]]:
+        """
+        Detect problem regions without cropping them.
+
+        Returns:
+            Padded (x1, y1, x2, y2) boxes, merged down to at most target_regions
+        """
+        rects = await WhiteboardProcessorService._find_text_rects_with_target(img, target_regions)
+        return WhiteboardProcessorService._padded_boxes(img.shape, rects, padding_ratio)
+
     @staticmethod
     async def _find_text_regions_with_target(img: np.ndarray, padding_ratio: float, target_regions: int) -> List[np.ndarray]:
         """Find text regions using YOLO and merge until target count is reached"""
+        rects = await WhiteboardProcessorService._find_text_rects_with_target(img, target_regions)
+        return await WhiteboardProcessorService._extract_regions_from_rects(img, rects, padding_ratio)
+
+    @staticmethod
+    async def _find_text_rects_with_target(img: np.ndarray, target_regions: int) -> List[Tuple]:
         # Initial text detection using YOLO
         initial_rects = await WhiteboardProcessorService._detect_rectangles_yolo(img)
         
-        if not initial_rects:
-            return []
-        
         # If we already have fewer or equal regions than target, return them
         if len(initial_rects) <= target_regions:
-            return await WhiteboardProcessorService._extract_regions_from_rects(img, initial_rects, padding_ratio)
+            return initial_rects
         
         # Merge regions until we reach target count
-        merged_rects = await WhiteboardProcessorService._merge_to_target_count(initial_rects, target_regions, img.shape)
-        
-        return await WhiteboardProcessorService._extract_regions_from_rects(img, merged_rects, padding_ratio)
+        return await WhiteboardProcessorService._merge_to_target_count(initial_rects, target_regions, img.shape)
 
     @staticmethod
     async def _detect_rectangles_yolo(img: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """Detect rectangles using YOLO model"""
         # If YOLO model is not available, fall back to traditional detection
-        if WhiteboardProcessorService._model is None:
+        if ModelRegistry.active("yolo") is None:
             logger.warning("YOLO model not available, using fallback detection")
             return await WhiteboardProcessorService._detect_text_rectangles_fallback(img)
         
         try:
-            # Run YOLO inference
-            results = WhiteboardProcessorService._model(img)
-            
-            if not results:
-                return []
+            async with ModelRegistry.use("yolo") as version:
+                start_time = time.perf_counter()
+                boxes = await WhiteboardProcessorService._predict_boxes(img, version.model)
+
+            ModelRegistry.shadow(
+                "yolo",
+                lambda model: WhiteboardProcessorService._predict_boxes(img, model),
+                boxes,
+                time.perf_counter() - start_time,
+                WhiteboardProcessorService._same_boxes
+            )
             
             rects = []
             h, w = img.shape[:2]
             
-            for result in results:
-                if hasattr(result, 'boxes') and result.boxes is not None:
-                    for box in result.boxes:
-                        # Get bounding box coordinates (x1, y1, x2, y2)
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        
-                        # Convert to (x, y, width, height) format
-                        x = int(x1)
-                        y = int(y1)
-                        width = int(x2 - x1)
-                        height = int(y2 - y1)
-                        
-                        # Filter out very small detections
-                        min_area = (h * w) * 0.0001
-                        if width * height >= min_area:
-                            rects.append((x, y, width, height))
+            for x1, y1, x2, y2 in boxes:
+                # Convert to (x, y, width, height) format
+                x = int(x1)
+                y = int(y1)
+                width = int(x2 - x1)
+                height = int(y2 - y1)
+                
+                # Filter out very small detections
+                min_area = (h * w) * 0.0001
+                if width * height >= min_area:
+                    rects.append((x, y, width, height))
             
             logger.info(f"YOLO detected {len(rects)} rectangles")
             return rects
@@ -131,6 +195,43 @@ class WhiteboardProcessorService:
             logger.error(f"YOLO detection failed: {str(e)}, using fallback")
             return await WhiteboardProcessorService._detect_text_rectangles_fallback(img)
 
+    @staticmethod
+    async def _predict_boxes(img: np.ndarray, model) -> np.ndarray:
+        """Run a YOLO model (ONNX or ultralytics) and return (x1, y1, x2, y2) boxes"""
+        # Inference runs in a worker thread so a cancelled request stops waiting on it
+        if isinstance(model, YoloOnnxDetector):
+            return (await asyncio.to_thread(OrtProfilingService.call, "yolo", model.detect, [img]))[0][:, :4]
+
+        results = await asyncio.to_thread(WhiteboardProcessorService._predict_ultralytics, model, img)
+        boxes = [
+            result.boxes.xyxy.cpu().numpy()
+            for result in results or []
+            if getattr(result, 'boxes', None) is not None
+        ]
+        return np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.float32)
+
+    @classmethod
+    def _predict_ultralytics(cls, model, img: np.ndarray) -> list:
+        # ultralytics predictors keep per-call state and are not thread-safe, unlike ONNX sessions
+        with cls._ultralytics_lock:
+            return model(img, conf=config.YOLO_CONF_THRESHOLD, iou=config.YOLO_IOU_THRESHOLD)
+
+    @staticmethod
+    def _same_boxes(primary: np.ndarray, shadow: np.ndarray, iou_threshold: float = 0.5) -> bool:
+        """Shadow agreement: same number of boxes and each primary box overlaps a shadow box"""
+        if len(primary) != len(shadow):
+            return False
+        for box in primary:
+            xx1 = np.maximum(box[0], shadow[:, 0])
+            yy1 = np.maximum(box[1], shadow[:, 1])
+            xx2 = np.minimum(box[2], shadow[:, 2])
+            yy2 = np.minimum(box[3], shadow[:, 3])
+            intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+            union = (box[2] - box[0]) * (box[3] - box[1]) + (shadow[:, 2] - shadow[:, 0]) * (shadow[:, 3] - shadow[:, 1]) - intersection
+            if (intersection / np.maximum(union, 1e-7)).max() < iou_threshold:
+                return False
+        return True
+
     @staticmethod
     async def _detect_text_rectangles_fallback(img: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """Fallback text detection using traditional computer vision"""
@@ -251,18 +352,25 @@ class WhiteboardProcessorService:
         return (new_x, new_y, new_w, new_h)
 
     @staticmethod
-    async def _extract_regions_from_rects(img: np.ndarray, rects: List[Tuple], padding_ratio: float) -> List[np.ndarray]:
-        """Extract image regions from bounding rectangles"""
-        h, w = img.shape[:2]
-        regions = []
+    def _padded_boxes(img_shape: Tuple, rects: List[Tuple], padding_ratio: float) -> List[Tuple[int, int, int, int]]:
+        """Pad (x, y, width, height) rectangles and clip them to the image as (x1, y1, x2, y2)"""
+        h, w = img_shape[:2]
+        boxes = []
         
         for x, y, w_rect, h_rect in rects:
             pad_w = int(w_rect * padding_ratio)
             pad_h = int(h_rect * padding_ratio)
-            x1, y1 = max(0, x - pad_w), max(0, y - pad_h)
-            x2, y2 = min(w, x + w_rect + pad_w), min(h, y + h_rect + pad_h)
-            
-            region = img[y1:y2, x1:x2]
-            regions.append(region)
+            boxes.append((
+                max(0, x - pad_w), max(0, y - pad_h),
+                min(w, x + w_rect + pad_w), min(h, y + h_rect + pad_h)
+            ))
         
-        return regions
\ No newline at end of file
+        return boxes
+
+    @staticmethod
+    async def _extract_regions_from_rects(img: np.ndarray, rects: List[Tuple], padding_ratio: float) -> List[np.ndarray]:
+        """Extract image regions from bounding rectangles"""
+        return [
+            img[y1:y2, x1:x2]
+            for x1, y1, x2, y2 in WhiteboardProcessorService._padded_boxes(img.shape, rects, padding_ratio)
+        ]
\ No newline at end of file
@@ -0,0 +1,193 @@
+import argparse
+import ast
+import logging
+import os
+from typing import List, Tuple
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class YoloOnnxDetector:
+    """
+    YOLO detector served through ONNX Runtime instead of ultralytics/PyTorch.
+
+    Mirrors ultralytics predict(): letterbox to the export size, run the graph,
+    filter by confidence, per-class NMS and scale boxes back to the input image.
+    Output rows are (x1, y1, x2, y2, confidence, class_id) per image.
+    """
+
+    def __init__(self, onnx_path: str, conf_threshold: float = 0.25, iou_threshold: float = 0.7,
+                 max_det: int = 300, intra_op_threads: int = 0, session_options=None):
+        import onnxruntime as ort
+
+        session_options = session_options or ort.SessionOptions()
+        session_options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(onnx_path, session_options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_det = max_det
+
+        input_shape = self.session.get_inputs()[0].shape
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "imgsz" in metadata:
+            self.imgsz = tuple(ast.literal_eval(metadata["imgsz"]))
+        elif isinstance(input_shape[2], int) and isinstance(input_shape[3], int):
+            self.imgsz = (input_shape[2], input_shape[3])
+        else:
+            self.imgsz = (640, 640)
+        self.dynamic_batch = not isinstance(input_shape[0], int)
+
+        logger.info(f"Loaded YOLO ONNX model from {onnx_path} (imgsz={self.imgsz}, dynamic batch={self.dynamic_batch})")
+
+    def _letterbox(self, img: np.ndarray) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+        """Resize keeping aspect ratio and pad to the model size, like ultralytics LetterBox."""
+        h, w = img.shape[:2]
+        new_h, new_w = self.imgsz
+        ratio = min(new_h / h, new_w / w)
+        resized_w, resized_h = int(round(w * ratio)), int(round(h * ratio))
+        dw, dh = (new_w - resized_w) / 2, (new_h - resized_h) / 2
+
+        if (w, h) != (resized_w, resized_h):
+            img = cv2.resize(img, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+
+        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+        img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        return img, ratio, (left, top)
+
+    def _preprocess(self, images: List[np.ndarray]) -> Tuple[np.ndarray, List[Tuple[float, Tuple[float, float]]]]:
+        batch = np.empty((len(images), 3, *self.imgsz), dtype=np.float32)
+        transforms = []
+        for i, img in enumerate(images):
+            if img.ndim == 2:
+                img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+            padded, ratio, pad = self._letterbox(img)
+            # BGR HWC uint8 → RGB CHW float in [0, 1]
+            batch[i] = padded[:, :, ::-1].transpose(2, 0, 1) / np.float32(255.0)
+            transforms.append((ratio, pad))
+        return batch, transforms
+
+    @staticmethod
+    def _nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+        """Greedy non-maximum suppression, returns kept indices sorted by score."""
+        x1, y1, x2, y2 = boxes.T
+        areas = (x2 - x1) * (y2 - y1)
+        order = scores.argsort()[::-1]
+        keep = []
+
+        while order.size > 0:
+            i = order[0]
+            keep.append(i)
+            xx1 = np.maximum(x1[i], x1[order[1:]])
+            yy1 = np.maximum(y1[i], y1[order[1:]])
+            xx2 = np.minimum(x2[i], x2[order[1:]])
+            yy2 = np.minimum(y2[i], y2[order[1:]])
+            intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+            iou = intersection / (areas[i] + areas[order[1:]] - intersection + 1e-7)
+            order = order[1:][iou <= iou_threshold]
+
+        return np.array(keep, dtype=np.int64)
+
+    def _postprocess(self, prediction: np.ndarray, ratio: float, pad: Tuple[float, float],
+                     image_shape: Tuple[int, int]) -> np.ndarray:
+        # (4 + num_classes, num_anchors) → (num_anchors, 4 + num_classes)
+        prediction = prediction.T
+        class_scores = prediction[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+        mask = scores > self.conf_threshold
+        if not mask.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        xywh, scores, class_ids = prediction[mask, :4], scores[mask], class_ids[mask]
+
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        # Offset boxes by class so a single NMS pass never suppresses across classes
+        offsets = class_ids[:, None].astype(np.float32) * 7680
+        keep = self._nms(boxes + offsets, scores, self.iou_threshold)[:self.max_det]
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        h, w = image_shape
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad[0]) / ratio, 0, w)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad[1]) / ratio, 0, h)
+
+        return np.concatenate([boxes, scores[:, None], class_ids[:, None].astype(np.float32)], axis=1)
+
+    def detect(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """Detect boxes for a batch of BGR images."""
+        if not images:
+            return []
+
+        batch, transforms = self._preprocess(images)
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(images))
+            ])
+
+        return [
+            self._postprocess(outputs[i], ratio, pad, images[i].shape[:2])
+            for i, (ratio, pad) in enumerate(transforms)
+        ]
+
+    @staticmethod
+    def export(weights_path: str, imgsz: int = 640) -> str:
+        """Export ultralytics weights to ONNX with a dynamic batch axis, returns the ONNX path."""
+        from ultralytics import YOLO
+
+        onnx_path = YOLO(weights_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        logger.info(f"Exported {weights_path} to {onnx_path}")
+        return onnx_path
+
+
+def _mean_best_iou(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Mean over expected boxes of the best IoU with any actual box (1.0 if both are empty)."""
+    matched_ious = []
+    for box in expected:
+        if len(actual) == 0:
+            break
+        xx1 = np.maximum(box[0], actual[:, 0])
+        yy1 = np.maximum(box[1], actual[:, 1])
+        xx2 = np.minimum(box[2], actual[:, 2])
+        yy2 = np.minimum(box[3], actual[:, 3])
+        intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        union = (box[2] - box[0]) * (box[3] - box[1]) + (actual[:, 2] - actual[:, 0]) * (actual[:, 3] - actual[:, 1]) - intersection
+        matched_ious.append(float((intersection / union).max()))
+
+    return float(np.mean(matched_ious)) if matched_ious else float(len(expected) == len(actual))
+
+
+def _compare_backends(weights_path: str, onnx_path: str, image_paths: List[str]) -> None:
+    """Print per-image box agreement between the ultralytics and ONNX backends."""
+    from ultralytics import YOLO
+
+    torch_model = YOLO(weights_path)
+    onnx_model = YoloOnnxDetector(onnx_path)
+
+    for image_path in image_paths:
+        img = cv2.imread(image_path)
+        expected = torch_model(img, verbose=False)[0].boxes.xyxy.cpu().numpy()
+        actual = onnx_model.detect([img])[0][:, :4]
+        mean_iou = _mean_best_iou(expected, actual)
+        print(f"{os.path.basename(image_path)}: ultralytics={len(expected)} onnx={len(actual)} mean IoU={mean_iou:.3f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Export YOLO weights to ONNX and check parity")
+    parser.add_argument("--weights", required=True, help="Path to the ultralytics .pt weights")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--compare", nargs="*", default=[], help="Images to compare both backends on")
+    args = parser.parse_args()
+
+    exported_path = YoloOnnxDetector.export(args.weights, args.imgsz)
+    if args.compare:
+        _compare_backends(args.weights, exported_path, args.compare)
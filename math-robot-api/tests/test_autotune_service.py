@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from app.config import config
+from app.services.autotune_service import AutotuneService
+from app.services.pix2text_service import Pix2TextService
+
+
+def result(p95, throughput, **settings):
+    return {"p95": p95, "throughput": throughput, **settings}
+
+
+def test_pick_prefers_throughput_within_the_slo():
+    results = [result(0.5, 10, threads=1), result(1.5, 30, threads=2), result(3.0, 50, threads=4)]
+
+    assert AutotuneService._pick(results, slo=2.0)["threads"] == 2
+
+
+def test_pick_falls_back_to_the_lowest_latency():
+    results = [result(2.5, 10, threads=1), result(4.0, 30, threads=2)]
+
+    assert AutotuneService._pick(results, slo=2.0)["threads"] == 1
+
+
+@pytest.fixture
+def tuning_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(AutotuneService, "_host", classmethod(lambda cls: {"cores": 8, "pix2text_model": "a"}))
+    return tmp_path / "autotune.json"
+
+
+def test_load_returns_tuning_for_this_host(tuning_file):
+    tuning = {"host": {"cores": 8, "pix2text_model": "a"}, "settings": {"PIX2TEXT_BATCH_SIZE": 4}}
+    AutotuneService.save(tuning, str(tuning_file))
+
+    assert AutotuneService.load(str(tuning_file)) == tuning
+
+
+def test_load_ignores_tuning_from_another_host(tuning_file):
+    AutotuneService.save({"host": {"cores": 4, "pix2text_model": "a"}, "settings": {}}, str(tuning_file))
+
+    assert AutotuneService.load(str(tuning_file)) is None
+
+
+def test_load_ignores_missing_and_corrupt_files(tuning_file):
+    assert AutotuneService.load(str(tuning_file)) is None
+
+    tuning_file.write_text('{"host": {"cores": 8')
+    assert AutotuneService.load(str(tuning_file)) is None
+
+
+def test_apply_keeps_settings_from_the_environment(monkeypatch):
+    monkeypatch.setattr(config, "PIX2TEXT_BATCH_SIZE", 4)
+    monkeypatch.setattr(config, "PIX2TEXT_INTRA_OP_THREADS", 0)
+    monkeypatch.setenv("PIX2TEXT_BATCH_SIZE", "4")
+    monkeypatch.delenv("PIX2TEXT_INTRA_OP_THREADS", raising=False)
+
+    AutotuneService.apply({"PIX2TEXT_BATCH_SIZE": 8, "PIX2TEXT_INTRA_OP_THREADS": 2})
+
+    assert config.PIX2TEXT_BATCH_SIZE == 4
+    assert config.PIX2TEXT_INTRA_OP_THREADS == 2
+
+
+def test_thread_count_stops_at_the_first_concurrency_over_the_slo(monkeypatch):
+    measured = []
+
+    async def load_version(model_name, intra_op_threads=None):
+        return object()
+
+    async def measure(run, concurrency, rounds):
+        measured.append(concurrency)
+        return {"throughput": float(concurrency), "p95": 0.5 * concurrency}
+
+    monkeypatch.setattr(AutotuneService, "_cores", staticmethod(lambda: 16))
+    monkeypatch.setattr(Pix2TextService, "_load_version", staticmethod(load_version))
+    monkeypatch.setattr(AutotuneService, "_measure", staticmethod(measure))
+
+    picked, results = asyncio.run(AutotuneService._tune_pix2text([], slo=1.0, rounds=1))
+
+    # 1 thread tries concurrency 1, 2 (within the SLO) and 4 (over it), never 8 or 16
+    assert sorted(set(result["concurrency"] for result in results if result["threads"] == 1)) == [1, 2, 4]
+    assert (picked["concurrency"], picked["p95"]) == (2, 1.0)
+
+
+def test_calibration_timeout_keeps_the_defaults(tmp_path, monkeypatch):
+    async def calibrate():
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(config, "AUTOTUNE_PATH", str(tmp_path / "autotune.json"))
+    monkeypatch.setattr(config, "AUTOTUNE_ON_STARTUP", True)
+    monkeypatch.setattr(config, "AUTOTUNE_TIMEOUT", 0.05)
+    monkeypatch.setattr(AutotuneService, "calibrate", staticmethod(calibrate))
+    monkeypatch.setattr(AutotuneService, "apply", staticmethod(lambda settings: pytest.fail("applied")))
+
+    asyncio.run(AutotuneService.init())
+
+    assert not (tmp_path / "autotune.json").exists()
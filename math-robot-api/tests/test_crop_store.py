@@ -0,0 +1,153 @@
+import os
+import subprocess
+import sys
+import cv2
+import numpy as np
+import pytest
+from app.services.crop_store_service import CropStore
+
+MIN_SIMILARITY = 0.97
+VERSIONS = ("p2t-1", "llm-1")
+FONTS = [(cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2), (cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, 1.6, 3), (cv2.FONT_HERSHEY_DUPLEX, 1.2, 2)]
+
+
+def render(text: str, font=FONTS[0], margin: int = 30, background: int = 235, ink: int = 40) -> np.ndarray:
+    face, scale, thickness = font
+    (width, height), baseline = cv2.getTextSize(text, face, scale, thickness)
+    img = np.full((height + baseline + 2 * margin, width + 2 * margin, 3), background, dtype=np.uint8)
+    cv2.putText(img, text, (margin, margin + height), face, scale, (ink, ink, ink), thickness, cv2.LINE_AA)
+    return img
+
+
+def one_digit_changes(text: str):
+    for i, char in enumerate(text):
+        if char.isdigit():
+            for digit in "0123456789":
+                if digit != char:
+                    yield text[:i] + digit + text[i + 1:]
+
+
+def test_same_crop_hits_despite_margins_lighting_and_compression(tmp_path):
+    store = CropStore(str(tmp_path), 16)
+    store.put(render("12345+67890=80235"), "12345+67890=80235", None, MIN_SIMILARITY, *VERSIONS)
+
+    recompressed = cv2.imdecode(cv2.imencode(".jpg", render("12345+67890=80235"), [cv2.IMWRITE_JPEG_QUALITY, 90])[1], 1)
+    for img in (render("12345+67890=80235"), render("12345+67890=80235", margin=60),
+                render("12345+67890=80235", background=200, ink=70), recompressed):
+        entry = store.lookup(img, MIN_SIMILARITY, *VERSIONS)
+        assert entry is not None and entry["latex_raw"] == "12345+67890=80235"
+
+
+def test_one_digit_change_in_a_long_expression_is_a_miss(tmp_path):
+    store = CropStore(str(tmp_path), 16)
+    stored, changed = CropStore.fingerprint(render("12345+67890=80235"))[0], render("12345+67090=80235")
+    store.put(render("12345+67890=80235"), "12345+67890=80235", None, MIN_SIMILARITY, *VERSIONS)
+
+    # Close enough for the coarse fingerprint, so only the stroke check tells them apart
+    assert CropStore.fingerprint(changed)[0] @ stored > MIN_SIMILARITY
+    assert store.lookup(changed, MIN_SIMILARITY, *VERSIONS) is None
+
+
+@pytest.mark.parametrize("font", FONTS, ids=["simplex", "script", "duplex"])
+@pytest.mark.parametrize("text", ["12345+67890=80235", "123456789+987654321=1111111110", "2(x+4)=18"])
+def test_no_one_digit_near_miss_hits(tmp_path, text, font):
+    store = CropStore(str(tmp_path), 16)
+    store.put(render(text, font), text, None, MIN_SIMILARITY, *VERSIONS)
+
+    hits = [changed for changed in one_digit_changes(text) if store.lookup(render(changed, font), MIN_SIMILARITY, *VERSIONS)]
+    assert hits == []
+    assert store.lookup(render(text, font), MIN_SIMILARITY, *VERSIONS)["latex_raw"] == text
+
+
+def test_put_adds_a_translation_to_a_stored_crop(tmp_path):
+    store = CropStore(str(tmp_path), 16)
+    store.put(render("y=2x+3"), "y=2x+3", None, MIN_SIMILARITY, *VERSIONS)
+    store.put(render("y=2x+3"), "y=2x+3", "y == 2 x + 3", MIN_SIMILARITY, *VERSIONS)
+
+    assert store.size() == 1
+    assert store.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS)["latex_filtered"] == "y == 2 x + 3"
+
+
+def test_new_ocr_version_misses_and_replaces_the_stored_result(tmp_path):
+    store = CropStore(str(tmp_path), 16)
+    store.put(render("y=2x+3"), "y=2x+3", "y == 2 x + 3", MIN_SIMILARITY, *VERSIONS)
+
+    assert store.lookup(render("y=2x+3"), MIN_SIMILARITY, "p2t-2", "llm-1") is None
+    store.put(render("y=2x+3"), "y=2x+5", None, MIN_SIMILARITY, "p2t-2", "llm-1")
+
+    assert store.size() == 1
+    entry = store.lookup(render("y=2x+3"), MIN_SIMILARITY, "p2t-2", "llm-1")
+    assert (entry["latex_raw"], entry["latex_filtered"]) == ("y=2x+5", None)
+    assert store.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS) is None
+
+
+def test_new_translation_version_keeps_the_ocr_result_and_retranslates(tmp_path):
+    store = CropStore(str(tmp_path), 16)
+    store.put(render("y=2x+3"), "y=2x+3", "y == 2 x + 3", MIN_SIMILARITY, *VERSIONS)
+
+    entry = store.lookup(render("y=2x+3"), MIN_SIMILARITY, "p2t-1", "llm-2")
+    assert (entry["latex_raw"], entry["latex_filtered"]) == ("y=2x+3", None)
+
+    store.put(render("y=2x+3"), "y=2x+3", "y = 2*x + 3", MIN_SIMILARITY, "p2t-1", "llm-2")
+    assert store.lookup(render("y=2x+3"), MIN_SIMILARITY, "p2t-1", "llm-2")["latex_filtered"] == "y = 2*x + 3"
+    assert store.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS)["latex_filtered"] is None
+
+
+def test_least_recently_used_crop_is_evicted(tmp_path):
+    store = CropStore(str(tmp_path), 2)
+    for text in ("x+1=2", "y=2x+3", "a^2+b^2=c^2"):
+        store.put(render(text), text, None, MIN_SIMILARITY, *VERSIONS)
+
+    assert store.size() == 2
+    assert store.lookup(render("x+1=2"), MIN_SIMILARITY, *VERSIONS) is None
+    assert store.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS)["latex_raw"] == "y=2x+3"
+    assert store.lookup(render("a^2+b^2=c^2"), MIN_SIMILARITY, *VERSIONS)["latex_raw"] == "a^2+b^2=c^2"
+
+
+def test_rewritten_slot_is_a_miss(tmp_path):
+    store = CropStore(str(tmp_path), 4)
+    store.put(render("y=2x+3"), "y=2x+3", None, MIN_SIMILARITY, *VERSIONS)
+    slot = store.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS)["slot"]
+
+    # A writer halfway through replacing the fingerprint: it no longer matches the row's checksum
+    store.vectors[slot, :8] = 0
+    assert store.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS) is None
+
+
+def test_store_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "store")
+    store = CropStore(path, 16)
+    store.put(render("12345+67890=80235"), "12345+67890=80235", None, MIN_SIMILARITY, *VERSIONS)
+    cv2.imwrite(str(tmp_path / "mine.png"), render("12345+67890=80235"))
+    cv2.imwrite(str(tmp_path / "theirs.png"), render("y=2x+3"))
+
+    # Another worker opens the same files: it sees this entry and adds its own
+    script = (
+        "import cv2, sys\n"
+        "from app.services.crop_store_service import CropStore\n"
+        "store = CropStore(sys.argv[1], 16)\n"
+        "print(store.lookup(cv2.imread(sys.argv[2]), 0.97, 'p2t-1', 'llm-1')['latex_raw'])\n"
+        "store.put(cv2.imread(sys.argv[3]), 'y=2x+3', 'y == 2 x + 3', 0.97, 'p2t-1', 'llm-1')\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script, path, str(tmp_path / "mine.png"), str(tmp_path / "theirs.png")],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(__file__))
+    )
+    assert result.stdout.strip() == "12345+67890=80235"
+
+    # Visible here without reopening, and after reopening
+    assert store.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS)["latex_filtered"] == "y == 2 x + 3"
+    assert CropStore(path, 16).size() == 2
+
+
+def test_capacity_change_resets_the_store(tmp_path):
+    store = CropStore(str(tmp_path), 4)
+    store.put(render("y=2x+3"), "y=2x+3", None, MIN_SIMILARITY, *VERSIONS)
+    assert CropStore(str(tmp_path), 4).size() == 1
+
+    resized = CropStore(str(tmp_path), 8)
+    assert resized.size() == 0
+    assert resized.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS) is None
+    assert os.path.getsize(tmp_path / "occupied.u8") == 8
+    resized.put(render("y=2x+3"), "y=2x+3", None, MIN_SIMILARITY, *VERSIONS)
+    assert resized.lookup(render("y=2x+3"), MIN_SIMILARITY, *VERSIONS)["latex_raw"] == "y=2x+3"
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import os
+import pytest
+from app.config import config
+from app.services.latex_translator_service import LatexTranslatorService
+from app.services.ollama_service import OllamaService
+from app.services.pipeline_service import PipelineService
+
+# "wolfram" is the expected translation; null marks inputs the fast path must leave to the LLM,
+# with "llm" noting the answer expected from it
+with open(os.path.join(os.path.dirname(__file__), "data", "latex_wolfram_corpus.json")) as f:
+    CORPUS = json.load(f)
+
+
+def normalize(expression: str) -> str:
+    return asyncio.run(LatexTranslatorService.normalize(expression))
+
+
+@pytest.mark.parametrize("case", [case for case in CORPUS if case["wolfram"] is not None], ids=lambda case: case["latex"])
+def test_fast_path_matches_corpus(case):
+    wolfram, confidence = asyncio.run(LatexTranslatorService.translate(case["latex"]))
+
+    assert confidence >= config.LATEX_FAST_PATH_MIN_CONFIDENCE
+    assert normalize(wolfram) == normalize(case["wolfram"])
+
+
+@pytest.mark.parametrize("case", [case for case in CORPUS if case["wolfram"] is None], ids=lambda case: case["latex"])
+def test_fast_path_falls_back_to_llm(case):
+    assert asyncio.run(PipelineService._fast_translate(case["latex"])) is None
+
+
+def test_fast_path_coverage_and_accuracy_on_corpus():
+    handled, correct = 0, 0
+    for case in CORPUS:
+        wolfram, confidence = asyncio.run(LatexTranslatorService.translate(case["latex"]))
+        if wolfram is None or confidence < config.LATEX_FAST_PATH_MIN_CONFIDENCE:
+            continue
+        handled += 1
+        # Inputs marked for the LLM count as wrong if the fast path answers them anyway
+        correct += case["wolfram"] is not None and normalize(wolfram) == normalize(case["wolfram"])
+
+    assert handled / len(CORPUS) >= 0.8
+    assert correct / handled >= 0.95
+
+
+@pytest.mark.skipif(os.getenv("OLLAMA_INTEGRATION", "false").lower() != "true",
+                    reason="Needs a running Ollama (OLLAMA_URL); set OLLAMA_INTEGRATION=true")
+def test_evaluate_corpus_against_llm():
+    async def evaluate():
+        await OllamaService.init()
+        try:
+            return await LatexTranslatorService.evaluate_corpus([case["latex"] for case in CORPUS])
+        finally:
+            await OllamaService.shutdown()
+
+    report = asyncio.run(evaluate())
+
+    assert report["handled"] == sum(case["wolfram"] is not None for case in CORPUS)
+    assert report["agreement"] >= float(os.getenv("OLLAMA_INTEGRATION_MIN_AGREEMENT", "0.8")), report["disagreements"]
+
+
+def test_evaluate_corpus_reports_disagreements(monkeypatch):
+    async def filter_latex(latex_input, deadline=None):
+        return "x^2 + 1"
+
+    monkeypatch.setattr(OllamaService, "filter_latex", filter_latex)
+    report = asyncio.run(LatexTranslatorService.evaluate_corpus(["x^2+2x+1=0"]))
+
+    assert report["agreement"] == 0.0
+    assert report["disagreements"] == [{"latex": "x^2+2x+1=0", "fast_path": "x^2 + 2 * x + 1 == 0", "llm": "x^2 + 1"}]
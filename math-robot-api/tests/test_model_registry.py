@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+from app.config import config
+from app.models.deadline_model import Deadline
+from app.services.model_registry_service import SHADOW_COMPARISONS_TOTAL, ModelRegistry
+from app.services.scheduler_service import SchedulerService
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    for name in ("_loaders", "_unloaders", "_active", "_shadows", "_shadow_fractions", "_shadow_stats",
+                 "_loading", "_errors", "_retiring"):
+        monkeypatch.setattr(ModelRegistry, name, {})
+    monkeypatch.setattr(ModelRegistry, "_background", set())
+    unloaded = []
+
+    async def load(version, **options):
+        return {"version": version, **options}
+
+    async def unload(model):
+        unloaded.append(model["version"])
+
+    ModelRegistry.register_loader("ollama", load, unload)
+    return unloaded
+
+
+async def settle():
+    while ModelRegistry._background:
+        await asyncio.gather(*ModelRegistry._background)
+
+
+def test_activating_another_version_unloads_the_previous(registry):
+    async def main():
+        await ModelRegistry.activate("ollama", "v1")
+        await ModelRegistry.activate("ollama", "v2")
+        await settle()
+
+    asyncio.run(main())
+    assert registry == ["v1"]
+    assert ModelRegistry.active("ollama").version == "v2"
+
+
+def test_reactivating_the_active_version_does_not_unload_it(registry):
+    async def main():
+        first = await ModelRegistry.activate("ollama", "v1")
+        second = await ModelRegistry.activate("ollama", "v1")
+        await settle()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert registry == []
+    assert ModelRegistry.active("ollama") is second
+    assert first.model is None and second.model is not None
+
+
+def test_clearing_a_shadow_of_the_active_version_does_not_unload_it(registry):
+    async def main():
+        await ModelRegistry.activate("ollama", "v1")
+        await ModelRegistry.set_shadow("ollama", "v1", 0.5, {"profile": True})
+        ModelRegistry.clear_shadow("ollama")
+        await settle()
+        await ModelRegistry.set_shadow("ollama", "v2", 0.5)
+        ModelRegistry.clear_shadow("ollama")
+        await settle()
+
+    asyncio.run(main())
+    assert registry == ["v2"]
+
+
+async def start_shadowing():
+    await ModelRegistry.activate("ollama", "v1")
+    await ModelRegistry.set_shadow("ollama", "v2", 1.0)
+
+
+def test_shadow_runs_beyond_the_cap_are_skipped(registry, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_SHADOW_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(config, "SCHEDULER_ENABLED", False)
+    skipped_before = SHADOW_COMPARISONS_TOTAL.labels(kind="ollama", outcome="skipped")._value.get()
+
+    async def main():
+        await start_shadowing()
+        release = asyncio.Event()
+        runs = []
+
+        async def run(model):
+            runs.append(model["version"])
+            await release.wait()
+            return "x"
+
+        for _ in range(3):
+            ModelRegistry.shadow("ollama", run, "x", 0.01, lambda a, b: a == b)
+        await asyncio.sleep(0.01)
+        release.set()
+        await settle()
+        return runs, ModelRegistry.status()["ollama"]["shadow"]
+
+    runs, status = asyncio.run(main())
+    assert runs == ["v2"]
+    assert status["samples"] == 1 and status["agreement"] == 1.0 and status["in_flight"] == 0
+    assert SHADOW_COMPARISONS_TOTAL.labels(kind="ollama", outcome="skipped")._value.get() == skipped_before + 2
+
+
+def test_shadow_runs_are_bounded_by_a_deadline(registry, monkeypatch):
+    monkeypatch.setattr(config, "REQUEST_TIMEOUT", 0.05)
+    monkeypatch.setattr(config, "SCHEDULER_ENABLED", False)
+
+    async def main():
+        await start_shadowing()
+
+        async def run(model):
+            await asyncio.sleep(10)
+
+        ModelRegistry.shadow("ollama", run, "x", 0.01, lambda a, b: a == b)
+        await asyncio.wait_for(settle(), timeout=1)
+        return ModelRegistry.status()["ollama"]["shadow"]
+
+    status = asyncio.run(main())
+    assert status["samples"] == 1 and status["errors"] == 1
+
+
+def test_shadow_runs_wait_for_a_background_scheduler_slot(registry, monkeypatch):
+    monkeypatch.setattr(config, "SCHEDULER_ENABLED", True)
+    monkeypatch.setattr(config, "SCHEDULER_MAX_CONCURRENCY", 1)
+
+    async def main():
+        await start_shadowing()
+        runs = []
+
+        async def run(model):
+            runs.append(model["version"])
+            return "x"
+
+        async with SchedulerService.slot(SchedulerService.INTERACTIVE, "user", Deadline(5)):
+            ModelRegistry.shadow("ollama", run, "x", 0.01, lambda a, b: a == b)
+            await asyncio.sleep(0.02)
+            waiting = list(runs)
+        await asyncio.wait_for(settle(), timeout=1)
+        return waiting, runs
+
+    waiting, runs = asyncio.run(main())
+    assert waiting == []
+    assert runs == ["v2"]
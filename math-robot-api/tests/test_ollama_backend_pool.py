@@ -0,0 +1,257 @@
+import asyncio
+import random
+import time
+from typing import Optional
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.config import config
+from app.models.deadline_model import Deadline, DeadlineExceeded
+from app.services.ollama_backend_pool import HEDGED_TOTAL, OllamaBackend, OllamaBackendPool, OllamaUnavailable
+
+
+class FakeOllama:
+    """
+    Ollama backend on a local test server, answering /api/generate after `delay` with `status`.
+    A delay of None never answers until the server is stopped.
+    """
+
+    def __init__(self, name: str, status: int = 200, delay: Optional[float] = 0.0):
+        self.name = name
+        self.status = status
+        self.delay = delay
+        self.hits = 0
+        self.stopped = asyncio.Event()
+        app = web.Application()
+        app.router.add_post("/api/generate", self.generate)
+        self.server = TestServer(app)
+
+    async def generate(self, request: web.Request) -> web.Response:
+        self.hits += 1
+        try:
+            await asyncio.wait_for(self.stopped.wait(), timeout=self.delay)
+        except asyncio.TimeoutError:
+            pass
+        if self.status != 200:
+            return web.Response(status=self.status, text="model crashed")
+        return web.json_response({"response": self.name})
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+
+async def start(*fakes: FakeOllama) -> list:
+    for fake in fakes:
+        await fake.server.start_server()
+    backends = [OllamaBackend(fake.url) for fake in fakes]
+    OllamaBackendPool._OllamaBackendPool__backends = backends
+    return backends
+
+
+async def stop(*fakes: FakeOllama) -> None:
+    for fake in fakes:
+        fake.stopped.set()
+        await fake.server.close()
+
+
+@pytest.fixture(autouse=True)
+def pool(monkeypatch):
+    # Deterministic selection among equally loaded backends: the first one
+    monkeypatch.setattr(random, "choice", lambda candidates: candidates[0])
+    monkeypatch.setattr(config, "OLLAMA_BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(config, "OLLAMA_BREAKER_COOLDOWN", 30.0)
+    monkeypatch.setattr(config, "OLLAMA_HEDGE_PERCENTILE", 0.0)
+    monkeypatch.setattr(config, "OLLAMA_REQUEST_TIMEOUT", 30.0)
+    yield
+    OllamaBackendPool._OllamaBackendPool__backends = None
+
+
+def test_fails_over_to_the_next_backend():
+    broken, healthy = FakeOllama("a", status=500), FakeOllama("b")
+
+    async def main():
+        backends = await start(broken, healthy)
+        try:
+            return await OllamaBackendPool.post("generate", {}), backends
+        finally:
+            await stop(broken, healthy)
+
+    data, backends = asyncio.run(main())
+    assert data == {"response": "b"}
+    assert (broken.hits, healthy.hits) == (1, 1)
+    assert backends[0].failures == 1 and backends[0].state == OllamaBackend.CLOSED
+    assert [backend.outstanding for backend in backends] == [0, 0]
+
+
+def test_hung_backend_times_out_and_fails_over(monkeypatch):
+    monkeypatch.setattr(config, "OLLAMA_REQUEST_TIMEOUT", 0.1)
+    hung, healthy = FakeOllama("a", delay=None), FakeOllama("b")
+
+    async def main():
+        backends = await start(hung, healthy)
+        try:
+            started_at = time.perf_counter()
+            data = await OllamaBackendPool.post("generate", {})
+            return data, time.perf_counter() - started_at, backends
+        finally:
+            await stop(hung, healthy)
+
+    data, elapsed, backends = asyncio.run(main())
+    assert data == {"response": "b"}
+    assert elapsed < 1
+    assert (hung.hits, healthy.hits) == (1, 1)
+    assert backends[0].failures == 1
+    assert [backend.outstanding for backend in backends] == [0, 0]
+
+
+def test_hung_backend_opens_its_circuit(monkeypatch):
+    monkeypatch.setattr(config, "OLLAMA_REQUEST_TIMEOUT", 0.05)
+    hung = FakeOllama("a", delay=None)
+
+    async def main():
+        backends = await start(hung)
+        try:
+            for _ in range(config.OLLAMA_BREAKER_THRESHOLD):
+                # Unavailable rather than a deadline error, so degraded mode can take over
+                with pytest.raises(OllamaUnavailable, match="timed out"):
+                    await OllamaBackendPool.post("generate", {})
+            return backends[0]
+        finally:
+            await stop(hung)
+
+    backend = asyncio.run(main())
+    assert backend.state == OllamaBackend.OPEN
+
+
+def test_deadline_shorter_than_the_attempt_timeout_is_not_a_backend_failure(monkeypatch):
+    hung = FakeOllama("a", delay=None)
+
+    async def main():
+        backends = await start(hung)
+        try:
+            with pytest.raises(DeadlineExceeded):
+                await OllamaBackendPool.post("generate", {}, Deadline(0.05))
+            return backends[0]
+        finally:
+            await stop(hung)
+
+    backend = asyncio.run(main())
+    assert backend.failures == 0 and backend.state == OllamaBackend.CLOSED
+
+
+def test_circuit_opens_after_repeated_failures():
+    broken = FakeOllama("a", status=500)
+
+    async def main():
+        backends = await start(broken)
+        try:
+            for _ in range(config.OLLAMA_BREAKER_THRESHOLD):
+                with pytest.raises(OllamaUnavailable, match="All Ollama backends failed"):
+                    await OllamaBackendPool.post("generate", {})
+            # Open circuit: rejected without reaching the backend
+            with pytest.raises(OllamaUnavailable, match="No Ollama backend available"):
+                await OllamaBackendPool.post("generate", {})
+            return backends[0]
+        finally:
+            await stop(broken)
+
+    backend = asyncio.run(main())
+    assert backend.state == OllamaBackend.OPEN
+    assert broken.hits == config.OLLAMA_BREAKER_THRESHOLD
+
+
+def test_half_open_admits_a_single_probe(monkeypatch):
+    monkeypatch.setattr(config, "OLLAMA_BREAKER_COOLDOWN", 0.05)
+    recovering = FakeOllama("a", status=500)
+
+    async def main():
+        backends = await start(recovering)
+        try:
+            for _ in range(config.OLLAMA_BREAKER_THRESHOLD):
+                with pytest.raises(OllamaUnavailable):
+                    await OllamaBackendPool.post("generate", {})
+            assert backends[0].state == OllamaBackend.OPEN
+
+            await asyncio.sleep(0.06)
+            recovering.status, recovering.delay, recovering.hits = 200, 0.05, 0
+            # Two requests arrive together after the cooldown: only one may probe the backend
+            results = await asyncio.gather(
+                OllamaBackendPool.post("generate", {}), OllamaBackendPool.post("generate", {}),
+                return_exceptions=True
+            )
+            return results, backends[0]
+        finally:
+            await stop(recovering)
+
+    results, backend = asyncio.run(main())
+    assert results[0] == {"response": "a"}
+    assert isinstance(results[1], OllamaUnavailable)
+    assert recovering.hits == 1
+    assert backend.state == OllamaBackend.CLOSED and backend.outstanding == 0
+
+
+def test_failed_probe_reopens_the_circuit(monkeypatch):
+    monkeypatch.setattr(config, "OLLAMA_BREAKER_COOLDOWN", 0.05)
+    broken = FakeOllama("a", status=500)
+
+    async def main():
+        backends = await start(broken)
+        try:
+            for _ in range(config.OLLAMA_BREAKER_THRESHOLD):
+                with pytest.raises(OllamaUnavailable):
+                    await OllamaBackendPool.post("generate", {})
+            await asyncio.sleep(0.06)
+            assert backends[0].available() and backends[0].state == OllamaBackend.HALF_OPEN
+            with pytest.raises(OllamaUnavailable):
+                await OllamaBackendPool.post("generate", {})
+            return backends[0]
+        finally:
+            await stop(broken)
+
+    backend = asyncio.run(main())
+    assert backend.state == OllamaBackend.OPEN
+    assert not backend.available()
+
+
+def test_slow_request_is_hedged_to_another_backend(monkeypatch):
+    monkeypatch.setattr(config, "OLLAMA_HEDGE_PERCENTILE", 95.0)
+    monkeypatch.setattr(config, "OLLAMA_HEDGE_MIN_SAMPLES", 4)
+    slow, fast = FakeOllama("a", delay=1.0), FakeOllama("b", delay=0.01)
+    hedged_before = HEDGED_TOTAL._value.get()
+
+    async def main():
+        backends = await start(slow, fast)
+        for backend in backends:
+            backend.latencies.extend([0.05] * 4)
+        try:
+            started_at = time.perf_counter()
+            data = await OllamaBackendPool.post("generate", {})
+            return data, time.perf_counter() - started_at, backends
+        finally:
+            await stop(slow, fast)
+
+    data, elapsed, backends = asyncio.run(main())
+    assert data == {"response": "b"}
+    assert elapsed < 0.5
+    assert (slow.hits, fast.hits) == (1, 1)
+    assert HEDGED_TOTAL._value.get() == hedged_before + 1
+    # The losing request was cancelled, not counted as a backend failure
+    assert backends[0].failures == 0
+    assert [backend.outstanding for backend in backends] == [0, 0]
+
+
+def test_no_hedging_without_enough_samples(monkeypatch):
+    monkeypatch.setattr(config, "OLLAMA_HEDGE_PERCENTILE", 95.0)
+    monkeypatch.setattr(config, "OLLAMA_HEDGE_MIN_SAMPLES", 4)
+    slow, fast = FakeOllama("a", delay=0.1), FakeOllama("b")
+
+    async def main():
+        await start(slow, fast)
+        try:
+            return await OllamaBackendPool.post("generate", {})
+        finally:
+            await stop(slow, fast)
+
+    assert asyncio.run(main()) == {"response": "a"}
+    assert fast.hits == 0
@@ -0,0 +1,116 @@
+import json
+from types import SimpleNamespace
+import pytest
+from prometheus_client import REGISTRY
+from app.config import config
+from app.services.model_registry_service import ModelRegistry
+from app.services.ort_profiling_service import OrtProfilingService
+
+
+def run_event(dur):
+    return {"cat": "Session", "name": "model_run", "dur": dur}
+
+
+def kernel_event(op, dur):
+    return {"cat": "Node", "name": f"/{op}_0_kernel_time", "dur": dur, "args": {"op_name": op}}
+
+
+# Shaped like an ORT profile: session runs, per-node kernel times and events that are neither
+PROFILE = [
+    {"cat": "Session", "name": "session_initialization", "dur": 5000},
+    run_event(2000),
+    kernel_event("MatMul", 1200),
+    kernel_event("Softmax", 300),
+    {"cat": "Node", "name": "/MatMul_0_fence_before", "dur": 0, "args": {"op_name": "MatMul"}},
+    run_event(4000),
+    kernel_event("MatMul", 2400),
+    kernel_event("Add", 100),
+]
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    """A fresh profiling state with one registered kind whose active version the test controls."""
+    monkeypatch.setattr(OrtProfilingService, "_session_getters", {"ocr": lambda model: model})
+    monkeypatch.setattr(OrtProfilingService, "_stats", {})
+    monkeypatch.setattr(OrtProfilingService, "_captures", {})
+    monkeypatch.setattr(OrtProfilingService, "_operator_labels", {})
+    active = {"ocr": SimpleNamespace(version="v1", memory_bytes=1000)}
+    monkeypatch.setattr(ModelRegistry, "active", classmethod(lambda cls, kind: active.get(kind)))
+    return active
+
+
+def test_summarize_aggregates_kernel_time_per_operator(monkeypatch):
+    monkeypatch.setattr(config, "ORT_PROFILING_TOP_OPERATORS", 2)
+
+    summary = OrtProfilingService._summarize(PROFILE)
+
+    assert summary["runs"] == 2
+    assert summary["mean_run_ms"] == pytest.approx(3.0)
+    # Add is the smallest of three operators, beyond the top 2
+    assert [operator["op"] for operator in summary["operators"]] == ["MatMul", "Softmax"]
+    matmul = summary["operators"][0]
+    assert (matmul["calls"], matmul["total_ms"], matmul["per_run_ms"]) == (2, pytest.approx(3.6), pytest.approx(1.8))
+    assert matmul["share"] == pytest.approx(3600 / 4000)
+
+
+def test_summarize_without_runs():
+    assert OrtProfilingService._summarize([]) == {"runs": 0, "mean_run_ms": None, "operators": []}
+
+
+def test_status_averages_each_decode_step_separately(profiling):
+    OrtProfilingService._record("ocr", [("v1", "encoder", 0.1), ("v1", "decoder", 0.01), ("v1", "decoder", 0.03)], 100)
+    OrtProfilingService._record("ocr", [("v1", "decoder", 0.03), ("v1", "decoder", 0.05), ("v1", "decoder", 0.07)], 50)
+
+    model = OrtProfilingService.status()["models"]["ocr"]
+
+    assert (model["samples"], model["memory_growth_last"], model["memory_growth_max"]) == (2, 50, 100)
+    decoder = model["sessions"]["decoder"]
+    assert (decoder["calls"], decoder["runs_per_call"]) == (2, 2.5)
+    assert decoder["step_ms"] == pytest.approx([20, 40, 70])
+    assert decoder["max_ms"] == pytest.approx(70)
+    assert model["sessions"]["encoder"]["calls"] == 1
+
+
+def test_stats_restart_when_the_version_changes(profiling):
+    OrtProfilingService._record("ocr", [("v1", "decoder", 0.01)], 100)
+    profiling["ocr"] = SimpleNamespace(version="v2", memory_bytes=2000)
+    OrtProfilingService._record("ocr", [("v2", "decoder", 0.02)], 10)
+
+    model = OrtProfilingService.status()["models"]["ocr"]
+
+    assert (model["version"], model["sampled_version"], model["samples"]) == ("v2", "v2", 1)
+    assert model["memory_growth_max"] == 10
+    assert model["sessions"]["decoder"]["step_ms"] == pytest.approx([20])
+
+
+class ProfiledSession:
+    """Stands in for an InferenceSession with profiling on: end_profiling() writes the trace."""
+
+    def __init__(self, path, events):
+        self.path = path
+        self.events = events
+
+    def end_profiling(self):
+        self.path.write_text(json.dumps(self.events))
+        return str(self.path)
+
+
+def operator_seconds(session, op):
+    return REGISTRY.get_sample_value("ort_operator_seconds_per_run", {"kind": "ocr", "session": session, "op": op})
+
+
+def test_collect_replaces_the_previous_operator_labels(profiling, tmp_path):
+    first = {"encoder": ProfiledSession(tmp_path / "first.json", PROFILE)}
+    OrtProfilingService._collect("ocr", first)
+
+    assert operator_seconds("encoder", "Softmax") == pytest.approx(0.15e-3)
+    assert not (tmp_path / "first.json").exists()
+
+    second = {"decoder": ProfiledSession(tmp_path / "second.json", [run_event(1000), kernel_event("Gather", 500)])}
+    result = OrtProfilingService._collect("ocr", second)
+
+    assert list(result) == ["decoder"]
+    assert operator_seconds("decoder", "Gather") == pytest.approx(0.5e-3)
+    assert operator_seconds("encoder", "Softmax") is None
+    assert operator_seconds("encoder", "MatMul") is None
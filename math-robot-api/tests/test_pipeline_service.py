@@ -0,0 +1,45 @@
+import asyncio
+import numpy as np
+import pytest
+from app.config import config
+from app.models.deadline_model import DeadlineExceeded
+from app.models.file_model import File
+from app.services.pipeline_service import PipelineService
+from app.services.pix2text_service import Pix2TextService
+
+
+def crop(value: int) -> File:
+    return File(name=f"crop_{value}", data=np.full((32, 96, 3), value, dtype=np.uint8), data_type='cv2')
+
+
+@pytest.fixture(autouse=True)
+def no_crop_store(monkeypatch):
+    monkeypatch.setattr(config, "CROP_STORE_ENABLED", False)
+
+
+def test_one_failing_crop_does_not_fail_the_others(monkeypatch):
+    calls = []
+
+    async def recognize_formulas(files, deadline=None):
+        calls.append([file.name for file in files])
+        if any(file.name == "crop_2" for file in files):
+            raise Exception("Failed LaTeX OCR: corrupt crop")
+        return [f"x={file.name[-1]}" for file in files]
+
+    monkeypatch.setattr(Pix2TextService, "recognize_formulas", recognize_formulas)
+    results = asyncio.run(PipelineService.recognize_problems([crop(1), crop(2), crop(3)], translation_mode=PipelineService.NONE))
+
+    assert [result["success"] for result in results] == [True, False, True]
+    assert [result["latex_raw"] for result in results] == ["x=1", None, "x=3"]
+    assert "corrupt crop" in results[1]["error"]
+    assert calls[0] == ["crop_1", "crop_2", "crop_3"]
+    assert sorted(calls[1:]) == [["crop_1"], ["crop_2"], ["crop_3"]]
+
+
+def test_deadline_during_ocr_fails_the_request(monkeypatch):
+    async def recognize_formulas(files, deadline=None):
+        raise DeadlineExceeded("OCR")
+
+    monkeypatch.setattr(Pix2TextService, "recognize_formulas", recognize_formulas)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(PipelineService.recognize_problems([crop(1), crop(2)], translation_mode=PipelineService.NONE))
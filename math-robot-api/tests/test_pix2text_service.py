@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+import cv2
+import numpy as np
+from app.config import config
+from app.services.ort_profiling_service import OrtProfilingService
+from app.services.pix2text_service import Pix2TextService
+
+
+class FakeProcessor:
+    """Stands in for TrOCRProcessor: the NumPy preprocessing, plus an optional error on a few pixels."""
+
+    def __init__(self, outlier: float = 0.0):
+        self.image_processor = SimpleNamespace(
+            size={"height": 64, "width": 256}, rescale_factor=1 / 255, image_mean=[0.5] * 3, image_std=[0.5] * 3
+        )
+        self.outlier = outlier
+
+    def __call__(self, images, return_tensors):
+        params = {
+            "height": 64, "width": 256,
+            "scale": np.full(3, 2 / 255, dtype=np.float32), "offset": np.ones(3, dtype=np.float32)
+        }
+        bgr = [cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR) for image in images]
+        pixel_values = Pix2TextService._preprocess(bgr, params).copy()
+        pixel_values[:, :, :2, :2] += self.outlier
+        return SimpleNamespace(pixel_values=pixel_values)
+
+
+def test_fast_preprocessing_is_enabled_when_it_matches_the_processor():
+    params = Pix2TextService._verify_fast_preprocessing(FakeProcessor())
+
+    assert (params["height"], params["width"]) == (64, 256)
+
+
+def test_fast_preprocessing_is_disabled_by_a_few_large_pixel_errors():
+    processor = FakeProcessor(outlier=1.0)
+    # Four pixels per channel: far below the mean tolerance, far above the max error
+    assert 12 / (3 * 64 * 256) < config.PIX2TEXT_PREPROCESS_TOLERANCE
+
+    assert Pix2TextService._verify_fast_preprocessing(processor) is None
+
+
+def test_load_version_verifies_preprocessing_off_the_event_loop(monkeypatch):
+    threads = {}
+
+    def load(model_name, profile, intra_op_threads):
+        return FakeProcessor(), object()
+
+    def verify(processor):
+        threads["verify"] = threading.get_ident()
+        return {"height": 64, "width": 256}
+
+    monkeypatch.setattr(config, "PIX2TEXT_FAST_PREPROCESS", True)
+    monkeypatch.setattr(Pix2TextService, "_load", staticmethod(load))
+    monkeypatch.setattr(Pix2TextService, "_verify_fast_preprocessing", staticmethod(verify))
+    monkeypatch.setattr(OrtProfilingService, "instrument", staticmethod(lambda *args: None))
+
+    async def run():
+        threads["loop"] = threading.get_ident()
+        return await Pix2TextService._load_version("model-a")
+
+    bundle = asyncio.run(run())
+
+    assert bundle["preprocess_params"] == {"height": 64, "width": 256}
+    assert threads["verify"] != threads["loop"]
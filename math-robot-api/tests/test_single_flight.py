@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from app.models.deadline_model import Deadline, DeadlineExceeded
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    async def main():
+        flights = SingleFlight("test")
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flights.do("key", work) for _ in range(3)))
+        return results, runs
+
+    results, runs = asyncio.run(main())
+    assert results == ["done"] * 3
+    assert len(runs) == 1
+
+
+def test_cancelled_leader_does_not_cancel_joined_callers():
+    async def main():
+        flights = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.ensure_future(flights.do("key", work))
+        follower = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_call_after_last_waiter_cancels_starts_a_fresh_flight():
+    async def main():
+        flights = SingleFlight("test")
+        started = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                # Cleanup that takes a moment: the cancelled task is still running
+                await asyncio.sleep(0.01)
+                raise
+            return "stale"
+
+        async def fresh():
+            return "fresh"
+
+        only = asyncio.ensure_future(flights.do("key", work))
+        await started.wait()
+        only.cancel()
+        await asyncio.sleep(0)
+        result = await flights.do("key", fresh)
+        with pytest.raises(asyncio.CancelledError):
+            await only
+        return result, runs
+
+    result, runs = asyncio.run(main())
+    assert result == "fresh"
+    assert len(runs) == 1
+
+
+def test_failure_is_not_cached():
+    async def main():
+        flights = SingleFlight("test")
+        attempts = []
+
+        async def work():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+            return "ok"
+
+        with pytest.raises(RuntimeError):
+            await flights.do("key", work)
+        return await flights.do("key", work)
+
+    assert asyncio.run(main()) == "ok"
+
+
+def test_each_caller_gets_its_own_deadline():
+    async def main():
+        flights = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        short = flights.do("key", work, Deadline(0.01))
+        long = flights.do("key", work, Deadline(5))
+        return await asyncio.gather(short, long, return_exceptions=True)
+
+    short, long = asyncio.run(main())
+    assert isinstance(short, DeadlineExceeded)
+    assert long == "done"
+
+
+def test_work_is_cancelled_when_every_caller_runs_out_of_time():
+    async def main():
+        flights = SingleFlight("test")
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(DeadlineExceeded):
+            await flights.do("key", work, Deadline(0.01))
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        return flights._flights
+
+    assert asyncio.run(main()) == {}
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from app.config import config
+from app.services.translation_job_service import TranslationJobService
+
+
+@pytest.fixture(autouse=True)
+def jobs(monkeypatch):
+    monkeypatch.setattr(config, "SCHEDULER_ENABLED", False)
+    monkeypatch.setattr(config, "TRANSLATION_WORKERS", 1)
+    monkeypatch.setattr(TranslationJobService, "_jobs", {})
+    monkeypatch.setattr(TranslationJobService, "_queue", None)
+    monkeypatch.setattr(TranslationJobService, "_workers", [])
+
+
+def test_submit_is_refused_once_too_many_jobs_are_unfinished(monkeypatch):
+    monkeypatch.setattr(config, "TRANSLATION_MAX_PENDING", 2)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def translate(deadline):
+            await release.wait()
+            return "x"
+
+        handles = [TranslationJobService.submit("x", translate) for _ in range(3)]
+        release.set()
+        await asyncio.gather(*(TranslationJobService.get(handle, wait=1) for handle in handles[:2]))
+        # Finished jobs no longer count against the limit
+        handles.append(TranslationJobService.submit("x", translate))
+        await TranslationJobService.shutdown()
+        return handles
+
+    handles = asyncio.run(main())
+    assert handles[0] is not None and handles[1] is not None
+    assert handles[2] is None
+    assert handles[3] is not None
+
+
+def test_deadline_starts_at_submission(monkeypatch):
+    monkeypatch.setattr(config, "TRANSLATION_JOB_TIMEOUT", 0.2)
+
+    async def main():
+        remaining = []
+
+        async def translate(deadline):
+            remaining.append(deadline.remaining())
+            await asyncio.sleep(0.1)
+            return "x"
+
+        handles = [TranslationJobService.submit(latex, translate) for latex in ("x", "y")]
+        results = [await TranslationJobService.get(handle, wait=1) for handle in handles]
+        await TranslationJobService.shutdown()
+        return results, remaining
+
+    results, remaining = asyncio.run(main())
+    assert [job["status"] for job in results] == [TranslationJobService.COMPLETED] * 2
+    # The second job queued behind the first and only got what was left of its timeout
+    assert remaining[0] > 0.15
+    assert remaining[1] < 0.11
+
+
+def test_stale_pending_jobs_expire_without_running(monkeypatch):
+    monkeypatch.setattr(config, "TRANSLATION_JOB_TIMEOUT", 0.05)
+
+    async def main():
+        started = []
+
+        async def slow(deadline):
+            started.append("slow")
+            await asyncio.sleep(0.2)
+            return "slow"
+
+        async def never(deadline):
+            started.append("never")
+            return "never"
+
+        TranslationJobService.submit("a", slow)
+        queued = TranslationJobService.submit("b", never)
+        await asyncio.sleep(0.08)
+        # Expired while the only worker was still busy with the first job
+        job = await TranslationJobService.get(queued)
+        await asyncio.sleep(0.2)
+        await TranslationJobService.shutdown()
+        return job, started
+
+    job, started = asyncio.run(main())
+    assert job["status"] == TranslationJobService.FAILED
+    assert job["error"] == "Translation timed out while queued"
+    assert "deadline" not in job
+    assert started == ["slow"]
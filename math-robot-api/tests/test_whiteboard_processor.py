@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import time
+import numpy as np
+from app.services.whiteboard_processor_service import WhiteboardProcessorService
+
+
+class FakeTensor:
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.array([[1, 2, 3, 4]], dtype=np.float32)
+
+
+class FakeBoxes:
+    xyxy = FakeTensor()
+
+
+class FakeResult:
+    boxes = FakeBoxes()
+
+
+class FakeUltralyticsModel:
+    """Records how many predictions overlap, like a predictor that is not thread-safe would suffer."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.guard = threading.Lock()
+
+    def __call__(self, img, conf, iou):
+        with self.guard:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self.guard:
+            self.active -= 1
+        return [FakeResult()]
+
+
+def test_ultralytics_predictions_are_serialized():
+    model = FakeUltralyticsModel()
+    img = np.zeros((64, 64, 3), dtype=np.uint8)
+
+    async def main():
+        return await asyncio.gather(*(WhiteboardProcessorService._predict_boxes(img, model) for _ in range(4)))
+
+    boxes = asyncio.run(main())
+    assert model.max_active == 1
+    assert all(b.tolist() == [[1, 2, 3, 4]] for b in boxes)
@@ -0,0 +1,196 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from app.config import config
+from app.services.yolo_onnx_detector import YoloOnnxDetector, _mean_best_iou
+
+
+class FakeSession:
+    """Stands in for the ONNX Runtime session: returns a fixed raw prediction per image."""
+
+    def __init__(self, prediction: np.ndarray):
+        self.prediction = prediction
+        self.batches = []
+
+    def run(self, outputs, feeds):
+        batch = feeds["images"]
+        self.batches.append(batch.shape)
+        return [np.repeat(self.prediction[None], len(batch), axis=0)]
+
+
+def make_detector(imgsz=(640, 640), prediction=None, dynamic_batch=True) -> YoloOnnxDetector:
+    # Skip __init__, which needs onnxruntime and a model file
+    detector = object.__new__(YoloOnnxDetector)
+    detector.imgsz = imgsz
+    detector.conf_threshold = 0.25
+    detector.iou_threshold = 0.7
+    detector.max_det = 300
+    detector.input_name = "images"
+    detector.dynamic_batch = dynamic_batch
+    detector.session = FakeSession(prediction) if prediction is not None else None
+    return detector
+
+
+def raw_prediction(rows):
+    """Rows of (cx, cy, w, h, score class 0, score class 1) → (4 + classes, anchors) like YOLOv8."""
+    return np.array(rows, dtype=np.float32).T
+
+
+def test_letterbox_pads_height():
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    padded, ratio, pad = make_detector()._letterbox(img)
+
+    assert padded.shape == (640, 640, 3)
+    assert ratio == 1.0
+    assert pad == (0, 80)
+    assert (padded[:80] == 114).all() and (padded[-80:] == 114).all()
+    assert (padded[80:560] == 0).all()
+
+
+def test_letterbox_scales_and_pads_width():
+    img = np.zeros((1000, 500, 3), dtype=np.uint8)
+    padded, ratio, pad = make_detector()._letterbox(img)
+
+    assert padded.shape == (640, 640, 3)
+    assert ratio == pytest.approx(0.64)
+    assert pad == (160, 0)
+    assert (padded[:, :160] == 114).all() and (padded[:, 480:] == 114).all()
+
+
+def test_letterbox_odd_padding_matches_ultralytics_rounding():
+    img = np.zeros((639, 640, 3), dtype=np.uint8)
+    padded, _, pad = make_detector()._letterbox(img)
+
+    # 1 pixel of padding goes to the bottom, like ultralytics LetterBox
+    assert padded.shape == (640, 640, 3)
+    assert pad == (0, 0)
+
+
+def test_preprocess_is_rgb_chw_in_unit_range():
+    img = np.zeros((640, 640, 3), dtype=np.uint8)
+    img[..., 0] = 255  # blue channel in BGR
+    batch, transforms = make_detector()._preprocess([img])
+
+    assert batch.shape == (1, 3, 640, 640)
+    assert batch.dtype == np.float32
+    assert (batch[0, 2] == 1.0).all() and (batch[0, 0] == 0.0).all()
+    assert transforms == [(1.0, (0, 0))]
+
+
+def test_nms_suppresses_overlaps_and_keeps_score_order():
+    boxes = np.array([[0, 0, 100, 100], [5, 5, 105, 105], [200, 200, 300, 300]], dtype=np.float32)
+    scores = np.array([0.8, 0.9, 0.7], dtype=np.float32)
+
+    keep = YoloOnnxDetector._nms(boxes, scores, iou_threshold=0.7)
+
+    assert keep.tolist() == [1, 2]
+
+
+def test_nms_keeps_boxes_below_iou_threshold():
+    boxes = np.array([[0, 0, 100, 100], [50, 0, 150, 100]], dtype=np.float32)
+    scores = np.array([0.9, 0.8], dtype=np.float32)
+
+    # IoU = 50*100 / (2*100*100 - 50*100) = 1/3
+    assert YoloOnnxDetector._nms(boxes, scores, iou_threshold=0.3).tolist() == [0]
+    assert YoloOnnxDetector._nms(boxes, scores, iou_threshold=0.5).tolist() == [0, 1]
+
+
+def test_postprocess_rescales_boxes_to_the_original_image():
+    prediction = raw_prediction([
+        (320, 320, 64, 32, 0.9, 0.0),   # kept
+        (100, 100, 10, 10, 0.1, 0.2),   # below the confidence threshold
+    ])
+    # 1000x500 image letterboxed into 640x640: ratio 0.64, 160 px padding left and right
+    detections = make_detector()._postprocess(prediction, 0.64, (160, 0), (1000, 500))
+
+    assert detections.shape == (1, 6)
+    x1, y1, x2, y2, score, class_id = detections[0]
+    assert (x1, y1, x2, y2) == pytest.approx(((288 - 160) / 0.64, 304 / 0.64, (352 - 160) / 0.64, 336 / 0.64))
+    assert score == pytest.approx(0.9)
+    assert class_id == 0
+
+
+def test_postprocess_clips_to_the_image():
+    prediction = raw_prediction([(10, 10, 40, 40, 0.9, 0.0)])
+    detections = make_detector()._postprocess(prediction, 1.0, (0, 0), (640, 640))
+
+    assert detections[0, :4].tolist() == [0, 0, 30, 30]
+
+
+def test_postprocess_does_not_suppress_across_classes():
+    prediction = raw_prediction([
+        (320, 320, 100, 100, 0.9, 0.0),
+        (322, 322, 100, 100, 0.0, 0.8),
+        (324, 324, 100, 100, 0.7, 0.0),
+    ])
+    detections = make_detector()._postprocess(prediction, 1.0, (0, 0), (640, 640))
+
+    assert sorted(detections[:, 5].tolist()) == [0, 1]
+    assert sorted(detections[:, 4].tolist()) == pytest.approx([0.8, 0.9])
+
+
+def test_postprocess_without_detections():
+    prediction = raw_prediction([(320, 320, 100, 100, 0.1, 0.1)])
+    assert make_detector()._postprocess(prediction, 1.0, (0, 0), (640, 640)).shape == (0, 6)
+
+
+def test_detect_runs_static_batch_models_one_image_at_a_time():
+    prediction = raw_prediction([(320, 400, 64, 32, 0.9, 0.0)])
+    detector = make_detector(prediction=prediction, dynamic_batch=False)
+    images = [np.zeros((480, 640, 3), dtype=np.uint8), np.zeros((640, 640, 3), dtype=np.uint8)]
+
+    detections = detector.detect(images)
+
+    assert detector.session.batches == [(1, 3, 640, 640), (1, 3, 640, 640)]
+    # First image was padded 80 px at the top
+    assert detections[0][0, :4].tolist() == pytest.approx([288, 304, 352, 336])
+    assert detections[1][0, :4].tolist() == pytest.approx([288, 384, 352, 416])
+    assert detector.detect([]) == []
+
+
+def test_mean_best_iou():
+    expected = np.array([[0, 0, 100, 100], [200, 0, 300, 100]], dtype=np.float32)
+    actual = np.array([[200, 0, 300, 100], [0, 0, 100, 50]], dtype=np.float32)
+
+    assert _mean_best_iou(expected, actual) == pytest.approx((0.5 + 1.0) / 2)
+    assert _mean_best_iou(expected, actual[:0]) == 0.0
+    assert _mean_best_iou(expected[:0], actual[:0]) == 1.0
+
+
+def whiteboard(lines) -> np.ndarray:
+    img = np.full((720, 1280, 3), 240, dtype=np.uint8)
+    for i, text in enumerate(lines):
+        cv2.putText(img, text, (80 + 600 * (i % 2), 160 + 220 * (i // 2)), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.6, (30, 30, 30), 3, cv2.LINE_AA)
+    return img
+
+
+def test_onnx_backend_matches_ultralytics():
+    """Both backends on the configured weights; set YOLO_PARITY_IMAGES to check real photos."""
+    ultralytics = pytest.importorskip("ultralytics")
+    pytest.importorskip("onnxruntime")
+    if not config.YOLO_PATH or not os.path.exists(config.YOLO_PATH):
+        pytest.skip("YOLO_PATH weights not available")
+    if not os.path.exists(config.YOLO_ONNX_PATH):
+        pytest.skip("YOLO_ONNX_PATH not exported")
+
+    image_paths = [path for path in os.getenv("YOLO_PARITY_IMAGES", "").split(os.pathsep) if path]
+    images = [cv2.imread(path) for path in image_paths] or [
+        whiteboard(["2x+3=7", "y=x^2-4", "12345+67890", "a^2+b^2=c^2"])
+    ]
+
+    torch_model = ultralytics.YOLO(config.YOLO_PATH)
+    onnx_model = YoloOnnxDetector(config.YOLO_ONNX_PATH, config.YOLO_CONF_THRESHOLD, config.YOLO_IOU_THRESHOLD)
+    compared = 0
+    for img in images:
+        expected = torch_model(img, conf=config.YOLO_CONF_THRESHOLD, iou=config.YOLO_IOU_THRESHOLD,
+                               verbose=False)[0].boxes.xyxy.cpu().numpy()
+        actual = onnx_model.detect([img])[0][:, :4]
+
+        assert len(actual) == len(expected)
+        assert _mean_best_iou(expected, actual) >= 0.9
+        compared += len(expected)
+
+    if compared == 0:
+        pytest.skip("No detections to compare on the sample images")